@@ -2,13 +2,18 @@ import streamlit as st
 import pandas as pd
 import json
 import os
-from typing import Dict, Any
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator
 
 # Import dari SRC (Core Logic)
 from src.config import config
 from src.workflow import build_enhanced_workflow
 from src.metadata_manager import MetadataManager
 from src.tools import web_search_tool
+from src.result_spill import read_page, page_count, cleanup_spills
+from src.query_guard import CancelToken
 
 # ================== CONFIGURATION ==================
 st.set_page_config(
@@ -37,10 +42,72 @@ def initialize_graph():
     return build_enhanced_workflow()
 
 @st.cache_resource
+def cleanup_old_results():
+    """Hapus file hasil query lama sekali saat app start"""
+    return cleanup_spills()
+
+def render_result_pages(handle: Dict[str, Any], key: str):
+    """Tabel hasil query besar: halaman dibaca dari file Parquet hanya saat dipilih"""
+    pages = page_count(handle)
+    with st.expander(f"📄 Data lengkap ({handle['row_count']} baris)"):
+        page = st.number_input("Halaman", min_value=1, max_value=pages, value=1, key=key) if pages > 1 else 1
+        try:
+            st.dataframe(read_page(handle, int(page) - 1), use_container_width=True)
+            st.caption(f"Halaman {int(page)} dari {pages}")
+        except (OSError, RuntimeError) as e:
+            st.warning(f"File hasil tidak tersedia lagi: {e}")
+
+def start_workflow(graph, initial_state: Dict[str, Any]) -> queue.Queue:
+    """
+    Jalankan graph.stream di worker thread; event per node dikirim lewat queue.
+    Script thread tidak ikut terblokir query, jadi tombol Stop bisa membatalkan query yang sedang berjalan.
+    """
+    events = queue.Queue()
+
+    def worker():
+        try:
+            for event in graph.stream(initial_state):
+                events.put(("event", event))
+            events.put(("done", None))
+        except Exception as e:
+            events.put(("error", e))
+
+    thread = threading.Thread(target=worker, name="workflow", daemon=True)
+    thread.start()
+    st.session_state.active_run = {"token": initial_state["cancel_token"], "thread": thread}
+    return events
+
+def iter_workflow_events(events: queue.Queue, timer) -> Iterator[Dict[str, Any]]:
+    """Event node dari worker; selama menunggu, timer di-update (sekaligus titik rerun Streamlit saat Stop diklik)"""
+    started = time.time()
+    while True:
+        try:
+            kind, payload = events.get(timeout=0.5)
+        except queue.Empty:
+            timer.caption(f"⏳ {time.time() - started:.0f}s — klik ⏹️ Stop Query di sidebar untuk membatalkan")
+            continue
+        if kind == "error":
+            raise payload
+        if kind == "done":
+            timer.empty()
+            return
+        yield payload
+
+def stop_running_query():
+    """Callback tombol Stop: batalkan query workflow yang masih berjalan"""
+    run = st.session_state.get("active_run")
+    if run and run["thread"].is_alive() and not run["token"].cancelled:
+        run["token"].cancel("stopped by user")
+        st.session_state.messages.append({"role": "assistant", "content": "⏹️ Query dihentikan oleh user."})
+
+@st.cache_resource
+def get_metadata_manager() -> MetadataManager:
+    """Satu MetadataManager per proses; file metadata yang berubah di-reload otomatis"""
+    return MetadataManager()
+
 def get_db_stats():
     """Load statistik database untuk sidebar"""
-    mm = MetadataManager()
-    tables = mm.load_all_metadata()
+    tables = get_metadata_manager().load_all_metadata()
     return {
         "table_count": len(tables),
         "table_names": list(tables.keys())
@@ -78,6 +145,8 @@ def main():
         st.markdown("---")
         st.info(f"**Model:** {config.USER_MODEL}\n\n**Context:**\n- {config.USER_CONTEXT['region']}")
         
+        st.button("⏹️ Stop Query", on_click=stop_running_query)
+
         if st.button("🗑️ Clear History"):
             st.session_state.messages = []
             st.rerun()
@@ -92,9 +161,10 @@ def main():
     except Exception as e:
         st.error(f"Failed to initialize workflow: {e}")
         return
+    cleanup_old_results()
 
     # Display History
-    for msg in st.session_state.messages:
+    for i, msg in enumerate(st.session_state.messages):
         with st.chat_message(msg["role"]):
             # Jika itu pesan assistant dan punya 'details' (log agent), tampilkan di expander
             if msg.get("details"):
@@ -102,6 +172,8 @@ def main():
                     for step in msg["details"]:
                         st.markdown(f"- {step}")
             st.markdown(msg["content"])
+            if msg.get("spill"):
+                render_result_pages(msg["spill"], key=f"result_page_{i}")
 
     # User Input
     if prompt := st.chat_input("Tanyakan data inflasi, ekspor, atau prediksi masa depan..."):
@@ -122,6 +194,7 @@ def main():
             initial_state = {
                 "user_input": prompt,
                 "user_context": config.USER_CONTEXT,
+                "cancel_token": CancelToken(),
                 "messages": []
             }
 
@@ -130,8 +203,9 @@ def main():
                 # Menjalankan graph secara streaming (per node update)
                 with st.status("🤖 AI Agents working...", expanded=True) as status:
                     
-                    # Kita stream output dari setiap node
-                    for event in graph.stream(initial_state):
+                    # Kita stream output dari setiap node (graph berjalan di worker thread)
+                    timer = st.empty()
+                    for event in iter_workflow_events(start_workflow(graph, initial_state), timer):
                         for key, value in event.items():
                             node_name = key
                             state_snapshot = value
@@ -200,11 +274,17 @@ def main():
                 # Tampilkan Jawaban
                 response_container.markdown(final_response)
 
+                # Hasil besar (spill ke Parquet): hanya handle yang disimpan di history
+                spill = (final_state.get("execution_result") or {}).get("spill")
+                if spill:
+                    render_result_pages(spill, key=f"result_page_{len(st.session_state.messages)}")
+
                 # Simpan ke history
                 st.session_state.messages.append({
                     "role": "assistant",
                     "content": final_response,
-                    "details": agent_logs
+                    "details": agent_logs,
+                    "spill": spill
                 })
 
             except Exception as e:
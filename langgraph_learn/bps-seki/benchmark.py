@@ -0,0 +1,408 @@
+# benchmark.py
+"""Benchmark performa komponen Agentic AI System"""
+
+import argparse
+import json
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Any
+
+import pandas as pd
+import sqlparse
+
+from src.config import config
+from src.sql_executor import SQLExecutor
+from src.sql_validator import SQLValidator
+from src.metadata_index import MetadataIndex
+from src.metadata_manager import MetadataManager
+
+def measure(func: Callable, repeats: int = 5) -> Dict[str, Any]:
+    """
+    Jalankan func beberapa kali dan catat waktu terbaik.
+    Peak memory diukur di run terpisah karena tracemalloc memperlambat alokasi.
+    """
+    best_time = float("inf")
+    result = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best_time = min(best_time, time.perf_counter() - start)
+
+    result = None
+    tracemalloc.start()
+    result = func()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": best_time, "peak_memory": peak_memory, "result": result}
+
+# ================== COLUMNAR FETCH ==================
+
+def bench_columnar(args):
+    """Bandingkan fetchall + DataFrame(list-of-tuples) vs columnar fetch"""
+    executor = SQLExecutor()
+
+    tables = args.tables or [
+        "ref_mkt_bps_jumlah_penduduk_by_usia",
+        "ref_mkt_bps_pengeluaran_per_kapita",
+        "ref_mkt_seki_savings",
+        "ref_mkt_seki_export_import",
+    ]
+
+    def legacy_fetch(sql):
+        with executor.pool.connection() as conn:
+            cursor = conn.execute(sql)
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def columnar_fetch(sql):
+        return executor.execute(sql, use_cache=False, spill=False)["data"]
+
+    print(f"{'table':45} {'path':10} {'rows':>7} {'rows/sec':>12} {'peak MiB':>9}")
+    print("-" * 88)
+
+    config.COLUMNAR_FETCH = True
+    for table in tables:
+        sql = f"SELECT * FROM {table}"
+        # Ulangi tabel agar volume cukup besar untuk diukur
+        if args.multiply > 1:
+            sql = " UNION ALL ".join([f"SELECT * FROM {table}"] * args.multiply)
+
+        for name, func in [("legacy", legacy_fetch), ("columnar", columnar_fetch)]:
+            stats = measure(lambda: func(sql), repeats=args.repeats)
+            rows = len(stats["result"])
+            print(f"{table:45} {name:10} {rows:>7} {rows / stats['time']:>12,.0f} "
+                  f"{stats['peak_memory'] / 2**20:>9.2f}")
+
+# ================== BOUND PARAMETERS ==================
+
+def bench_params(args):
+    """Filter region/tahun sebagai literal vs bound parameters: statement reuse & result cache hit"""
+    table = args.table
+    with SQLExecutor().pool.connection() as conn:
+        regions = [row[0] for row in conn.execute(f"SELECT DISTINCT region FROM {table}").fetchall()]
+        years = [row[0] for row in conn.execute(f"SELECT DISTINCT year FROM {table}").fetchall()]
+
+    base_sql = f"SELECT area, year FROM {table} WHERE year = {{year}}"
+    workload = [(region, year) for _ in range(args.rounds) for region in regions for year in years]
+
+    def run(mode):
+        executor = SQLExecutor()
+        pool, cache = executor.pool, executor.result_cache
+        pool_before, cache_before = pool.get_stats(), cache.get_stats()
+        start = time.perf_counter()
+
+        for region, year in workload:
+            sql = base_sql.format(year=year)
+            if mode == "literal":
+                sql = SQLValidator.inject_region_filter(sql, "region", region)
+                executor.execute(sql)
+            else:
+                sql, params = SQLValidator.bind_filters(sql, "region", region)
+                executor.execute(sql, params)
+
+        elapsed = time.perf_counter() - start
+        pool_after, cache_after = pool.get_stats(), cache.get_stats()
+        statement_hits = pool_after["statement_hits"] - pool_before["statement_hits"]
+        statement_misses = pool_after["statement_misses"] - pool_before["statement_misses"]
+        cache_hits = cache_after["hits"] - cache_before["hits"]
+        return elapsed, statement_hits / (statement_hits + statement_misses or 1), cache_hits / len(workload)
+
+    print(f"{len(workload)} queries ({len(regions)} regions x {len(years)} years x {args.rounds} rounds) on {table}")
+    print(f"{'mode':10} {'time (s)':>9} {'stmt reuse':>11} {'cache hit':>10}")
+    print("-" * 44)
+    for mode in ["literal", "bound"]:
+        # Cache dikosongkan agar kedua mode mulai dari kondisi sama
+        SQLExecutor().result_cache.clear()
+        elapsed, statement_rate, cache_rate = run(mode)
+        print(f"{mode:10} {elapsed:>9.3f} {statement_rate:>11.1%} {cache_rate:>10.1%}")
+
+# ================== SQL VALIDATOR ==================
+
+_LEGACY_FORBIDDEN_KEYWORDS = [
+    "drop", "delete", "update", "insert", "alter",
+    "truncate", "create", "attach", "detach", "grant",
+    "revoke", "commit", "rollback", "savepoint", "exec",
+    "execute", "sp_", "xp_", "shutdown"
+]
+
+_LEGACY_FORBIDDEN_PATTERNS = [
+    r"--.*$", r";\s*--", r"union.*select", r"exec.*\(|sp_", r"xp_",
+    r"waitfor.*delay|sleep\s*\(", r"benchmark\s*\(|pg_sleep",
+]
+
+def legacy_validate_sql(sql: str) -> bool:
+    """Salinan validator lama (regex per keyword + sqlparse) sebagai pembanding"""
+    sql_lower = sql.lower().strip()
+    if not sql_lower.startswith("select"):
+        return False
+    for keyword in _LEGACY_FORBIDDEN_KEYWORDS:
+        if re.search(rf'\b{keyword}\b', sql_lower):
+            return False
+    for pattern in _LEGACY_FORBIDDEN_PATTERNS:
+        if re.search(pattern, sql_lower, re.IGNORECASE):
+            return False
+    if "from" not in sql_lower:
+        return False
+    try:
+        if len(sqlparse.parse(sql)) > 1:
+            return False
+    except Exception:
+        pass
+    return True
+
+def generate_sql_corpus(size: int, seed: int = 42):
+    """
+    Corpus SQL: (sql, expected_valid). Campuran query aman, query aman dengan kata terlarang
+    di dalam string/quoted identifier, dan query berbahaya.
+    """
+    rng = random.Random(seed)
+    tables = ["ref_mkt_bps_jumlah_penduduk", "ref_mkt_bps_umr", "ref_mkt_seki_savings", "ref_mkt_bps_ipm"]
+    columns = ["area", "year", "region", "leveldata", "jumlah_penduduk", "umr", "job_insertdate"]
+    quoted_words = ["update", "Drop Zone", "create value", "delete-me", "Insert Coin", "select; drop", "-- note"]
+
+    def safe_query():
+        table = rng.choice(tables)
+        cols = ", ".join(rng.sample(columns, rng.randint(1, 4)))
+        sql = f"SELECT {cols} FROM {table} WHERE year >= {rng.randint(2015, 2023)}"
+        if rng.random() < 0.5:
+            sql += f" AND region LIKE 'RM {rng.choice(['I', 'II', 'III'])}%'"
+        if rng.random() < 0.3:
+            sql += f" AND area IN (SELECT area FROM {rng.choice(tables)} WHERE year = {rng.randint(2015, 2023)})"
+        if rng.random() < 0.4:
+            sql += " GROUP BY area ORDER BY year DESC"
+        return sql + f" LIMIT {rng.randint(5, 100)};"
+
+    def quoted_query():
+        word = rng.choice(quoted_words)
+        sql = safe_query().rstrip(";")
+        if rng.random() < 0.5:
+            return sql.replace(" WHERE ", f" WHERE area <> '{word}' AND ", 1)
+        return sql.replace("SELECT ", f'SELECT "{word.split()[0]}" AS note, ', 1)
+
+    def dangerous_query():
+        table = rng.choice(tables)
+        return rng.choice([
+            f"SELECT * FROM {table}; DROP TABLE {table}",
+            f"SELECT * FROM {table} -- bypass",
+            f"SELECT * FROM {table} WHERE 1=1 UNION SELECT name FROM sqlite_master",
+            f"DELETE FROM {table}",
+            f"SELECT * FROM {table} WHERE area = 'x' /* comment */",
+            f"SELECT sleep(5) FROM {table}",
+            f"SELECT * FROM {table}; SELECT * FROM {table}",
+        ])
+
+    corpus = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < 0.6:
+            corpus.append((safe_query(), True))
+        elif roll < 0.85:
+            corpus.append((quoted_query(), True))
+        else:
+            corpus.append((dangerous_query(), False))
+    return corpus
+
+def bench_validator(args):
+    """Validator lama (19 regex + 7 pola + sqlparse) vs tokenizer satu pass"""
+    corpus = generate_sql_corpus(args.size, seed=args.seed)
+
+    def run_legacy():
+        return [legacy_validate_sql(sql) for sql, _ in corpus]
+
+    def run_tokenizer():
+        return [SQLValidator.validate_sql(sql)["is_valid"] for sql, _ in corpus]
+
+    print(f"{len(corpus)} generated queries "
+          f"({sum(1 for _, ok in corpus if not ok)} dangerous)")
+    print(f"{'validator':10} {'total (ms)':>11} {'us/query':>9} {'false pos':>10} {'false neg':>10}")
+    print("-" * 55)
+
+    timings = {}
+    for name, func in [("legacy", run_legacy), ("tokenizer", run_tokenizer)]:
+        stats = measure(func, repeats=args.repeats)
+        verdicts = stats["result"]
+        false_pos = sum(1 for (_, ok), valid in zip(corpus, verdicts) if ok and not valid)
+        false_neg = sum(1 for (_, ok), valid in zip(corpus, verdicts) if not ok and valid)
+        timings[name] = stats["time"]
+        print(f"{name:10} {stats['time'] * 1000:>11.2f} {stats['time'] / len(corpus) * 1e6:>9.1f} "
+              f"{false_pos:>10} {false_neg:>10}")
+
+    print(f"\nSpeedup: {timings['legacy'] / timings['tokenizer']:.1f}x")
+
+    examples = [sql for (sql, ok) in corpus if ok and not legacy_validate_sql(sql)][:3]
+    if examples:
+        print("\nContoh false positive validator lama (sekarang valid):")
+        for sql in examples:
+            print(f"  {sql}")
+
+# ================== METADATA RETRIEVAL ==================
+
+def legacy_find_relevant_tables(metadata: Dict[str, Any], user_query: str):
+    """Salinan scoring lama find_relevant_tables (scan substring per tabel) sebagai pembanding"""
+    query_terms = set(user_query.lower().split())
+    scores = []
+    for table_name, meta in metadata.items():
+        score = 0
+        desc = meta.get("description", "").lower()
+        if any(term in desc for term in query_terms):
+            score += 3
+        for col_name in meta.get("columns", {}).keys():
+            col_lower = col_name.lower()
+            for term in query_terms:
+                if term in col_lower:
+                    score += 2
+                elif len(term) > 3 and col_lower.startswith(term[:3]):
+                    score += 1
+        for row in meta.get("example_rows", []):
+            for value in row.values():
+                if isinstance(value, str):
+                    value_lower = value.lower()
+                    for term in query_terms:
+                        if term in value_lower:
+                            score += 0.5
+        if score > 0:
+            scores.append((table_name, score))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores
+
+_CATALOG_WORDS = [
+    "jumlah", "penduduk", "inflasi", "ekspor", "impor", "upah", "minimum", "regional", "kelahiran",
+    "gini", "ratio", "balita", "ibu", "hamil", "pns", "tenaga", "kesehatan", "pengeluaran", "kapita",
+    "produk", "domestik", "bruto", "devisa", "kurs", "tabungan", "investasi", "suku", "bunga", "harga",
+    "konsumen", "indeks", "transaksi", "berjalan", "neraca", "pembayaran", "usia", "provinsi", "kabupaten"
+]
+_CATALOG_AREAS = ["JAWA BARAT", "JAWA TIMUR", "BANDUNG", "BEKASI", "BOGOR", "ACEH", "BALI", "PAPUA", "RIAU"]
+_CATALOG_REGIONS = ["RM I SUMBAGUT", "RM II JATABEK", "RM III JABAR", "RM IV JATIM", "RM X"]
+
+def generate_catalog(size: int, seed: int = 42) -> Dict[str, Any]:
+    """Katalog metadata sintetis dengan bentuk sama seperti JSON di METADATA_DIR"""
+    rng = random.Random(seed)
+    catalog = {}
+    for i in range(size):
+        words = rng.sample(_CATALOG_WORDS, 3)
+        columns = {"area": "Nama wilayah", "year": "Tahun", "region": "Regional", "leveldata": "Level data"}
+        for word in rng.sample(_CATALOG_WORDS, rng.randint(1, 6)):
+            columns[f"{word}_{rng.choice(['total', 'pct', 'nilai'])}"] = f"Nilai {word}"
+        catalog[f"ref_mkt_{'_'.join(words)}_{i}"] = {
+            "description": f"Data {' '.join(words)} per wilayah dari BPS tahun {rng.randint(2010, 2023)}",
+            "columns": columns,
+            "access_column": "region",
+            "example_rows": [
+                {"area": rng.choice(_CATALOG_AREAS), "year": rng.randint(2015, 2023),
+                 "region": rng.choice(_CATALOG_REGIONS), "leveldata": "1_PROVINSI"}
+                for _ in range(3)
+            ]
+        }
+    return catalog
+
+def bench_retrieval(args):
+    """find_relevant_tables: scan substring lama vs inverted index (ranking harus identik)"""
+    rng = random.Random(args.seed)
+    queries = [
+        " ".join(rng.sample(_CATALOG_WORDS, rng.randint(1, 4)) + rng.sample(["di", "jawa", "barat", "2023", "bandung", "berapa"], 2))
+        for _ in range(args.queries)
+    ]
+
+    print(f"{'tables':>7} {'build (s)':>10} {'legacy ms/q':>12} {'index ms/q':>11} {'speedup':>8} {'identical':>10}")
+    print("-" * 64)
+    for size in args.sizes:
+        catalog = generate_catalog(size, seed=args.seed)
+
+        start = time.perf_counter()
+        index = MetadataIndex(catalog)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        legacy = [legacy_find_relevant_tables(catalog, q) for q in queries]
+        legacy_time = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        indexed = [index.score(set(q.lower().split())) for q in queries]
+        index_time = (time.perf_counter() - start) / len(queries)
+
+        identical = legacy == indexed
+        print(f"{size:>7} {build_time:>10.2f} {legacy_time * 1000:>12.2f} {index_time * 1000:>11.2f} "
+              f"{legacy_time / index_time:>7.1f}x {str(identical):>10}")
+
+def bench_startup(args):
+    """Cold start MetadataManager: parse semua JSON + build index vs load snapshot pickle"""
+    print(f"{'tables':>7} {'json ms':>9} {'snapshot ms':>12} {'speedup':>8} {'identical':>10}")
+    print("-" * 50)
+    for size in args.sizes:
+        catalog = generate_catalog(size, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            metadata_dir = Path(tmp) / "metadata"
+            metadata_dir.mkdir()
+            for table_name, meta in catalog.items():
+                with open(metadata_dir / f"{table_name}.json", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+
+            # Snapshot ditulis ke folder sementara, bukan DATA_DIR aplikasi
+            data_folder = config.DATA_FOLDER
+            config.DATA_FOLDER = str(Path(tmp) / "data")
+            try:
+                def cold_start(use_snapshot):
+                    manager = MetadataManager(metadata_dir, reload_interval=0, use_snapshot=use_snapshot)
+                    start = time.perf_counter()
+                    metadata = manager.load_all_metadata()
+                    return time.perf_counter() - start, manager, metadata
+
+                json_time = min(cold_start(False)[0] for _ in range(args.repeats))
+                _, json_manager, json_metadata = cold_start(True)  # tulis snapshot
+                runs = [cold_start(True) for _ in range(args.repeats)]
+                snapshot_time = min(run[0] for run in runs)
+                _, snapshot_manager, snapshot_metadata = runs[-1]
+            finally:
+                config.DATA_FOLDER = data_folder
+
+            query = " ".join(_CATALOG_WORDS[:3])
+            identical = (json_metadata == snapshot_metadata and
+                         json_manager.find_relevant_tables(query) == snapshot_manager.find_relevant_tables(query))
+            print(f"{size:>7} {json_time * 1000:>9.1f} {snapshot_time * 1000:>12.1f} "
+                  f"{json_time / snapshot_time:>7.1f}x {str(identical):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Agentic AI System")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    columnar = subparsers.add_parser("columnar", help="Columnar fetch vs list-of-tuples")
+    columnar.add_argument("--tables", nargs="*", help="Tabel yang diuji")
+    columnar.add_argument("--repeats", type=int, default=5)
+    columnar.add_argument("--multiply", type=int, default=1, help="UNION ALL tabel N kali")
+    columnar.set_defaults(func=bench_columnar)
+
+    params = subparsers.add_parser("params", help="Literal vs bound region/year filters")
+    params.add_argument("--table", default="ref_mkt_bps_jumlah_penduduk_by_usia")
+    params.add_argument("--rounds", type=int, default=3)
+    params.set_defaults(func=bench_params)
+
+    validator = subparsers.add_parser("validator", help="Validator regex lama vs tokenizer satu pass")
+    validator.add_argument("--size", type=int, default=5000, help="Jumlah query di corpus")
+    validator.add_argument("--seed", type=int, default=42)
+    validator.add_argument("--repeats", type=int, default=3)
+    validator.set_defaults(func=bench_validator)
+
+    retrieval = subparsers.add_parser("retrieval", help="find_relevant_tables: scan vs inverted index")
+    retrieval.add_argument("--sizes", nargs="*", type=int, default=[1000, 5000, 20000, 50000], help="Jumlah tabel katalog")
+    retrieval.add_argument("--queries", type=int, default=20)
+    retrieval.add_argument("--seed", type=int, default=42)
+    retrieval.set_defaults(func=bench_retrieval)
+
+    startup = subparsers.add_parser("startup", help="Cold start metadata: JSON vs snapshot")
+    startup.add_argument("--sizes", nargs="*", type=int, default=[50, 1000, 5000], help="Jumlah file metadata")
+    startup.add_argument("--repeats", type=int, default=3)
+    startup.add_argument("--seed", type=int, default=42)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
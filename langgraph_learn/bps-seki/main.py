@@ -3,6 +3,8 @@
 
 import argparse
 import json
+import signal
+from contextlib import contextmanager
 from pathlib import Path
 
 from src import (
@@ -14,6 +16,22 @@ from src import (
     logger
 )
 from src.state import AgentState
+from src.query_guard import CancelToken
+
+@contextmanager
+def cancel_on_interrupt(token: CancelToken):
+    """Selama workflow berjalan: Ctrl-C pertama membatalkan query, Ctrl-C kedua keluar"""
+    def handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("\n⏹️  Membatalkan query... (Ctrl-C lagi untuk keluar)")
+        token.cancel("cancelled by user (Ctrl-C)")
+    
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield token
+    finally:
+        signal.signal(signal.SIGINT, previous)
 
 def main():
     """Main function"""
@@ -54,24 +72,29 @@ def main():
         initial_state = AgentState(
             user_input=args.query,
             user_context=user_context,
+            cancel_token=CancelToken(),
             messages=[],
             intent=None,
             needs_clarification=False,
             clarification_question=None,
             clarification_response=None,
             relevant_tables=[],
+            entity_hits=[],
             selected_table=None,
             table_metadata=None,
             raw_sql=None,
             validated_sql=None,
+            sql_params=None,
             execution_result=None,
             forecast_result=None,
             final_answer=None,
             error=None,
+            error_details=None,
             next_node=None
         )
         
-        result = agent_workflow.invoke(initial_state)
+        with cancel_on_interrupt(initial_state["cancel_token"]):
+            result = agent_workflow.invoke(initial_state)
         
         if result.get("final_answer"):
             print(f"\n🤖 RESULT:\n{result['final_answer']}")
@@ -104,24 +127,29 @@ def main():
                 initial_state = AgentState(
                     user_input=user_input,
                     user_context=config.USER_CONTEXT,
+                    cancel_token=CancelToken(),
                     messages=[],
                     intent=None,
                     needs_clarification=False,
                     clarification_question=None,
                     clarification_response=None,
                     relevant_tables=[],
+                    entity_hits=[],
                     selected_table=None,
                     table_metadata=None,
                     raw_sql=None,
                     validated_sql=None,
+                    sql_params=None,
                     execution_result=None,
                     forecast_result=None,
                     final_answer=None,
                     error=None,
+                    error_details=None,
                     next_node=None
                 )
                 
-                result = agent_workflow.invoke(initial_state)
+                with cancel_on_interrupt(initial_state["cancel_token"]):
+                    result = agent_workflow.invoke(initial_state)
                 
                 if result.get("final_answer"):
                     print(f"\n🤖 System: {result['final_answer']}")
@@ -0,0 +1,142 @@
+# maintenance.py
+"""Maintenance commands untuk database.db (index, statistik, dll)"""
+
+import argparse
+from pathlib import Path
+
+from src.config import config
+from src.index_advisor import IndexAdvisor
+from src.entity_index import EntityIndex
+from src.llm_cache import LLMResponseCache
+from src.metadata_profiler import MetadataProfiler
+from src.rollup import RollupManager
+from src.result_spill import cleanup_spills, spill_dir
+
+def _fmt_ms(value) -> str:
+    return f"{value:8.2f}" if value is not None else "     n/a"
+
+def cmd_indexes(args):
+    """Usulkan / buat index dari query di audit log"""
+    advisor = IndexAdvisor(
+        db_path=Path(args.db) if args.db else None,
+        log_dir=Path(args.log_dir) if args.log_dir else None
+    )
+    result = advisor.run(apply=args.apply)
+
+    if not result["queries"]:
+        print("⚠️  Tidak ada query SQL_EXECUTION_SUCCESS di audit log.")
+        return
+
+    print(f"\n📋 INDEX PROPOSALS ({len(result['proposals'])})")
+    for proposal in result["proposals"]:
+        print(f"  [{proposal['query_count']:>4}x] {proposal['ddl']}")
+
+    print(f"\n⏱️  LATENCY PER QUERY (ms){' before -> after' if result['applied'] else ''}")
+    for entry in result["queries"]:
+        line = f"  {_fmt_ms(entry['latency_before_ms'])}"
+        if result["applied"]:
+            line += f" -> {_fmt_ms(entry.get('latency_after_ms'))}"
+        print(f"{line}  [{entry['count']}x] {' '.join(entry['sql'].split())[:100]}")
+        print(f"      plan: {' | '.join(entry['plan_before'])}")
+        if result["applied"]:
+            print(f"      after: {' | '.join(entry.get('plan_after', []))}")
+
+    if not result["applied"]:
+        print("\nDry run. Jalankan dengan --apply untuk membuat index dan ANALYZE.")
+
+def cmd_rollups(args):
+    """Bangun / refresh rollup tables yang basi"""
+    manager = RollupManager(
+        db_path=Path(args.db) if args.db else None,
+        base_tables=args.tables or None
+    )
+    report = manager.refresh(force=args.force)
+
+    print(f"\n📦 ROLLUP TABLES")
+    for entry in report:
+        detail = f"{entry.get('row_count', '')} rows" if entry["status"] == "refreshed" else ""
+        print(f"  {entry['status']:10} {entry['base_table']:45} {entry.get('source_insertdate') or ''} {detail}")
+
+def cmd_spills(args):
+    """Hapus file hasil query (Parquet) yang sudah kedaluwarsa"""
+    removed = cleanup_spills(max_age_hours=args.max_age_hours)
+    print(f"🧹 {removed} file spill dihapus dari {spill_dir()}")
+
+def cmd_profile(args):
+    """Generate / refresh metadata JSON dari tabel ref_mkt_* (hanya tabel yang berubah)"""
+    profiler = MetadataProfiler(
+        db_path=Path(args.db) if args.db else None,
+        metadata_dir=Path(args.metadata_dir) if args.metadata_dir else None,
+        workers=args.workers
+    )
+    report = profiler.run(tables=args.tables or None, force=args.force)
+
+    print(f"\n🗂️  METADATA PROFILE -> {profiler.metadata_dir}")
+    for entry in report:
+        detail = entry.get("error") or f"{entry.get('row_count')} rows, job_insertdate {entry.get('max_job_insertdate')}"
+        print(f"  {entry['status']:10} {entry['table']:45} {detail}")
+
+def cmd_entities(args):
+    """Refresh entity index (FTS5) untuk tabel yang berubah"""
+    index = EntityIndex(db_path=Path(args.db) if args.db else None)
+    report = index.refresh(force=args.force)
+
+    print(f"\n🔎 ENTITY INDEX -> {index.index_path}")
+    for entry in report:
+        detail = f"{entry['values']} values ({', '.join(entry['columns'])})" if entry["status"] == "indexed" else ""
+        print(f"  {entry['status']:10} {entry['table']:45} {detail}")
+
+def cmd_llm_cache(args):
+    """Statistik cache respons LLM; hapus entry kedaluwarsa atau semua entry"""
+    cache = LLMResponseCache()
+    if args.clear:
+        cache.clear()
+        print(f"🧹 LLM cache dikosongkan ({cache.path})")
+    else:
+        print(f"🧹 {cache.purge_expired()} entry kedaluwarsa dihapus")
+
+    stats = cache.get_stats()
+    print(f"\n💾 LLM CACHE -> {cache.path} ({stats['entries']}/{stats['max_entries']} entries, TTL {stats['ttl_hours']}h)")
+    print(f"  {'call_type':20} {'entries':>8} {'hits':>8} {'saved_s':>10}")
+    for call_type, entry in sorted(stats["by_call_type"].items()):
+        print(f"  {call_type:20} {entry['entries']:8d} {entry['hits']:8d} {entry['saved_ms'] / 1000:10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance Agentic AI System")
+    parser.add_argument("--db", type=str, help=f"Path database (default: {config.DB_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes = subparsers.add_parser("indexes", help="Index advisor berbasis audit log")
+    indexes.add_argument("--log-dir", type=str, help=f"Folder audit log (default: {config.LOG_DIR})")
+    indexes.add_argument("--apply", action="store_true", help="Buat index dan jalankan ANALYZE")
+    indexes.set_defaults(func=cmd_indexes)
+
+    rollups = subparsers.add_parser("rollups", help="Refresh rollup tables (year x region x leveldata)")
+    rollups.add_argument("--tables", nargs="*", help=f"Tabel sumber (default: {', '.join(config.ROLLUP_TABLES)})")
+    rollups.add_argument("--force", action="store_true", help="Bangun ulang walaupun masih fresh")
+    rollups.set_defaults(func=cmd_rollups)
+
+    spills = subparsers.add_parser("spills", help="Bersihkan file hasil query besar di DATA_DIR")
+    spills.add_argument("--max-age-hours", type=float, help=f"Umur maksimum file (default: {config.RESULT_SPILL_TTL_HOURS})")
+    spills.set_defaults(func=cmd_spills)
+
+    profile = subparsers.add_parser("profile", help="Generate metadata JSON dari database (incremental)")
+    profile.add_argument("--tables", nargs="*", help="Tabel yang diprofil (default: semua ref_mkt_*)")
+    profile.add_argument("--metadata-dir", type=str, help=f"Folder output (default: {config.METADATA_DIR})")
+    profile.add_argument("--workers", type=int, help=f"Jumlah worker paralel (default: {config.METADATA_PROFILE_WORKERS})")
+    profile.add_argument("--force", action="store_true", help="Profil ulang walaupun tabel tidak berubah")
+    profile.set_defaults(func=cmd_profile)
+
+    entities = subparsers.add_parser("entities", help="Refresh index nilai area/region/kategori (FTS5)")
+    entities.add_argument("--force", action="store_true", help="Index ulang semua tabel")
+    entities.set_defaults(func=cmd_entities)
+
+    llm_cache = subparsers.add_parser("llm-cache", help="Statistik & pembersihan cache respons LLM")
+    llm_cache.add_argument("--clear", action="store_true", help="Hapus semua entry (default: hanya yang kedaluwarsa)")
+    llm_cache.set_defaults(func=cmd_llm_cache)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -13,9 +13,20 @@ from .state import AgentState
 
 # 2. Service Clients
 from .llm_client import LLMClient, llm_client
+from .llm_cache import LLMResponseCache, get_llm_cache
 from .sql_executor import SQLExecutor
+from .connection_pool import ConnectionPool, get_pool
+from .result_cache import QueryResultCache, get_result_cache
+from .query_guard import CancelToken, QueryInterrupted
+from .index_advisor import IndexAdvisor
+from .rollup import RollupManager
+from .result_spill import ResultSpill, read_page
 from .metadata_manager import MetadataManager
+from .catalog import TableMeta, ColumnMeta
+from .prompt_builder import SchemaPromptBuilder
 from .sql_validator import SQLValidator
+from .sql_pipeline import SQLPipeline
+from .entity_index import EntityIndex, get_entity_index
 
 # 3. Agents & Selectors
 from .forecast_agent import ForecastAgent, EnhancedForecastAgent
@@ -57,9 +68,27 @@ __all__ = [
     # Clients
     "LLMClient",
     "llm_client",
+    "LLMResponseCache",
+    "get_llm_cache",
     "SQLExecutor",
+    "ConnectionPool",
+    "get_pool",
+    "QueryResultCache",
+    "get_result_cache",
+    "CancelToken",
+    "QueryInterrupted",
+    "IndexAdvisor",
+    "RollupManager",
+    "ResultSpill",
+    "read_page",
     "MetadataManager",
+    "TableMeta",
+    "ColumnMeta",
+    "SchemaPromptBuilder",
     "SQLValidator",
+    "SQLPipeline",
+    "EntityIndex",
+    "get_entity_index",
     
     # Agents
     "ForecastAgent",
@@ -0,0 +1,132 @@
+# src/catalog.py
+"""Katalog metadata terkompilasi: TableMeta / ColumnMeta (slotted) dengan fragment prompt siap pakai"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+# Heuristik peran kolom (sebelumnya diulang di forecast agent & prompt builder)
+YEAR_KEYWORDS = ("tahun", "year")
+DATE_KEYWORDS = ("tahun", "year", "bulan", "month", "tanggal", "date", "periode", "waktu")
+VALUE_KEYWORDS = ("nilai", "value", "jumlah", "total", "devisa", "pendapatan", "qty", "quantity", "volume", "harga", "price")
+DATE_TYPES = frozenset(["date", "datetime", "timestamp", "year", "month"])
+NUMERIC_TYPES = frozenset(["integer", "int", "float", "double", "decimal", "numeric", "number"])
+
+@dataclass(frozen=True, slots=True)
+class ColumnMeta:
+    name: str
+    name_lower: str
+    type: str           # untuk prompt ("unknown" jika tidak ada, "string" jika metadata hanya deskripsi)
+    description: str
+    is_year: bool       # nama mengandung tahun/year
+    is_date: bool       # kandidat sumbu waktu (nama atau tipe)
+    is_value: bool      # kandidat nilai numerik (nama atau tipe)
+    is_access: bool     # access column (filter region)
+    date_score: int     # jumlah keyword tanggal di nama (ranking kandidat forecast)
+    value_score: int
+    prompt_line: str    # "  - nama (tipe): deskripsi"
+
+@dataclass(frozen=True, slots=True)
+class TableMeta:
+    name: str
+    description: str                 # "No description" jika kosong, seperti di prompt
+    columns: Tuple[ColumnMeta, ...]
+    access_column: Optional[str]     # None jika tidak berlaku ("None", "null", "")
+    year_column: Optional[str]       # kolom tahun pertama
+    example_rows: Tuple[Dict[str, Any], ...]
+    columns_text: str                # blok kolom untuk prompt SQL
+    example_json: str                # 2 example_rows pertama (JSON)
+    schema_prompt: str               # hasil build_schema_prompt
+    preview_columns: str             # 8 kolom pertama untuk prompt pemilihan tabel
+    preview_has_year: bool
+    raw: Dict[str, Any]              # dict JSON asli (state LangGraph tetap memakai dict)
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
+    def column(self, name: str) -> Optional[ColumnMeta]:
+        name = name.lower()
+        return next((c for c in self.columns if c.name_lower == name), None)
+
+def _compile_column(name: str, info: Any, access_column: Optional[str]) -> ColumnMeta:
+    # col_info bisa string deskripsi atau dict {type, description}
+    if isinstance(info, dict):
+        col_type = info.get("type", "unknown")
+        description = info.get("description", "no description")
+        raw_type = str(info.get("type", "")).lower()
+    else:
+        col_type, description, raw_type = "string", info, "string"
+
+    name_lower = name.lower()
+    date_score = sum(1 for keyword in DATE_KEYWORDS if keyword in name_lower)
+    value_score = sum(1 for keyword in VALUE_KEYWORDS if keyword in name_lower)
+    return ColumnMeta(
+        name=name,
+        name_lower=name_lower,
+        type=col_type,
+        description=description,
+        is_year=any(keyword in name_lower for keyword in YEAR_KEYWORDS),
+        is_date=date_score > 0 or raw_type in DATE_TYPES,
+        is_value=value_score > 0 or raw_type in NUMERIC_TYPES,
+        is_access=access_column is not None and name_lower == access_column.lower(),
+        date_score=date_score,
+        value_score=value_score,
+        prompt_line=f"  - {name} ({col_type}): {description}"
+    )
+
+def compile_table(name: str, meta: Dict[str, Any]) -> TableMeta:
+    """Normalisasi satu entry metadata JSON menjadi TableMeta (dilakukan sekali per versi file)"""
+    raw_access = meta.get("access_column")
+    access_column = (
+        str(raw_access).strip()
+        if raw_access is not None and str(raw_access).strip().lower() not in ("none", "null", "")
+        else None
+    )
+    columns = tuple(_compile_column(col, info, access_column) for col, info in meta.get("columns", {}).items())
+    description = meta.get("description", "No description")
+    columns_text = "\n".join(c.prompt_line for c in columns)
+    example_rows = tuple(meta.get("example_rows", []))
+    example_json = json.dumps(list(example_rows[:2]), ensure_ascii=False)
+
+    schema_prompt = f"""Table: {name}
+Description: {description}
+Columns:
+{columns_text}
+Access Column: {meta.get('access_column', 'None')}
+Example Data: {example_json}"""
+
+    return TableMeta(
+        name=name,
+        description=description,
+        columns=columns,
+        access_column=access_column,
+        year_column=next((c.name for c in columns if c.is_year), None),
+        example_rows=example_rows,
+        columns_text=columns_text,
+        example_json=example_json,
+        schema_prompt=schema_prompt,
+        preview_columns=", ".join(c.name for c in columns[:8]),
+        preview_has_year=any(c.is_year for c in columns[:8]),
+        raw=meta
+    )
+
+def compile_catalog(metadata: Dict[str, Any], previous: Dict[str, TableMeta] = None) -> Dict[str, TableMeta]:
+    """Kompilasi semua tabel; TableMeta dari katalog sebelumnya dipakai ulang jika dict sumbernya sama"""
+    previous = previous or {}
+    tables = {}
+    for name, meta in metadata.items():
+        old = previous.get(name)
+        tables[name] = old if old is not None and old.raw is meta else compile_table(name, meta)
+    return tables
+
+def as_table_meta(metadata: Union[TableMeta, Dict[str, Any]], name: str = "") -> TableMeta:
+    """Terima TableMeta atau dict metadata mentah (caller lama)"""
+    return metadata if isinstance(metadata, TableMeta) else compile_table(name, metadata or {})
+
+def table_meta_of(table_info: Dict[str, Any]) -> TableMeta:
+    """TableMeta untuk item relevant_tables ({"table_name", "metadata", "table"?})"""
+    table = table_info.get("table")
+    if table is None:
+        table = compile_table(table_info["table_name"], table_info.get("metadata") or {})
+    return table
@@ -0,0 +1,122 @@
+# src/columnar.py
+"""Columnar result builder: cursor -> typed NumPy arrays per kolom (tanpa list-of-tuples penuh)"""
+
+import re
+import sqlite3
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+_TABLE_REF_RE = re.compile(r"\b(?:from|join)\s+[\"`\[]?([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+_INT_TYPES = {int}
+_REAL_TYPES = {float, int}
+_NONE_TYPE = type(None)
+
+def declared_kind(declared_type: str) -> str:
+    """Map declared type SQLite ke 'int' / 'real' / 'text' / 'object' (aturan type affinity)"""
+    t = (declared_type or "").upper()
+    if "INT" in t:
+        return "int"
+    if "CHAR" in t or "CLOB" in t or "TEXT" in t:
+        return "text"
+    if "REAL" in t or "FLOA" in t or "DOUB" in t:
+        return "real"
+    return "object"
+
+def referenced_tables(sql: str) -> List[str]:
+    """Nama tabel yang muncul setelah FROM/JOIN"""
+    return list(dict.fromkeys(_TABLE_REF_RE.findall(sql)))
+
+def resolve_column_kinds(columns: List[str], sql: str, table_types: Dict[str, Dict[str, str]]) -> List[str]:
+    """
+    Tentukan kind tiap kolom hasil dari declared type tabel sumber.
+    Kolom hasil ekspresi/alias (atau nama ambigu antar tabel) jatuh ke 'object'.
+    """
+    candidates: Dict[str, str] = {}
+    for table in referenced_tables(sql):
+        for col_name, col_type in table_types.get(table, {}).items():
+            kind = declared_kind(col_type)
+            key = col_name.lower()
+            if key in candidates and candidates[key] != kind:
+                candidates[key] = "object"
+            else:
+                candidates[key] = kind
+    return [candidates.get(col.lower(), "object") for col in columns]
+
+def load_table_types(conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+    """Declared column types via PRAGMA table_info"""
+    rows = conn.execute(f"PRAGMA table_info({table});").fetchall()
+    return {row[1]: row[2] for row in rows}
+
+def convert_values(values: Sequence, kind: str) -> np.ndarray:
+    """Konversi nilai satu kolom (dari satu batch fetchmany) ke array bertipe sesuai declared kind"""
+    if kind == "text" or not values:
+        return np.array(values, dtype=object)
+
+    # Validasi tipe nilai aktual (SQLite dynamic typing: kolom INTEGER bisa berisi teks).
+    # Kolom 'object' (ekspresi/alias) memakai inferensi yang sama.
+    types = set(map(type, values))
+    has_null = _NONE_TYPE in types
+    types.discard(_NONE_TYPE)
+
+    if kind in ("int", "object") and types and types <= _INT_TYPES and not has_null:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            return np.array(values, dtype=object)
+
+    if (kind in ("int", "real") or types) and types <= _REAL_TYPES:
+        # NULL -> NaN (sama dengan hasil pd.DataFrame dari tuples)
+        return np.array(values, dtype=np.float64)
+
+    return np.array(values, dtype=object)
+
+class ColumnarBuilder:
+    """Akumulasi batch fetchmany menjadi array per kolom"""
+
+    def __init__(self, columns: List[str], kinds: List[str]):
+        self.columns = columns
+        self.kinds = kinds
+        self._parts: List[List[np.ndarray]] = [[] for _ in columns]
+        self.row_count = 0
+
+    def append(self, rows: list):
+        if not rows:
+            return
+        # Transpose satu batch (ukuran terbatas) lalu konversi per kolom
+        for parts, kind, values in zip(self._parts, self.kinds, zip(*rows)):
+            parts.append(convert_values(values, kind))
+        self.row_count += len(rows)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {col: self._column_array(parts) for col, parts in zip(self.columns, self._parts)}
+
+    def _column_array(self, parts: List[np.ndarray]) -> np.ndarray:
+        if not parts:
+            return np.array([], dtype=object)
+        if len(parts) == 1:
+            return parts[0]
+        # numpy mempromosikan dtype antar batch (int64 + float64 -> float64, + object -> object)
+        return np.concatenate(parts)
+
+    def to_frame(self) -> pd.DataFrame:
+        # Dibangun posisional agar nama kolom duplikat (SELECT a.x, b.x) tidak saling menimpa
+        arrays = {i: self._column_array(parts) for i, parts in enumerate(self._parts)}
+        self._parts = [[] for _ in self.columns]
+        frame = pd.DataFrame(arrays, copy=False)
+        frame.columns = self.columns
+        return frame
+
+def build_frame(rows: list, columns: List[str], kinds: List[str]) -> pd.DataFrame:
+    """Shortcut: satu batch rows -> DataFrame kolumnar"""
+    builder = ColumnarBuilder(columns, kinds)
+    builder.append(rows)
+    return builder.to_frame()
+
+def build_arrays(rows: list, columns: List[str], kinds: List[str]) -> Dict[str, np.ndarray]:
+    """Shortcut: satu batch rows -> dict-of-arrays"""
+    builder = ColumnarBuilder(columns, kinds)
+    builder.append(rows)
+    return builder.to_arrays()
@@ -4,7 +4,7 @@
 import os
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Dict
+from typing import Dict, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +24,13 @@ class Config:
     MODEL_TEMPERATURE: float = float(os.getenv("MODEL_TEMPERATURE", "0.7"))
     MODEL_MAX_TOKEN: int = int(os.getenv("MODEL_MAX_TOKEN", "512"))
     
+    # --- LLM Response Cache (SQLite di DATA_DIR, per call_type; "answer" = jawaban naratif) ---
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_CALL_TYPES: str = os.getenv("LLM_CACHE_CALL_TYPES", "sql_generation,table_selection")
+    LLM_CACHE_TTL_HOURS: float = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))  # 0 = tanpa TTL
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    LLM_BATCH_CONCURRENCY: int = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))  # request paralel di LLMClient.batch
+
     # --- Web Search (Tavily) ---
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
     TAVILY_MAX_RESULTS: int = int(os.getenv("TAVILY_MAX_RESULTS", "3"))
@@ -33,7 +40,82 @@ class Config:
     METADATA_FOLDER: str = os.getenv("METADATA_DIR_NAME", "metadata")
     LOG_FOLDER: str = os.getenv("LOG_DIR_NAME", "logs")
     DATA_FOLDER: str = os.getenv("DATA_DIR_NAME", "data")
-    
+
+    # --- Database Connection Pool ---
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_POOL_IDLE_TIMEOUT: float = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # detik
+    DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(64 * 1024 * 1024)))  # bytes
+    DB_CACHE_SIZE_KB: int = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+    # Replica in-memory (opt-in): semua read dilayani dari RAM, di-refresh saat file berubah
+    DB_IN_MEMORY: bool = os.getenv("DB_IN_MEMORY", "false").lower() == "true"
+    DB_REPLICA_CHECK_INTERVAL: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "2"))  # detik
+    # Row security (opt-in): tabel ber-kolom region dibaca lewat temp view region USER_CONTEXT env.
+    # Defense in depth: SQLPipeline tetap menyisipkan filter :region_prefix region request
+    DB_ROW_SECURITY: bool = os.getenv("DB_ROW_SECURITY", "false").lower() == "true"
+    DB_ROW_SECURITY_COLUMN: str = os.getenv("DB_ROW_SECURITY_COLUMN", "region")
+    DB_ROW_SECURITY_LEVELDATA: bool = os.getenv("DB_ROW_SECURITY_LEVELDATA", "false").lower() == "true"
+
+    # --- Query Result Cache ---
+    QUERY_CACHE_ENABLED: bool = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+    QUERY_CACHE_MAX_ENTRIES: int = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+    QUERY_CACHE_MAX_BYTES: int = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # --- Streaming Execution ---
+    SQL_FETCH_CHUNK_SIZE: int = int(os.getenv("SQL_FETCH_CHUNK_SIZE", "1000"))
+    RESULT_HEAD_ROWS: int = int(os.getenv("RESULT_HEAD_ROWS", "10"))
+    COLUMNAR_FETCH: bool = os.getenv("COLUMNAR_FETCH", "true").lower() == "true"
+
+    # --- Result Spill (Parquet di DATA_DIR, butuh pyarrow; 0 = tanpa batas) ---
+    RESULT_SPILL_ENABLED: bool = os.getenv("RESULT_SPILL_ENABLED", "true").lower() == "true"
+    RESULT_MAX_ROWS: int = int(os.getenv("RESULT_MAX_ROWS", "5000"))
+    RESULT_MAX_BYTES: int = int(os.getenv("RESULT_MAX_BYTES", str(16 * 1024 * 1024)))
+    RESULT_PAGE_SIZE: int = int(os.getenv("RESULT_PAGE_SIZE", "50"))
+    RESULT_SPILL_TTL_HOURS: float = float(os.getenv("RESULT_SPILL_TTL_HOURS", "24"))
+
+    # --- Query Budget (0 = tanpa batas) ---
+    QUERY_TIMEOUT_SECONDS: float = float(os.getenv("QUERY_TIMEOUT_SECONDS", "15"))
+    QUERY_MAX_VM_STEPS: int = int(os.getenv("QUERY_MAX_VM_STEPS", "0"))
+    QUERY_PROGRESS_INTERVAL: int = int(os.getenv("QUERY_PROGRESS_INTERVAL", "1000"))
+
+    # --- Slow Query Log & Cost Guard ---
+    SLOW_QUERY_LOG_ENABLED: bool = os.getenv("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+    QUERY_COST_GUARD: str = os.getenv("QUERY_COST_GUARD", "off").lower()  # off | reject | rewrite
+    QUERY_COST_GUARD_MIN_ROWS: int = int(os.getenv("QUERY_COST_GUARD_MIN_ROWS", "50000"))
+
+    # --- Rollup Tables (year x region x leveldata) ---
+    ROLLUP_REWRITE_ENABLED: bool = os.getenv("ROLLUP_REWRITE_ENABLED", "true").lower() == "true"
+    ROLLUP_TABLE_NAMES: str = os.getenv(
+        "ROLLUP_TABLES",
+        "ref_mkt_bps_jumlah_penduduk,ref_mkt_bps_umr,ref_mkt_bps_produk_domestik_reg_bruto"
+    )
+
+    # --- Metadata Retrieval (heuristic = skor substring lama | bm25 = sparse BM25, index di DATA_DIR) ---
+    METADATA_RETRIEVAL: str = os.getenv("METADATA_RETRIEVAL", "heuristic").lower()
+    METADATA_BM25_K1: float = float(os.getenv("METADATA_BM25_K1", "1.2"))
+    METADATA_BM25_B: float = float(os.getenv("METADATA_BM25_B", "0.75"))
+    METADATA_SNAPSHOT: bool = os.getenv("METADATA_SNAPSHOT", "true").lower() == "true"
+    METADATA_RELOAD_INTERVAL: float = float(os.getenv("METADATA_RELOAD_INTERVAL", "5"))  # detik, 0 = nonaktif
+    # Profiler metadata dari database.db (maintenance.py profile)
+    METADATA_PROFILE_WORKERS: int = int(os.getenv("METADATA_PROFILE_WORKERS", "4"))
+    METADATA_PROFILE_MAX_VALUES: int = int(os.getenv("METADATA_PROFILE_MAX_VALUES", "100"))
+
+    # --- Entity Index (FTS5 nilai distinct kolom kategorikal, DATA_DIR/entity_index.db) ---
+    ENTITY_INDEX_ENABLED: bool = os.getenv("ENTITY_INDEX_ENABLED", "true").lower() == "true"
+    ENTITY_COLUMN_NAMES: str = os.getenv(
+        "ENTITY_COLUMNS",
+        "area,region,leveldata,category,subcategory,agegroup,urban_rural_commodity"
+    )
+    ENTITY_MAX_HITS: int = int(os.getenv("ENTITY_MAX_HITS", "10"))
+    # Kolom selektif yang boleh dipasang SQLPipeline sebagai predikat wajib (hanya jika tepat satu nilai cocok);
+    # entitas lain (category, subcategory, ...) hanya diberikan ke LLM lewat prompt
+    ENTITY_FILTER_COLUMN_NAMES: str = os.getenv("ENTITY_FILTER_COLUMNS", "area")
+
+    # --- Schema Prompt (kolom dipangkas sesuai pertanyaan agar muat di token budget) ---
+    SCHEMA_PROMPT_PRUNING: bool = os.getenv("SCHEMA_PROMPT_PRUNING", "true").lower() == "true"
+    SCHEMA_PROMPT_TOKEN_BUDGET: int = int(os.getenv("SCHEMA_PROMPT_TOKEN_BUDGET", "350"))  # kolom + example data, 0 = tanpa batas
+
     # --- Forecasting Config ---
     MIN_DATA_POINTS: int = int(os.getenv("MIN_DATA_POINTS", "3"))
     DEFAULT_FORECAST_PERIODS: int = int(os.getenv("DEFAULT_FORECAST_PERIODS", "3"))
@@ -56,6 +138,22 @@ class Config:
         subfolder = os.getenv("ACTIVE_METADATA_SUBFOLDER", "")
         return self.BASE_DIR / self.METADATA_FOLDER / subfolder
 
+    @property
+    def ROLLUP_TABLES(self) -> List[str]:
+        return [t.strip() for t in self.ROLLUP_TABLE_NAMES.split(",") if t.strip()]
+
+    @property
+    def LLM_CACHE_TYPES(self) -> List[str]:
+        return [t.strip() for t in self.LLM_CACHE_CALL_TYPES.split(",") if t.strip()]
+
+    @property
+    def ENTITY_COLUMNS(self) -> List[str]:
+        return [c.strip() for c in self.ENTITY_COLUMN_NAMES.split(",") if c.strip()]
+
+    @property
+    def ENTITY_FILTER_COLUMNS(self) -> List[str]:
+        return [c.strip() for c in self.ENTITY_FILTER_COLUMN_NAMES.split(",") if c.strip()]
+
     USER_CONTEXT: Dict[str, str] = field(default_factory=dict)
     
     @classmethod
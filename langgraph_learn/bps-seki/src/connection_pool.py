@@ -0,0 +1,254 @@
+# src/connection_pool.py
+"""Thread-safe SQLite connection pool (read-only, read-optimized)"""
+
+import sqlite3
+import threading
+import time
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .config import config
+from .logger import AuditLogger
+from .memory_replica import get_replica_if_enabled
+from .row_security import create_region_views, make_authorizer
+
+logger = AuditLogger()
+
+class ConnectionPool:
+    """Pool koneksi SQLite read-only yang dipakai bersama oleh semua SQLExecutor"""
+
+    # Query yang dijalankan saat koneksi dibuat agar statement cache & schema sudah "hangat"
+    WARMUP_STATEMENTS = [
+        "SELECT name FROM sqlite_master WHERE type='table' LIMIT 1;",
+        "SELECT name, sql FROM sqlite_master WHERE type='table';",
+    ]
+
+    def __init__(self, db_path: Path, max_size: int = None, idle_timeout: float = None, replica=None):
+        self.db_path = Path(db_path)
+        # MemoryReplica opsional: koneksi dibuka ke salinan RAM, bukan ke file
+        self.replica = replica
+        self._generations: Dict[sqlite3.Connection, int] = {}
+        self.max_size = max_size or config.DB_POOL_SIZE
+        self.idle_timeout = idle_timeout if idle_timeout is not None else config.DB_POOL_IDLE_TIMEOUT
+
+        self._idle = deque()  # isi: (connection, last_used)
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._in_use = 0
+
+        self.stats = {
+            "hits": 0,       # koneksi diambil dari idle pool
+            "misses": 0,     # koneksi baru dibuat
+            "created": 0,
+            "closed": 0,
+            "waits": 0,      # caller harus menunggu karena pool penuh
+            "statement_hits": 0,    # teks SQL sudah pernah di-prepare (bisa diambil dari statement cache)
+            "statement_misses": 0,
+            "protected_tables": 0   # tabel yang dibaca lewat temp view region (DB_ROW_SECURITY)
+        }
+        # LRU teks SQL seukuran statement cache sqlite3 (perkiraan reuse prepared statement)
+        self._statements = OrderedDict()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Buka koneksi read-only via URI dan set pragma untuk beban baca"""
+        options = {
+            "check_same_thread": False,  # koneksi berpindah thread antar request Streamlit
+            "cached_statements": config.DB_STATEMENT_CACHE_SIZE
+        }
+
+        if self.replica is not None:
+            conn, generation = self.replica.connect(**options)
+            with self._lock:
+                self._generations[conn] = generation
+        else:
+            uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, **options)
+
+        cursor = conn.cursor()
+        if self.replica is None:
+            cursor.execute(f"PRAGMA mmap_size = {int(config.DB_MMAP_SIZE)};")
+            # Nilai negatif = ukuran dalam KiB
+            cursor.execute(f"PRAGMA cache_size = -{int(config.DB_CACHE_SIZE_KB)};")
+        cursor.execute("PRAGMA temp_store = MEMORY;")
+        # Temp view region dibuat sekali per koneksi, sebelum koneksi dikunci read-only
+        protected = create_region_views(conn) if config.DB_ROW_SECURITY else set()
+        cursor.execute("PRAGMA query_only = ON;")
+
+        for statement in self.WARMUP_STATEMENTS:
+            cursor.execute(statement).fetchall()
+        cursor.close()
+
+        # Authorizer terakhir: setelah ini tulis / DDL / ATTACH / PRAGMA tulis ditolak oleh engine
+        conn.set_authorizer(make_authorizer(protected))
+        with self._lock:
+            self.stats["protected_tables"] = len(protected)
+
+        return conn
+
+    def note_statement(self, sql: str):
+        """Catat teks SQL yang dieksekusi untuk metrik reuse statement (SQL dengan bound params = teks sama)"""
+        with self._lock:
+            if sql in self._statements:
+                self._statements.move_to_end(sql)
+                self.stats["statement_hits"] += 1
+                return
+            self.stats["statement_misses"] += 1
+            self._statements[sql] = True
+            if len(self._statements) > config.DB_STATEMENT_CACHE_SIZE:
+                self._statements.popitem(last=False)
+
+    def _is_stale(self, conn: sqlite3.Connection) -> bool:
+        """Koneksi ke generasi replica lama (dipanggil dengan lock)"""
+        return self.replica is not None and not self.replica.is_current(self._generations.get(conn))
+
+    def _prune_idle(self) -> list:
+        """Ambil koneksi idle yang sudah melewati idle_timeout (dipanggil dengan lock)"""
+        if not self.idle_timeout:
+            return []
+
+        now = time.monotonic()
+        expired = []
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            expired.append(self._idle.popleft()[0])
+        return expired
+
+    def acquire(self, timeout: float = None) -> sqlite3.Connection:
+        """Ambil koneksi dari pool (atau buat baru jika belum penuh)"""
+        deadline = time.monotonic() + timeout if timeout else None
+
+        if self.replica is not None:
+            self.replica.maybe_refresh()
+
+        with self._available:
+            expired = self._prune_idle()
+
+            while True:
+                if self._idle:
+                    # LIFO: koneksi terakhir dipakai punya page cache paling hangat
+                    conn, _ = self._idle.pop()
+                    if self._is_stale(conn):
+                        expired.append(conn)
+                        continue
+                    self._in_use += 1
+                    self.stats["hits"] += 1
+                    break
+
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    self.stats["misses"] += 1
+                    conn = None
+                    break
+
+                self.stats["waits"] += 1
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise sqlite3.OperationalError("Connection pool exhausted (timeout)")
+                self._available.wait(remaining)
+
+        self._close_all(expired)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._available:
+                    self._in_use -= 1
+                    self._available.notify()
+                raise
+            with self._lock:
+                self.stats["created"] += 1
+
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False):
+        """Kembalikan koneksi ke pool"""
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        with self._available:
+            self._in_use -= 1
+            discard = discard or self._is_stale(conn)
+            if not discard:
+                self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+        if discard:
+            self._close_all([conn])
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """Context manager: `with pool.connection() as conn: ...`"""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            # Koneksi yang rusak (misal file db diganti) jangan dikembalikan ke pool;
+            # penolakan authorizer (SQLITE_AUTH) bukan kerusakan koneksi
+            discard = not isinstance(e, sqlite3.OperationalError) and getattr(e, "sqlite_errorname", None) != "SQLITE_AUTH"
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def _close_all(self, connections: list):
+        for conn in connections:
+            with self._lock:
+                self._generations.pop(conn, None)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        if connections:
+            with self._lock:
+                self.stats["closed"] += len(connections)
+
+    def close(self):
+        """Tutup semua koneksi idle"""
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        self._close_all(idle)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistik pool (hit/miss, ukuran)"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            statements = self.stats["statement_hits"] + self.stats["statement_misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / total if total else 0.0,
+                "statement_hit_rate": self.stats["statement_hits"] / statements if statements else 0.0,
+                "distinct_statements": len(self._statements),
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "idle_timeout": self.idle_timeout,
+                "replica": self.replica.get_stats() if self.replica is not None else None
+            }
+
+# Registry pool per file database (dipakai bersama oleh semua instance SQLExecutor)
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: Path) -> ConnectionPool:
+    """Ambil (atau buat) pool untuk file database tertentu"""
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(Path(db_path), replica=get_replica_if_enabled(Path(db_path)))
+            _pools[key] = pool
+            logger.log("DB_POOL_CREATED", {
+                "db_path": key,
+                "in_memory": pool.replica is not None,
+                "max_size": pool.max_size,
+                "idle_timeout": pool.idle_timeout,
+                "message": f"Connection pool created for {key}"
+            })
+        return pool
@@ -0,0 +1,230 @@
+# src/entity_index.py
+"""Index nilai distinct kolom kategorikal (FTS5) untuk mengenali entitas di pertanyaan user"""
+
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+TABLE_PREFIX = "ref_mkt_"
+VERSION_COLUMN = "job_insertdate"
+ENTITY_BOOST = 5.0  # tambahan relevance_score untuk tabel yang memuat entitas yang disebut user
+MAX_CANDIDATES = 500  # kandidat FTS yang diverifikasi per lookup
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+_ALPHA_RE = re.compile(r"[a-z]")
+
+def _words(text: str) -> List[str]:
+    """Tokenisasi sama dengan FTS5 unicode61: lowercase, pecah di non-alfanumerik"""
+    return _WORD_RE.findall(str(text).lower())
+
+class EntityIndex:
+    """
+    FTS5 `entity_values(value, table_name, column_name)` di DATA_DIR/entity_index.db
+    (file terpisah: database.db dibuka read-only oleh aplikasi).
+
+    Lookup = satu query MATCH berisi kata-kata pertanyaan, lalu kandidat diverifikasi:
+    kata-kata nilai harus muncul berurutan di pertanyaan. "Kabupaten Bogor" -> area BOGOR,
+    tetapi tidak KOTA BOGOR; nilai yang kata-katanya subset dari hit lain dibuang.
+    Refresh incremental per tabel berdasarkan (row_count, MAX(job_insertdate)).
+    """
+
+    def __init__(self, db_path: Path = None, index_path: Path = None, columns: List[str] = None):
+        self.db_path = Path(db_path or config.DB_PATH)
+        self.index_path = Path(index_path or config.DATA_DIR / "entity_index.db")
+        self.columns = [c.lower() for c in (columns or config.ENTITY_COLUMNS)]
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect_index(self) -> sqlite3.Connection:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, isolation_level=None, check_same_thread=False)
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS entity_values USING fts5(
+                value, table_name UNINDEXED, column_name UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entity_sources (
+                table_name TEXT PRIMARY KEY,
+                row_count INTEGER,
+                source_insertdate TEXT,
+                value_count INTEGER,
+                indexed_at TEXT NOT NULL
+            );
+        """)
+        return conn
+
+    # ---------- Build / refresh ----------
+
+    def refresh(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Index ulang tabel yang berubah (atau semua jika force); tabel yang hilang dihapus dari index"""
+        report = []
+        source = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+        index = self._connect_index()
+        try:
+            tables = [row[0] for row in source.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ORDER BY name;",
+                (f"{TABLE_PREFIX}%",)
+            ).fetchall()]
+            indexed = {row[0]: (row[1], row[2]) for row in index.execute(
+                "SELECT table_name, row_count, source_insertdate FROM entity_sources;"
+            ).fetchall()}
+
+            for table in tables:
+                names = [row[1] for row in source.execute(f'PRAGMA table_info("{table}");').fetchall()]
+                columns = [c for c in names if c.lower() in self.columns]
+                if not columns:
+                    continue
+                version = f'MAX("{VERSION_COLUMN}")' if VERSION_COLUMN in names else "NULL"
+                fingerprint = source.execute(f'SELECT COUNT(*), {version} FROM "{table}";').fetchone()
+                if not force and indexed.get(table) == tuple(fingerprint):
+                    report.append({"table": table, "status": "fresh"})
+                    continue
+                report.append(self._index_table(source, index, table, columns, fingerprint))
+
+            for table in set(indexed) - set(tables):
+                index.execute("BEGIN;")
+                index.execute("DELETE FROM entity_values WHERE table_name = ?;", (table,))
+                index.execute("DELETE FROM entity_sources WHERE table_name = ?;", (table,))
+                index.execute("COMMIT;")
+                report.append({"table": table, "status": "removed"})
+        finally:
+            source.close()
+            index.close()
+
+        self._ready = True
+        logger.log("ENTITY_INDEX_REFRESH", {
+            "index_path": str(self.index_path),
+            "indexed": [r["table"] for r in report if r["status"] == "indexed"],
+            "fresh": sum(1 for r in report if r["status"] == "fresh"),
+            "removed": [r["table"] for r in report if r["status"] == "removed"]
+        })
+        return report
+
+    @staticmethod
+    def _index_table(source: sqlite3.Connection, index: sqlite3.Connection, table: str,
+                     columns: List[str], fingerprint: tuple) -> Dict[str, Any]:
+        rows = []
+        for column in columns:
+            rows += [(str(value), table, column) for (value,) in source.execute(
+                f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL;'
+            ).fetchall() if str(value).strip()]
+
+        index.execute("BEGIN;")
+        try:
+            index.execute("DELETE FROM entity_values WHERE table_name = ?;", (table,))
+            index.executemany("INSERT INTO entity_values (value, table_name, column_name) VALUES (?, ?, ?);", rows)
+            index.execute(
+                "INSERT OR REPLACE INTO entity_sources VALUES (?, ?, ?, ?, ?);",
+                (table, fingerprint[0], fingerprint[1], len(rows), datetime.now().isoformat(timespec="seconds"))
+            )
+            index.execute("COMMIT;")
+        except sqlite3.Error:
+            index.execute("ROLLBACK;")
+            raise
+        return {"table": table, "status": "indexed", "columns": columns, "values": len(rows)}
+
+    def _ensure_ready(self) -> bool:
+        """Bangun index sekali jika file belum ada; refresh berikutnya lewat `maintenance.py entities`"""
+        if self._ready:
+            return True
+        with self._lock:
+            if self._ready:
+                return True
+            try:
+                if self.index_path.exists():
+                    self._ready = True
+                else:
+                    self.refresh()
+            except sqlite3.Error as e:
+                logger.log("ENTITY_INDEX_ERROR", {"index_path": str(self.index_path), "error": str(e)}, level="ERROR")
+        return self._ready
+
+    # ---------- Lookup ----------
+
+    def lookup(self, text: str, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Entitas yang disebut di `text`: [{"value", "table", "column"}], urut dari
+        nilai terpanjang. Satu query FTS5 (indexed), tanpa LLM.
+        """
+        limit = limit or config.ENTITY_MAX_HITS
+        query_words = _words(text)
+        if not query_words or not self._ensure_ready():
+            return []
+        phrase = f" {' '.join(query_words)} "
+
+        start = time.perf_counter()
+        match = " OR ".join(f'"{w}"' for w in sorted(set(query_words)))
+        conn = sqlite3.connect(f"{self.index_path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            candidates = conn.execute(
+                "SELECT value, table_name, column_name FROM entity_values WHERE entity_values MATCH ? "
+                "ORDER BY rank LIMIT ?;", (match, MAX_CANDIDATES)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.log("ENTITY_INDEX_ERROR", {"index_path": str(self.index_path), "error": str(e)}, level="ERROR")
+            return []
+        finally:
+            conn.close()
+
+        hits = []
+        for value, table, column in candidates:
+            words = _words(value)
+            # Kata nilai harus muncul berurutan di pertanyaan; angka tunggal (kode) bukan entitas
+            if not words or (len(words) == 1 and not _ALPHA_RE.search(words[0])):
+                continue
+            if f" {' '.join(words)} " in phrase:
+                hits.append({"value": value, "table": table, "column": column, "words": frozenset(words)})
+
+        # Buang nilai yang kata-katanya subset dari hit lain ("BOGOR" kalah oleh "KOTA BOGOR")
+        hits = [h for h in hits if not any(h["words"] < other["words"] for other in hits)]
+        hits.sort(key=lambda h: (-len(h["words"]), h["value"], h["table"], h["column"]))
+        # Batas berlaku per nilai distinct, bukan per tabel (satu area ada di banyak tabel)
+        values = []
+        for h in hits:
+            if h["value"] not in values:
+                values.append(h["value"])
+        hits = [h for h in hits if h["value"] in values[:limit]]
+
+        logger.log("ENTITY_LOOKUP", {
+            "query": text,
+            "candidates": len(candidates),
+            "hits": [(h["value"], h["table"], h["column"]) for h in hits],
+            "time_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+        return [{key: h[key] for key in ("value", "table", "column")} for h in hits]
+
+def entity_filters(hits: List[Dict[str, Any]], table: str, exclude: List[Optional[str]] = ()) -> Dict[str, List[str]]:
+    """Hit untuk satu tabel -> {kolom: [nilai]} (kolom di `exclude`, mis. access column, dilewati)"""
+    excluded = {c.lower() for c in exclude if c}
+    filters: Dict[str, List[str]] = {}
+    for hit in hits or []:
+        if hit["table"] == table and hit["column"].lower() not in excluded:
+            values = filters.setdefault(hit["column"], [])
+            if hit["value"] not in values:
+                values.append(hit["value"])
+    return filters
+
+# Registry index per file database
+_indexes: Dict[str, EntityIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_entity_index(db_path: Path = None) -> EntityIndex:
+    """Ambil (atau buat) EntityIndex untuk file database tertentu"""
+    key = str(Path(db_path or config.DB_PATH).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = EntityIndex(Path(key))
+            _indexes[key] = index
+        return index
@@ -3,12 +3,15 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime, timedelta
 
 from .config import config
 from .logger import AuditLogger
 from .sql_executor import SQLExecutor
+from .query_guard import CancelToken
+from .sql_validator import SQLValidator
+from .catalog import TableMeta, as_table_meta
 
 logger = AuditLogger()
 sql_executor = SQLExecutor()
@@ -17,43 +20,19 @@ class ForecastAgent:
     """Basic forecasting agent"""
     
     @staticmethod
-    def detect_time_series_columns(metadata: Dict) -> Dict[str, str]:
-        """Deteksi kolom tanggal dan nilai dari metadata"""
-        columns = metadata.get("columns", {})
+    def detect_time_series_columns(metadata: Union[TableMeta, Dict]) -> Dict[str, str]:
+        """Deteksi kolom tanggal dan nilai dari metadata (flag peran kolom dihitung saat kompilasi katalog)"""
+        table = as_table_meta(metadata)
         
-        date_keywords = ['tahun', 'year', 'bulan', 'month', 'tanggal', 'date', 'periode', 'waktu']
-        value_keywords = ['nilai', 'value', 'jumlah', 'total', 'devisa', 'pendapatan', 'qty', 'quantity', 'volume', 'harga', 'price']
-        
-        date_candidates = []
-        value_candidates = []
-        
-        for col_name, col_info in columns.items():
-            col_lower = col_name.lower()
-            # Handle jika col_info string atau dict
-            col_type = str(col_info.get("type", "")).lower() if isinstance(col_info, dict) else "string"
-            
-            # Deteksi kolom tanggal
-            is_date = any(keyword in col_lower for keyword in date_keywords)
-            is_date = is_date or col_type in ['date', 'datetime', 'timestamp', 'year', 'month']
-            
-            # Deteksi kolom nilai
-            is_value = any(keyword in col_lower for keyword in value_keywords)
-            is_value = is_value or col_type in ['integer', 'int', 'float', 'double', 'decimal', 'numeric', 'number']
-            
-            if is_date:
-                score = sum(1 for keyword in date_keywords if keyword in col_lower)
-                date_candidates.append((col_name, score))
-            
-            if is_value:
-                score = sum(1 for keyword in value_keywords if keyword in col_lower)
-                value_candidates.append((col_name, score))
+        date_candidates = [(c.name, c.date_score) for c in table.columns if c.is_date]
+        value_candidates = [(c.name, c.value_score) for c in table.columns if c.is_value]
         
         # Pilih kolom dengan score tertinggi
         date_col = max(date_candidates, key=lambda x: x[1])[0] if date_candidates else None
         value_col = max(value_candidates, key=lambda x: x[1])[0] if value_candidates else None
         
         # Fallback logic
-        col_keys = list(columns.keys())
+        col_keys = table.column_names
         if not date_col and col_keys:
             date_col = col_keys[0]
         
@@ -193,9 +172,10 @@ class EnhancedForecastAgent(ForecastAgent):
     def __init__(self, llm_client):
         self.llm_client = llm_client
     
-    def enhanced_forecast(self, table_name: str, metadata: Dict, 
-                          region: str = None, user_query: str = None) -> Dict[str, Any]:
-        """Orchestrator untuk forecasting"""
+    def enhanced_forecast(self, table_name: str, metadata: Union[TableMeta, Dict], 
+                          region: str = None, user_query: str = None,
+                          cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Orchestrator untuk forecasting (cancel_token: CancelToken request, diteruskan ke sql_executor)"""
         
         logger.log("ENHANCED_FORECAST_START", {
             "table": table_name,
@@ -203,7 +183,8 @@ class EnhancedForecastAgent(ForecastAgent):
         })
         
         # 1. Deteksi Kolom
-        columns = self.detect_time_series_columns(metadata)
+        table = as_table_meta(metadata, table_name)
+        columns = self.detect_time_series_columns(table)
         if not columns.get("date_column") or not columns.get("value_column"):
             return {
                 "success": False, 
@@ -212,15 +193,20 @@ class EnhancedForecastAgent(ForecastAgent):
             
         # 2. Ambil Data via SQL
         sql = f"SELECT {columns['date_column']}, {columns['value_column']} FROM {table_name}"
+        params = {}
         
-        access_column = metadata.get("access_column")
+        access_column = table.access_column
         if access_column and region:
-            sql += f" WHERE {access_column} LIKE '{region}%'"
+            # Region sebagai bound parameter agar statement sama untuk semua region
+            sql += f" WHERE {access_column} LIKE :{SQLValidator.REGION_PARAM}"
+            params[SQLValidator.REGION_PARAM] = f"{region}%"
             
         sql += f" ORDER BY {columns['date_column']}"
         
-        result = sql_executor.execute(sql)
+        result = sql_executor.execute(sql, params or None, spill=False, cancel_token=cancel_token)
         
+        if not result["success"] and result.get("error_type"):
+            return result  # timeout / cost_guard / not_authorized: detail diteruskan ke error_handler
         if not result["success"] or "data" not in result:
              return {"success": False, "error": "Gagal mengambil data dari database."}
              
@@ -0,0 +1,256 @@
+# src/index_advisor.py
+"""Index & statistics advisor berbasis query yang tercatat di audit log"""
+
+import json
+import re
+import sqlite3
+import time
+from collections import defaultdict, Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+_IDENT = r'["`\[]?([A-Za-z_][A-Za-z0-9_]*)["`\]]?'
+_FROM_RE = re.compile(rf"\bfrom\s+{_IDENT}", re.IGNORECASE)
+_CLAUSE_END_RE = re.compile(r"\b(group\s+by|order\s+by|limit|having|union)\b", re.IGNORECASE)
+_WHERE_RE = re.compile(r"\bwhere\b", re.IGNORECASE)
+_EQ_RE = re.compile(rf"{_IDENT}\s*(?:=|==|\bis\b)\s*(?!\s*[A-Za-z_]+\s*\()", re.IGNORECASE)
+_IN_RE = re.compile(rf"{_IDENT}\s+in\s*\(", re.IGNORECASE)
+_LIKE_RE = re.compile(rf"{_IDENT}\s+like\s+(?:'([^'%_]+)%'|[?:@$])", re.IGNORECASE)
+_RANGE_RE = re.compile(rf"{_IDENT}\s*(?:>=|<=|<>|>|<|\bbetween\b)", re.IGNORECASE)
+_ORDER_GROUP_RE = re.compile(r"\b(?:order|group)\s+by\s+(.+?)(?=\b(?:order\s+by|limit|having)\b|;|$)",
+                             re.IGNORECASE | re.DOTALL)
+_SELECT_RE = re.compile(r"^\s*select\s+(?:distinct\s+)?(.+?)\s+from\b", re.IGNORECASE | re.DOTALL)
+
+class IndexAdvisor:
+    """Usulkan & buat index komposit/covering dari query log, lalu jalankan ANALYZE"""
+
+    def __init__(self, db_path: Optional[Path] = None, log_dir: Optional[Path] = None):
+        self.db_path = Path(db_path or config.DB_PATH)
+        self.log_dir = Path(log_dir or config.LOG_DIR)
+        self._columns_cache: Dict[str, Dict[str, str]] = {}
+
+    # ---------- Query mining ----------
+
+    def load_logged_queries(self) -> List[Dict[str, Any]]:
+        """Ambil SQL unik dari event SQL_EXECUTION_SUCCESS di audit log (beserta frekuensinya)"""
+        counts = Counter()
+        params_by_sql = {}
+
+        for log_file in sorted(self.log_dir.glob("audit_*.jsonl")):
+            with open(log_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("event_type") != "SQL_EXECUTION_SUCCESS" or not entry.get("sql_preview"):
+                        continue
+                    sql = entry["sql_preview"].strip()
+                    counts[sql] += 1
+                    if entry.get("params") is not None:
+                        params_by_sql[sql] = entry["params"]
+
+        return [
+            {"sql": sql, "params": params_by_sql.get(sql), "count": count}
+            for sql, count in counts.most_common()
+        ]
+
+    # ---------- Query analysis ----------
+
+    def _table_columns(self, conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+        if table not in self._columns_cache:
+            rows = conn.execute(f"PRAGMA table_info({table});").fetchall()
+            self._columns_cache[table] = {row[1].lower(): row[1] for row in rows}
+        return self._columns_cache[table]
+
+    @staticmethod
+    def _where_clause(sql: str) -> str:
+        match = _WHERE_RE.search(sql)
+        if not match:
+            return ""
+        rest = sql[match.end():]
+        end = _CLAUSE_END_RE.search(rest)
+        return rest[:end.start()] if end else rest
+
+    def analyze_query(self, conn: sqlite3.Connection, sql: str) -> Optional[Dict[str, Any]]:
+        """Ekstrak tabel, kolom equality, kolom prefix-LIKE/range, ORDER/GROUP BY dan kolom SELECT"""
+        from_match = _FROM_RE.search(sql)
+        if not from_match:
+            return None
+
+        table = from_match.group(1)
+        columns = self._table_columns(conn, table)
+        if not columns:
+            return None
+
+        def known(names):
+            return [columns[n.lower()] for n in names if n.lower() in columns]
+
+        where = self._where_clause(sql)
+        equality = known(_EQ_RE.findall(where) + _IN_RE.findall(where))
+        like_prefix = known([m[0] for m in _LIKE_RE.findall(where)])
+        ranges = known(_RANGE_RE.findall(where))
+
+        ordering = []
+        for clause in _ORDER_GROUP_RE.findall(sql):
+            for part in clause.split(","):
+                name = part.strip().split()[0] if part.strip() else ""
+                ordering.extend(known([name.strip('"`[]')]))
+
+        selected = []
+        select_match = _SELECT_RE.search(sql)
+        if select_match and select_match.group(1).strip() != "*":
+            for part in select_match.group(1).split(","):
+                selected.extend(known(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", part)))
+
+        return {
+            "table": table,
+            "equality": list(dict.fromkeys(equality)),
+            "like_prefix": list(dict.fromkeys(like_prefix)),
+            "range": [c for c in dict.fromkeys(ranges) if c not in equality],
+            "ordering": list(dict.fromkeys(ordering)),
+            "selected": list(dict.fromkeys(selected)),
+        }
+
+    @staticmethod
+    def explain(conn: sqlite3.Connection, sql: str, params: Any = None) -> List[str]:
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}", params or ()).fetchall()
+            return [row[3] for row in rows]
+        except sqlite3.Error as e:
+            return [f"ERROR: {e}"]
+
+    @staticmethod
+    def measure(conn: sqlite3.Connection, sql: str, params: Any = None, repeats: int = 3) -> Optional[float]:
+        """Latency terbaik (ms) dari beberapa eksekusi"""
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            try:
+                conn.execute(sql, params or ()).fetchall()
+            except sqlite3.Error:
+                return None
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    # ---------- Index proposal ----------
+
+    def propose(self, conn: sqlite3.Connection, queries: List[Dict[str, Any]],
+                max_covering_columns: int = 5) -> List[Dict[str, Any]]:
+        """
+        Susun index komposit per pola query:
+        kolom equality dulu (paling sering dipakai), lalu satu kolom prefix-LIKE/range, lalu ORDER/GROUP BY.
+        Kolom prefix-LIKE memakai COLLATE NOCASE agar LIKE optimization SQLite aktif.
+        Jika total kolom kecil, kolom SELECT ditambahkan agar index menjadi covering.
+        """
+        usage = defaultdict(Counter)
+        patterns = {}
+
+        for query in queries:
+            info = self.analyze_query(conn, query["sql"])
+            if not info:
+                continue
+            for col in info["equality"] + info["like_prefix"] + info["range"]:
+                usage[info["table"]][col] += query["count"]
+            patterns.setdefault(info["table"], []).append((info, query["count"]))
+
+        proposals = {}
+        for table, infos in patterns.items():
+            for info, count in infos:
+                equality = sorted(info["equality"], key=lambda c: -usage[table][c])
+                trailing = (info["like_prefix"] + info["range"])[:1]
+                key_cols = equality + [c for c in trailing if c not in equality]
+                key_cols += [c for c in info["ordering"] if c not in key_cols and not trailing]
+                if not key_cols:
+                    continue
+
+                extra = [c for c in info["selected"] if c not in key_cols]
+                if extra and len(key_cols) + len(extra) <= max_covering_columns:
+                    key_cols = key_cols + extra
+
+                nocase = set(info["like_prefix"])
+                definition = ", ".join(f'"{c}" COLLATE NOCASE' if c in nocase else f'"{c}"' for c in key_cols)
+                name = "idx_" + table + "__" + "_".join(c.lower() for c in key_cols)
+                ddl = f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({definition});'
+
+                proposal = proposals.setdefault(name, {
+                    "name": name,
+                    "table": table,
+                    "columns": key_cols,
+                    "nocase_columns": sorted(nocase & set(key_cols)),
+                    "ddl": ddl,
+                    "query_count": 0
+                })
+                proposal["query_count"] += count
+
+        # Buang index yang merupakan prefix dari index lain di tabel yang sama
+        result = []
+        for proposal in proposals.values():
+            covered = any(
+                other is not proposal and other["table"] == proposal["table"]
+                and other["columns"][:len(proposal["columns"])] == proposal["columns"]
+                and other["nocase_columns"] == proposal["nocase_columns"]
+                for other in proposals.values()
+            )
+            if not covered:
+                result.append(proposal)
+
+        return sorted(result, key=lambda p: -p["query_count"])
+
+    # ---------- Run ----------
+
+    def run(self, apply: bool = False, queries: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analisis query log, usulkan index, (opsional) buat index + ANALYZE dan laporkan latency sebelum/sesudah"""
+        queries = queries if queries is not None else self.load_logged_queries()
+        if not queries:
+            logger.log("INDEX_ADVISOR", {
+                "status": "WARNING",
+                "message": f"No SQL_EXECUTION_SUCCESS events found in {self.log_dir}"
+            }, level="WARNING")
+            return {"queries": [], "proposals": [], "applied": False}
+
+        uri = f"{self.db_path.resolve().as_uri()}?mode={'rw' if apply else 'ro'}"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            report = []
+            for query in queries:
+                report.append({
+                    "sql": query["sql"],
+                    "count": query["count"],
+                    "plan_before": self.explain(conn, query["sql"], query.get("params")),
+                    "latency_before_ms": self.measure(conn, query["sql"], query.get("params")),
+                })
+
+            # Query yang gagal di-EXPLAIN (tabel/kolom sudah berubah) tidak ikut dianalisis
+            valid = [q for q, entry in zip(queries, report)
+                     if not any(step.startswith("ERROR:") for step in entry["plan_before"])]
+            proposals = self.propose(conn, valid)
+
+            if apply:
+                for proposal in proposals:
+                    conn.execute(proposal["ddl"])
+                # Isi sqlite_stat1 agar query planner tahu selektivitas index
+                conn.execute("ANALYZE;")
+                conn.commit()
+
+                for entry, query in zip(report, queries):
+                    entry["plan_after"] = self.explain(conn, query["sql"], query.get("params"))
+                    entry["latency_after_ms"] = self.measure(conn, query["sql"], query.get("params"))
+
+            logger.log("INDEX_ADVISOR", {
+                "status": "SUCCESS",
+                "applied": apply,
+                "query_count": len(queries),
+                "proposals": [p["ddl"] for p in proposals],
+                "message": f"{len(proposals)} index proposals ({'applied' if apply else 'dry run'})"
+            }, level="SUCCESS")
+
+            return {"queries": report, "proposals": proposals, "applied": apply}
+        finally:
+            conn.close()
@@ -0,0 +1,172 @@
+# src/llm_cache.py
+"""Cache respons LLM persisten (SQLite di DATA_DIR) untuk prompt yang berulang"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+def make_llm_key(deployment: str, api_version: str, temperature: Optional[float],
+                 max_tokens: Optional[int], prompt: str, extra: Dict[str, Any] = None) -> str:
+    """sha256 dari parameter yang menentukan output model + prompt"""
+    payload = json.dumps({
+        "deployment": deployment,
+        "api_version": api_version,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "extra": extra or {},
+        "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Tabel `llm_cache` di DATA_DIR/llm_cache.db (dipakai bersama antar proses, WAL).
+    Entry kedaluwarsa setelah ttl; jika jumlah entry > max_entries, entry dengan
+    last_access paling lama dihapus (LRU). Hanya call_type di config.LLM_CACHE_TYPES yang di-cache.
+    """
+
+    def __init__(self, path: Path = None, ttl_hours: float = None, max_entries: int = None):
+        self.path = Path(path or config.DATA_DIR / "llm_cache.db")
+        self.ttl_seconds = (ttl_hours if ttl_hours is not None else config.LLM_CACHE_TTL_HOURS) * 3600
+        self.max_entries = max_entries or config.LLM_CACHE_MAX_ENTRIES
+        self._conn = None
+        self._lock = threading.Lock()
+
+        # Counter proses ini; total lintas proses ada di kolom hits / latency_ms
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "saved_ms": 0.0
+        }
+
+    def enabled_for(self, call_type: str) -> bool:
+        return config.LLM_CACHE_ENABLED and call_type in config.LLM_CACHE_TYPES
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    call_type TEXT NOT NULL,
+                    deployment TEXT,
+                    content TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access);")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """{"content", "latency_ms"} jika hit, None jika miss / kedaluwarsa / cache error"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT content, latency_ms, created_at FROM llm_cache WHERE key = ?;", (key,)
+                ).fetchone()
+                if row is None:
+                    self.stats["misses"] += 1
+                    return None
+                content, latency_ms, created_at = row
+                if self.ttl_seconds > 0 and now - created_at > self.ttl_seconds:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?;", (key,))
+                    self.stats["expired"] += 1
+                    self.stats["misses"] += 1
+                    return None
+                conn.execute(
+                    "UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?;", (now, key)
+                )
+                self.stats["hits"] += 1
+                self.stats["saved_ms"] += latency_ms
+        except sqlite3.Error as e:
+            logger.log("LLM_CACHE_ERROR", {"path": str(self.path), "error": str(e)}, level="WARNING")
+            return None
+        return {"content": content, "latency_ms": latency_ms}
+
+    def put(self, key: str, call_type: str, deployment: str, content: str, latency_ms: float):
+        """Simpan respons sukses lalu evict entry LRU jika melebihi max_entries"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache "
+                    "(key, call_type, deployment, content, latency_ms, created_at, last_access, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0);",
+                    (key, call_type, deployment, content, latency_ms, now, now)
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM llm_cache;").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN "
+                        "(SELECT key FROM llm_cache ORDER BY last_access LIMIT ?);", (excess,)
+                    )
+                    self.stats["evictions"] += excess
+        except sqlite3.Error as e:
+            logger.log("LLM_CACHE_ERROR", {"path": str(self.path), "error": str(e)}, level="WARNING")
+
+    def purge_expired(self) -> int:
+        """Hapus semua entry yang melewati TTL, return jumlah yang dihapus"""
+        if self.ttl_seconds <= 0:
+            return 0
+        with self._lock:
+            cursor = self._connect().execute(
+                "DELETE FROM llm_cache WHERE created_at < ?;", (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM llm_cache;")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counter proses ini + ringkasan isi cache per call_type (hits & latency tersimpan sejak dibuat)"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            by_type = {}
+            try:
+                for call_type, entries, hits, saved_ms in self._connect().execute(
+                    "SELECT call_type, COUNT(*), SUM(hits), SUM(hits * latency_ms) FROM llm_cache GROUP BY call_type;"
+                ).fetchall():
+                    by_type[call_type] = {"entries": entries, "hits": hits, "saved_ms": round(saved_ms or 0.0, 2)}
+            except sqlite3.Error:
+                pass
+            return {
+                **self.stats,
+                "saved_ms": round(self.stats["saved_ms"], 2),
+                "hit_rate": self.stats["hits"] / total if total else 0.0,
+                "entries": sum(t["entries"] for t in by_type.values()),
+                "by_call_type": by_type,
+                "ttl_hours": self.ttl_seconds / 3600,
+                "max_entries": self.max_entries
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Cache LLM bersama (satu file per DATA_DIR)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
@@ -1,14 +1,17 @@
 # src/llm_client.py
 """LLM Client wrapper untuk Azure OpenAI dan LangChain"""
 
+import asyncio
 import os
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage, SystemMessage
 
 from .config import config
 from .logger import AuditLogger
+from .llm_cache import get_llm_cache, make_llm_key
 
 logger = AuditLogger()
 
@@ -19,6 +22,8 @@ class LLMClient:
         self.user_llm = None
         self.sql_llm = None
         self._initialized = False
+        # Parameter sampling per model (bagian dari cache key)
+        self._llm_params = {"user": (None, None), "sql": (None, None)}
         
     def initialize(self):
         """Initialize Azure OpenAI models"""
@@ -66,6 +71,10 @@ class LLMClient:
                 sql_kwargs["temperature"] = 0
             
             self.sql_llm = AzureChatOpenAI(**sql_kwargs)
+            self._llm_params = {
+                "user": (common_kwargs.get("temperature"), common_kwargs.get("max_tokens")),
+                "sql": (sql_kwargs.get("temperature"), sql_kwargs.get("max_tokens"))
+            }
             
             self._initialized = True
             print(f"✅ Azure OpenAI models initialized: {config.USER_MODEL}")
@@ -74,8 +83,65 @@ class LLMClient:
             print(f"❌ CRITICAL ERROR initializing Azure OpenAI: {str(e)}")
             raise
     
-    def call_user_llm(self, prompt: str, **kwargs) -> Dict[str, Any]:
-        """Panggil user LLM untuk general tasks"""
+    def _cache_lookup(self, llm_name: str, prompt: str, call_type: str,
+                      kwargs: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """(cache key, hasil cache) — key None jika call_type tidak di-opt-in (LLM_CACHE_TYPES)"""
+        cache = get_llm_cache()
+        if not cache.enabled_for(call_type):
+            return None, None
+        temperature, max_tokens = self._llm_params[llm_name]
+        key = make_llm_key(config.USER_MODEL, config.MODEL_VERSION, temperature, max_tokens, prompt, kwargs)
+        hit = cache.get(key)
+        if hit is None:
+            return key, None
+        logger.log("LLM_CACHE_HIT", {
+            "model": config.USER_MODEL,
+            "call_type": call_type,
+            "saved_ms": hit["latency_ms"]
+        })
+        return key, {"content": hit["content"], "cached": True, "latency_ms": 0.0}
+
+    @staticmethod
+    def _store(key: Optional[str], call_type: str, response: Any, latency_ms: float) -> Dict[str, Any]:
+        content_result = response.content if hasattr(response, 'content') else str(response)
+
+        # Respons kosong tidak di-cache (biasanya reasoning model kehabisan token)
+        if key is not None and content_result:
+            get_llm_cache().put(key, call_type, config.USER_MODEL, content_result, latency_ms)
+        return {"content": content_result, "cached": False, "latency_ms": latency_ms, "raw": response}
+
+    def _invoke(self, llm_name: str, prompt: str, call_type: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Invoke model (user/sql) lewat cache respons jika call_type di-opt-in.
+        Return {"content", "cached", "latency_ms"}; exception dari Azure diteruskan ke caller.
+        """
+        key, hit = self._cache_lookup(llm_name, prompt, call_type, kwargs)
+        if hit is not None:
+            return hit
+        llm = self.user_llm if llm_name == "user" else self.sql_llm
+        start = time.perf_counter()
+        response = llm.invoke(prompt, **kwargs)
+        return self._store(key, call_type, response, round((time.perf_counter() - start) * 1000, 2))
+
+    async def _ainvoke(self, llm_name: str, prompt: str, call_type: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Versi async dari _invoke (ainvoke: event loop tidak diblok selama round trip ke Azure).
+        Get/put cache SQLite (blocking, di bawah lock) dijalankan di thread pool via asyncio.to_thread.
+        """
+        key, hit = await asyncio.to_thread(self._cache_lookup, llm_name, prompt, call_type, kwargs)
+        if hit is not None:
+            return hit
+        llm = self.user_llm if llm_name == "user" else self.sql_llm
+        start = time.perf_counter()
+        response = await llm.ainvoke(prompt, **kwargs)
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        return await asyncio.to_thread(self._store, key, call_type, response, latency_ms)
+
+    def call_user_llm(self, prompt: str, call_type: str = "answer", **kwargs) -> Dict[str, Any]:
+        """
+        Panggil user LLM untuk general tasks.
+        call_type: "answer" (jawaban naratif, default tidak di-cache), "table_selection", dll.
+        """
         if not self._initialized:
             self.initialize()
         
@@ -83,13 +149,13 @@ class LLMClient:
             logger.log_llm_call(config.USER_MODEL, prompt, "Calling Azure...")
             
             # Gunakan invoke langsung
-            response = self.user_llm.invoke(prompt, **kwargs)
-            content_result = response.content if hasattr(response, 'content') else str(response)
+            result = self._invoke("user", prompt, call_type, kwargs)
+            content_result = result["content"]
 
             # Debugging jika kosong
             if not content_result:
                 print("⚠️ WARNING: LLM returned empty content!")
-                print(f"   Raw Response: {response}")
+                print(f"   Raw Response: {result.get('raw')}")
 
             logger.log_llm_call(
                 config.USER_MODEL, 
@@ -100,7 +166,9 @@ class LLMClient:
             return {
                 "success": True,
                 "content": content_result,
-                "model": config.USER_MODEL
+                "model": config.USER_MODEL,
+                "cached": result["cached"],
+                "latency_ms": result["latency_ms"]
             }
             
         except Exception as e:
@@ -117,7 +185,7 @@ class LLMClient:
                 "model": config.USER_MODEL
             }
     
-    def call_sql_llm(self, prompt: str, **kwargs) -> Dict[str, Any]:
+    def call_sql_llm(self, prompt: str, call_type: str = "sql_generation", **kwargs) -> Dict[str, Any]:
         """Panggil SQL LLM untuk SQL generation"""
         if not self._initialized:
             self.initialize()
@@ -125,8 +193,8 @@ class LLMClient:
         try:
             logger.log_llm_call(config.USER_MODEL, prompt, "Generating SQL...")
             
-            response = self.sql_llm.invoke(prompt, **kwargs)
-            content_result = response.content if hasattr(response, 'content') else str(response)
+            result = self._invoke("sql", prompt, call_type, kwargs)
+            content_result = result["content"]
             
             logger.log_llm_call(
                 config.USER_MODEL,
@@ -137,8 +205,75 @@ class LLMClient:
             return {
                 "success": True,
                 "content": content_result,
+                "model": config.USER_MODEL,
+                "cached": result["cached"],
+                "latency_ms": result["latency_ms"]
+            }
+            
+        except Exception as e:
+            logger.log("LLM_CALL_ERROR", {
+                "model": config.USER_MODEL,
+                "type": "SQL_GENERATION",
+                "error": str(e),
+                "prompt_preview": prompt[:100]
+            }, level="ERROR")
+            
+            return {
+                "success": False,
+                "error": str(e),
                 "model": config.USER_MODEL
             }
+    
+    # ---------- Async & batch ----------
+
+    async def acall_user_llm(self, prompt: str, call_type: str = "answer", **kwargs) -> Dict[str, Any]:
+        """Versi async dari call_user_llm (format hasil sama)"""
+        if not self._initialized:
+            self.initialize()
+        
+        try:
+            logger.log_llm_call(config.USER_MODEL, prompt, "Calling Azure (async)...")
+            result = await self._ainvoke("user", prompt, call_type, kwargs)
+            logger.log_llm_call(config.USER_MODEL, prompt, result["content"])
+            
+            return {
+                "success": True,
+                "content": result["content"],
+                "model": config.USER_MODEL,
+                "cached": result["cached"],
+                "latency_ms": result["latency_ms"]
+            }
+            
+        except Exception as e:
+            logger.log("LLM_CALL_ERROR", {
+                "model": config.USER_MODEL,
+                "error": str(e),
+                "prompt_preview": prompt[:100]
+            }, level="ERROR")
+            
+            return {
+                "success": False,
+                "error": str(e),
+                "model": config.USER_MODEL
+            }
+    
+    async def acall_sql_llm(self, prompt: str, call_type: str = "sql_generation", **kwargs) -> Dict[str, Any]:
+        """Versi async dari call_sql_llm (format hasil sama)"""
+        if not self._initialized:
+            self.initialize()
+        
+        try:
+            logger.log_llm_call(config.USER_MODEL, prompt, "Generating SQL (async)...")
+            result = await self._ainvoke("sql", prompt, call_type, kwargs)
+            logger.log_llm_call(config.USER_MODEL, prompt, result["content"])
+            
+            return {
+                "success": True,
+                "content": result["content"],
+                "model": config.USER_MODEL,
+                "cached": result["cached"],
+                "latency_ms": result["latency_ms"]
+            }
             
         except Exception as e:
             logger.log("LLM_CALL_ERROR", {
@@ -154,6 +289,47 @@ class LLMClient:
                 "model": config.USER_MODEL
             }
     
+    async def abatch(self, prompts: List[str], llm: str = "sql", call_type: str = None,
+                     max_concurrency: int = None, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Kirim banyak prompt sekaligus, maksimal max_concurrency request in-flight.
+        llm: "sql" | "user". Hasil urut sesuai prompts; kegagalan per prompt tidak menghentikan batch.
+        """
+        max_concurrency = max_concurrency or config.LLM_BATCH_CONCURRENCY
+        call = self.acall_sql_llm if llm == "sql" else self.acall_user_llm
+        if call_type is not None:
+            kwargs["call_type"] = call_type
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await call(prompt, **kwargs)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_one(prompt) for prompt in prompts))
+        logger.log("LLM_BATCH", {
+            "model": config.USER_MODEL,
+            "llm": llm,
+            "prompts": len(prompts),
+            "max_concurrency": max_concurrency,
+            "failed": sum(1 for r in results if not r["success"]),
+            "cached": sum(1 for r in results if r.get("cached")),
+            "total_time_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+        return list(results)
+    
+    def batch(self, prompts: List[str], llm: str = "sql", call_type: str = None,
+              max_concurrency: int = None, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Versi sync dari abatch untuk script / offline job (membuat event loop sendiri).
+        Dari dalam event loop yang sedang berjalan gunakan `await llm_client.abatch(...)`.
+        """
+        return asyncio.run(self.abatch(prompts, llm, call_type, max_concurrency, **kwargs))
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate & latency yang dihemat oleh cache respons LLM"""
+        return get_llm_cache().get_stats()
+    
     def create_sql_chain(self, template: str):
         if not self._initialized:
             self.initialize()
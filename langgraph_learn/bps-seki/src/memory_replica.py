@@ -0,0 +1,189 @@
+# src/memory_replica.py
+"""Replica in-memory (shared-cache) dari database.db via SQLite backup API"""
+
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+_replica_ids = itertools.count(1)
+
+class MemoryReplica:
+    """
+    Salinan database di RAM yang dibaca oleh connection pool.
+
+    Tiap refresh membuat *generasi* baru (database memory shared-cache dengan nama unik),
+    lalu pointer generasi aktif ditukar. Koneksi yang masih membaca generasi lama tetap
+    valid sampai dikembalikan ke pool; database lama hilang otomatis saat koneksi
+    terakhirnya ditutup. Reader tidak pernah menunggu proses copy.
+    """
+
+    def __init__(self, db_path: Path, check_interval: float = None):
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval if check_interval is not None else config.DB_REPLICA_CHECK_INTERVAL
+        self._name = f"bps_seki_replica_{next(_replica_ids)}"
+
+        self._lock = threading.Lock()          # melindungi pointer generasi aktif
+        self._refresh_lock = threading.Lock()  # hanya satu refresh berjalan
+        self._generation = 0
+        self._uri = None
+        self._anchor = None                    # koneksi yang menjaga generasi aktif tetap hidup
+        self._signature = None
+        self._last_check = 0.0
+
+        self.stats = {
+            "refreshes": 0,
+            "failed_refreshes": 0,
+            "last_refresh_ms": None,
+            "size_bytes": 0
+        }
+
+        self._refresh()
+
+    def _file_signature(self) -> Tuple:
+        """(mtime_ns, size) file database + WAL (jika ada)"""
+        signature = ()
+        for path in (self.db_path, Path(f"{self.db_path}-wal")):
+            try:
+                st = os.stat(path)
+                signature += (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                signature += (None, None)
+        return signature
+
+    def _refresh(self) -> bool:
+        """Copy database disk ke generasi memory baru lalu swap pointer secara atomik"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        try:
+            start = time.perf_counter()
+            signature = self._file_signature()
+            generation = self._generation + 1
+            uri = f"file:{self._name}_g{generation}?mode=memory&cache=shared"
+
+            source = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            try:
+                # Backup membaca snapshot konsisten dari file sumber
+                source.backup(anchor)
+                page_count = anchor.execute("PRAGMA page_count;").fetchone()[0]
+                page_size = anchor.execute("PRAGMA page_size;").fetchone()[0]
+            except sqlite3.Error:
+                anchor.close()
+                raise
+            finally:
+                source.close()
+
+            with self._lock:
+                old_anchor = self._anchor
+                self._anchor = anchor
+                self._uri = uri
+                self._generation = generation
+                self._signature = signature
+                self._last_check = time.monotonic()
+
+            # Reader yang masih memegang koneksi generasi lama tidak terganggu
+            if old_anchor is not None:
+                old_anchor.close()
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats["refreshes"] += 1
+            self.stats["last_refresh_ms"] = round(elapsed_ms, 2)
+            self.stats["size_bytes"] = page_count * page_size
+
+            logger.log("DB_REPLICA_LOADED", {
+                "db_path": str(self.db_path),
+                "generation": generation,
+                "size_bytes": page_count * page_size,
+                "load_time_ms": round(elapsed_ms, 2),
+                "message": f"In-memory replica generation {generation} loaded"
+            })
+            return True
+
+        except sqlite3.Error as e:
+            self.stats["failed_refreshes"] += 1
+            logger.log("DB_REPLICA_ERROR", {
+                "db_path": str(self.db_path),
+                "error": str(e),
+                "message": "Failed to refresh in-memory replica, keeping current generation"
+            }, level="ERROR")
+            if self._anchor is None:
+                raise
+            return False
+
+        finally:
+            self._refresh_lock.release()
+
+    def maybe_refresh(self):
+        """
+        Cek perubahan file (dibatasi check_interval).
+        Jika berubah, refresh dijalankan di background thread sehingga caller tidak menunggu.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            current_signature = self._signature
+
+        if self._file_signature() != current_signature and not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh, name=f"{self._name}-refresh", daemon=True).start()
+
+    def connect(self, **kwargs) -> Tuple[sqlite3.Connection, int]:
+        """
+        Buka koneksi ke generasi aktif.
+        Dilakukan di bawah lock agar anchor generasi tersebut belum ditutup saat koneksi dibuka
+        (membuka nama memory yang sudah tidak punya koneksi akan membuat database kosong baru).
+        """
+        with self._lock:
+            if self._anchor is None:
+                raise sqlite3.OperationalError("In-memory replica is closed")
+            return sqlite3.connect(self._uri, uri=True, **kwargs), self._generation
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def is_current(self, generation: int) -> bool:
+        return generation == self.generation
+
+    def close(self):
+        with self._lock:
+            anchor, self._anchor = self._anchor, None
+        if anchor is not None:
+            anchor.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "generation": self.generation,
+            "check_interval": self.check_interval
+        }
+
+# Registry replica per file database
+_replicas: Dict[str, MemoryReplica] = {}
+_replicas_lock = threading.Lock()
+
+def get_replica(db_path: Path) -> MemoryReplica:
+    """Ambil (atau buat) replica in-memory untuk file database tertentu"""
+    key = str(Path(db_path).resolve())
+    with _replicas_lock:
+        replica = _replicas.get(key)
+        if replica is None:
+            replica = MemoryReplica(Path(db_path))
+            _replicas[key] = replica
+        return replica
+
+def get_replica_if_enabled(db_path: Path) -> Optional[MemoryReplica]:
+    """Replica hanya dipakai jika DB_IN_MEMORY aktif"""
+    return get_replica(db_path) if config.DB_IN_MEMORY else None
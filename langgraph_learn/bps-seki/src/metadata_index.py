@@ -0,0 +1,211 @@
+# src/metadata_index.py
+"""Inverted index untuk find_relevant_tables (hasil & ranking identik dengan scan substring lama)"""
+
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Field posting dan bobot heuristik retrieval
+DESCRIPTION = 0  # +3 sekali per tabel jika ada term di description
+COLUMN = 1       # +2 per (kolom, term) yang mengandung term; +1 jika hanya 3 huruf awal cocok
+EXAMPLE = 2      # +0.5 per (nilai string example_rows, term)
+
+GRAM = 3
+
+class MetadataIndex:
+    """
+    Semua teks (description, nama kolom, nilai example_rows) di-lowercase dan dideduplikasi
+    menjadi daftar string unik. Tiap string punya posting list (tabel, field, jumlah kemunculan).
+
+    Pencarian substring `term in text` dijawab lewat index trigram: kandidat = irisan posting
+    trigram term, lalu diverifikasi dengan `in` sehingga hasilnya sama persis dengan scan lama.
+    Term < 3 huruf di-scan langsung atas string unik (jauh lebih sedikit dari total nilai).
+
+    Hot reload memakai `updated()`: hanya posting tabel yang berubah yang dihitung ulang.
+    Nomor tabel stabil antar versi (tabel yang dihapus meninggalkan slot None); urutan ranking
+    untuk skor sama tetap mengikuti urutan metadata lewat `_order`.
+    """
+
+    # Rebuild penuh jika string tanpa posting (sisa tabel yang dihapus / berubah) melebihi rasio ini
+    MAX_ORPHAN_RATIO = 0.5
+
+    def __init__(self, metadata: Dict[str, Any]):
+        self.tables: List[Optional[str]] = []
+        self.strings: List[str] = []
+        self.postings: List[List[Tuple[int, int, int]]] = []
+        self.grams: Dict[str, List[int]] = {}
+        self.column_prefixes: Dict[str, List[int]] = {}  # 3 huruf awal nama kolom -> string id
+        self._ids: Dict[str, int] = {}
+        self._prefixed = set()
+        self._table_ids: Dict[str, int] = {}
+        self._table_strings: Dict[int, List[int]] = {}  # nomor tabel -> string id yang punya posting tabel itu
+        self._owned = set()  # list yang sudah milik index ini (copy-on-write saat update)
+        for name, meta in metadata.items():
+            self._add_table(self._new_table(name), meta)
+        self._finish(metadata)
+
+    @classmethod
+    def updated(cls, previous: "MetadataIndex", metadata: Dict[str, Any],
+                changed: Iterable[str]) -> "MetadataIndex":
+        """
+        Index untuk `metadata` dari index versi sebelumnya: posting tabel di `changed` (baru / berubah)
+        dan tabel yang hilang dihitung ulang, sisanya dipakai bersama. `previous` tidak diubah
+        (masih dibaca katalog lama): list yang disentuh disalin dulu.
+        """
+        index = cls.__new__(cls)
+        index.tables = list(previous.tables)
+        index.strings = list(previous.strings)
+        index.postings = list(previous.postings)
+        index.grams = dict(previous.grams)
+        index.column_prefixes = dict(previous.column_prefixes)
+        index._ids = dict(previous._ids)
+        index._prefixed = set(previous._prefixed)
+        index._table_ids = dict(previous._table_ids)
+        index._table_strings = dict(previous._table_strings)
+        index._owned = set()
+
+        changed = set(changed)
+        for name in [n for n in previous._table_ids if n not in metadata or n in changed]:
+            table_idx = index._table_ids[name]
+            index._drop_table(table_idx)
+            if name not in metadata:
+                del index._table_ids[name]
+                index.tables[table_idx] = None
+
+        for name, meta in metadata.items():
+            if name in changed or name not in index._table_ids:
+                table_idx = index._table_ids.get(name)
+                index._add_table(index._new_table(name) if table_idx is None else table_idx, meta)
+
+        orphans = sum(1 for posting in index.postings if not posting)
+        if orphans > cls.MAX_ORPHAN_RATIO * max(len(index.strings), 1):
+            return cls(metadata)
+        index._finish(metadata)
+        return index
+
+    def _finish(self, metadata: Dict[str, Any]):
+        self._order = {self._table_ids[name]: position for position, name in enumerate(metadata)}
+        self._owned = set()  # hanya dibutuhkan saat build / update
+
+    def _new_table(self, name: str) -> int:
+        table_idx = len(self.tables)
+        self.tables.append(name)
+        self._table_ids[name] = table_idx
+        return table_idx
+
+    def _append(self, mapping: Dict[str, List[int]], tag: str, key: str, sid: int):
+        """mapping[key].append(sid), salin list dulu jika masih dipakai bersama index lama"""
+        if (tag, key) in self._owned:
+            mapping[key].append(sid)
+        else:
+            mapping[key] = mapping.get(key, []) + [sid]
+            self._owned.add((tag, key))
+
+    def _string_id(self, text: str) -> int:
+        sid = self._ids.get(text)
+        if sid is None:
+            sid = len(self.strings)
+            self._ids[text] = sid
+            self.strings.append(text)
+            self.postings.append([])
+            self._owned.add(("posting", sid))
+            for gram in {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}:
+                self._append(self.grams, "gram", gram, sid)
+        return sid
+
+    def _drop_table(self, table_idx: int):
+        for sid in self._table_strings.pop(table_idx, ()):
+            self.postings[sid] = [p for p in self.postings[sid] if p[0] != table_idx]
+            self._owned.add(("posting", sid))
+
+    def _add_table(self, table_idx: int, meta: Dict[str, Any]):
+        counts: Dict[Tuple[int, int], int] = defaultdict(int)
+
+        description = meta.get("description", "")
+        if isinstance(description, str):
+            counts[(self._string_id(description.lower()), DESCRIPTION)] = 1
+
+        for col_name in meta.get("columns", {}).keys():
+            counts[(self._string_id(col_name.lower()), COLUMN)] += 1
+
+        for row in meta.get("example_rows", []):
+            for value in row.values():
+                if isinstance(value, str):
+                    counts[(self._string_id(value.lower()), EXAMPLE)] += 1
+
+        for (sid, field), count in counts.items():
+            if field == COLUMN and sid not in self._prefixed:
+                self._prefixed.add(sid)
+                self._append(self.column_prefixes, "prefix", self.strings[sid][:GRAM], sid)
+            if ("posting", sid) not in self._owned:
+                self.postings[sid] = list(self.postings[sid])
+                self._owned.add(("posting", sid))
+            self.postings[sid].append((table_idx, field, count))
+        self._table_strings[table_idx] = sorted({sid for sid, _ in counts})
+
+    def _matching_strings(self, term: str) -> List[int]:
+        """String id yang mengandung term (substring)"""
+        if len(term) < GRAM:
+            return [sid for sid, text in enumerate(self.strings) if term in text]
+
+        lists = []
+        for gram in {term[i:i + GRAM] for i in range(len(term) - GRAM + 1)}:
+            posting = self.grams.get(gram)
+            if not posting:
+                return []
+            lists.append(posting)
+        lists.sort(key=len)
+
+        candidates = lists[0]
+        if len(lists) > 1:
+            candidates = set(candidates)
+            for posting in lists[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+        strings = self.strings
+        return [sid for sid in candidates if term in strings[sid]]
+
+    def score(self, query_terms) -> List[Tuple[str, float]]:
+        """[(table_name, score)] dengan score > 0, urutan sama dengan scan lama (score desc, urutan metadata)"""
+        scores: Dict[int, float] = defaultdict(int)
+        description_hits = set()
+
+        for term in query_terms:
+            matched_columns = set()
+            for sid in self._matching_strings(term):
+                for table_idx, field, count in self.postings[sid]:
+                    if field == COLUMN:
+                        scores[table_idx] += 2 * count
+                        matched_columns.add(sid)
+                    elif field == EXAMPLE:
+                        scores[table_idx] += 0.5 * count  # float, seperti akumulasi lama
+                    else:
+                        description_hits.add(table_idx)
+
+            # Prefix 3 huruf hanya dihitung untuk kolom yang tidak mengandung term utuh
+            if len(term) > 3:
+                for sid in self.column_prefixes.get(term[:3], ()):
+                    if sid in matched_columns:
+                        continue
+                    for table_idx, field, count in self.postings[sid]:
+                        if field == COLUMN:
+                            scores[table_idx] += count
+
+        for table_idx in description_hits:
+            scores[table_idx] += 3
+
+        # Urutan akumulasi lama: description dulu, lalu kolom, lalu example; semua bobot kelipatan 0.5
+        # sehingga penjumlahan float tetap eksak dan urutan penjumlahan tidak mengubah hasil.
+        order = self._order
+        ranked = sorted((idx for idx, value in scores.items() if value > 0), key=order.__getitem__)
+        ranked.sort(key=lambda idx: scores[idx], reverse=True)
+        return [(self.tables[idx], scores[idx]) for idx in ranked]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tables": len(self._table_ids),
+            "distinct_strings": len(self.strings),
+            "grams": len(self.grams),
+            "postings": sum(len(p) for p in self.postings),
+            "orphan_strings": sum(1 for p in self.postings if not p)
+        }
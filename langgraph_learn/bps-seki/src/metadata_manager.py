@@ -1,168 +1,322 @@
 # src/metadata_manager.py
 """Metadata management system"""
 
+import hashlib
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from collections import Counter
 
 from .config import config
 from .logger import AuditLogger
+from .metadata_index import MetadataIndex
+from .catalog import TableMeta, compile_catalog, table_meta_of
+from .entity_index import ENTITY_BOOST
+from .metadata_snapshot import load_snapshot, save_snapshot
+from .prompt_builder import schema_prompt_builder
 
 logger = AuditLogger()
 
+class MetadataCatalog:
+    """
+    Snapshot metadata + index turunan. Tidak pernah diubah setelah dibuat: reload membangun
+    snapshot baru lalu menukar pointer, sehingga caller yang sedang memakai snapshot lama
+    tidak pernah melihat katalog setengah jadi.
+    """
+
+    def __init__(self, metadata: Dict[str, Any], files: Dict[str, Tuple[int, int]], generation: int,
+                 index: MetadataIndex = None, tables: Dict[str, TableMeta] = None,
+                 previous: "MetadataCatalog" = None, changed: List[str] = None,
+                 metadata_dir: Path = None):
+        self.metadata = metadata
+        self.metadata_dir = metadata_dir  # kunci file index BM25 di DATA_DIR
+        self.files = files  # nama file -> (mtime_ns, size)
+        self.generation = generation
+        # Inverted index untuk find_relevant_tables; saat reload hanya posting tabel `changed` (baru / berubah)
+        # dan tabel yang hilang yang dihitung ulang dari index katalog lama
+        if index is None:
+            index = (MetadataIndex.updated(previous.index, metadata, changed)
+                     if previous is not None and changed is not None else MetadataIndex(metadata))
+        self.index = index
+        # TableMeta terkompilasi; tabel yang dict-nya tidak berubah dipakai ulang dari katalog lama
+        self.tables = tables or compile_catalog(metadata, previous.tables if previous else None)
+        self.signature = self._files_signature(files)  # kunci validitas index BM25 di disk
+        self._bm25 = None
+        self._bm25_lock = threading.Lock()
+
+    @staticmethod
+    def _files_signature(files: Dict[str, Tuple[int, int]]) -> str:
+        digest = hashlib.sha1()
+        for name, (mtime_ns, size) in sorted(files.items()):
+            digest.update(f"{name}:{size}:{mtime_ns};".encode())
+        return digest.hexdigest()
+
+    def bm25(self):
+        """Index BM25 dari disk (jika metadata tidak berubah) atau dibangun ulang"""
+        with self._bm25_lock:
+            if self._bm25 is None:
+                from .metadata_retrieval import load_or_build  # butuh scipy, hanya untuk mode bm25
+                self._bm25 = load_or_build(self.metadata, self.signature, self.metadata_dir)
+            return self._bm25
+
 class MetadataManager:
     """Manages metadata retrieval and search"""
     
-    def __init__(self, metadata_dir: Optional[Path] = None):
+    def __init__(self, metadata_dir: Optional[Path] = None, reload_interval: float = None,
+                 use_snapshot: bool = None):
         # Menggunakan config.METADATA_DIR sebagai default
         self.metadata_dir = metadata_dir or config.METADATA_DIR
-        self._metadata_cache = None
+        # Snapshot pickle katalog + index di DATA_DIR (cold start tanpa parse JSON)
+        self.use_snapshot = use_snapshot if use_snapshot is not None else config.METADATA_SNAPSHOT
+        # Polling mtime/size folder metadata (detik); <= 0 = hot-reload nonaktif
+        self.reload_interval = reload_interval if reload_interval is not None else config.METADATA_RELOAD_INTERVAL
+        self._catalog: Optional[MetadataCatalog] = None
+        self._snapshot_manifest: Dict[str, Tuple[int, int, str]] = {}  # (mtime_ns, size, sha1) snapshot terakhir
+        self._lock = threading.Lock()         # melindungi _last_check
+        self._reload_lock = threading.Lock()  # hanya satu reload berjalan
+        self._last_check = 0.0
         
     def load_all_metadata(self, force_reload: bool = False) -> Dict[str, Any]:
-        """Load semua metadata dari folder"""
-        if self._metadata_cache is not None and not force_reload:
-            return self._metadata_cache
-        
-        metadata = {}
-        
-        # Pastikan direktori ada
-        if not self.metadata_dir.exists():
-            logger.log("METADATA_LOAD", {
-                "status": "ERROR",
-                "message": f"Directory not found: {self.metadata_dir}"
+        """Load semua metadata dari folder (file yang berubah di-reload otomatis)"""
+        return self._current(force_reload).metadata
+
+    def _current(self, force_reload: bool = False) -> MetadataCatalog:
+        """Snapshot katalog aktif; dibaca sekali per operasi agar konsisten"""
+        if self._catalog is None or force_reload:
+            self._reload(force=force_reload)
+        else:
+            self.maybe_reload()
+        return self._catalog
+
+    def _scan(self) -> Optional[Dict[str, Tuple[int, int]]]:
+        """{nama file: (mtime_ns, size)} untuk semua *.json; None jika folder tidak ada"""
+        try:
+            files = {}
+            with os.scandir(self.metadata_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        st = entry.stat()
+                        files[entry.name] = (st.st_mtime_ns, st.st_size)
+            return files
+        except FileNotFoundError:
+            return None
+
+    def _parse(self, file_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.metadata_dir / file_name, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.log("METADATA_ERROR", {
+                "file": file_name,
+                "error": str(e),
+                "status": "ERROR"
             }, level="ERROR")
-            return metadata
+            return None
 
-        json_files = list(self.metadata_dir.glob("*.json"))
-        
-        if not json_files:
-            logger.log("METADATA_LOAD", {
-                "status": "WARNING",
-                "message": f"No JSON files in {self.metadata_dir}"
-            }, level="WARNING")
-            return metadata
-        
-        for json_file in json_files:
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    table_name = json_file.stem
-                    data = json.load(f)
-                    metadata[table_name] = data
-                    
-                # Log setiap file yang berhasil di-load
-                logger.log("METADATA_LOAD_FILE", {
-                    "file": json_file.name,
-                    "table": table_name,
-                    "status": "SUCCESS"
+    def _reload(self, force: bool = False, files: Dict[str, Tuple[int, int]] = None) -> bool:
+        """
+        Parse ulang hanya file yang baru / berubah (mtime atau size), pakai ulang dict tabel
+        yang tidak berubah, bangun index turunan, lalu swap katalog secara atomik.
+        force=True: parse ulang semua file.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            current = self._catalog
+            files = files if files is not None else self._scan()
+
+            if files is None:
+                if current is None or current.files:
+                    logger.log("METADATA_LOAD", {
+                        "status": "ERROR",
+                        "message": f"Directory not found: {self.metadata_dir}"
+                    }, level="ERROR")
+                files = {}
+            elif not files and (current is None or current.files):
+                logger.log("METADATA_LOAD", {
+                    "status": "WARNING",
+                    "message": f"No JSON files in {self.metadata_dir}"
+                }, level="WARNING")
+
+            with self._lock:
+                self._last_check = time.monotonic()
+
+            if current is not None and not force and files == current.files:
+                return False
+
+            if current is None and not force and files and self.use_snapshot:
+                snapshot = load_snapshot(self.metadata_dir, files)
+                if snapshot is not None:
+                    catalog = MetadataCatalog(snapshot["metadata"], files, 1,
+                                              index=snapshot["index"], tables=snapshot["tables"],
+                                              metadata_dir=self.metadata_dir)
+                    self._swap(catalog)
+                    self._snapshot_manifest = snapshot["manifest"]
+                    if snapshot["touched"]:
+                        self._save_snapshot(catalog)
+                    logger.log("METADATA_LOAD_COMPLETE", {
+                        "source": "snapshot",
+                        "total_tables": len(snapshot["metadata"]),
+                        "load_time_ms": round((time.perf_counter() - start) * 1000, 2)
+                    })
+                    return True
+
+            old_files = current.files if current is not None and not force else {}
+            old_metadata = current.metadata if current is not None else {}
+
+            metadata, added, changed, failed = {}, [], [], []
+            for file_name, stat in sorted(files.items()):
+                table_name = file_name[:-len(".json")]
+                if old_files.get(file_name) == stat and table_name in old_metadata:
+                    metadata[table_name] = old_metadata[table_name]
+                    continue
+                data = self._parse(file_name)
+                if data is None:
+                    failed.append(table_name)
+                    if table_name in old_metadata:
+                        metadata[table_name] = old_metadata[table_name]  # pertahankan versi terakhir yang valid
+                    continue
+                (changed if table_name in old_metadata else added).append(table_name)
+                metadata[table_name] = data
+            removed = [table_name for table_name in old_metadata if table_name not in metadata]
+
+            catalog = MetadataCatalog(metadata, files, current.generation + 1 if current else 1,
+                                      previous=current, changed=added + changed,
+                                      metadata_dir=self.metadata_dir)
+            self._swap(catalog)
+            if self.use_snapshot and files:
+                self._save_snapshot(catalog)
+
+            if current is None:
+                logger.log("METADATA_LOAD_COMPLETE", {
+                    "source": "json",
+                    "total_tables": len(metadata),
+                    "load_time_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "tables": list(metadata.keys()),
+                    "failed": failed,
+                    "index": catalog.index.get_stats()
                 })
-                
-            except Exception as e:
-                logger.log("METADATA_ERROR", {
-                    "file": json_file.name,
-                    "error": str(e),
-                    "status": "ERROR"
-                }, level="ERROR")
-        
-        self._metadata_cache = metadata
-        
-        logger.log("METADATA_LOAD_COMPLETE", {
-            "total_tables": len(metadata),
-            "tables": list(metadata.keys())
-        })
-        
-        return metadata
-    
+            else:
+                logger.log("METADATA_RELOAD", {
+                    "generation": catalog.generation,
+                    "total_tables": len(metadata),
+                    "added": added,
+                    "changed": changed,
+                    "removed": removed,
+                    "failed": failed,
+                    "index": catalog.index.get_stats(),
+                    "reload_time_ms": round((time.perf_counter() - start) * 1000, 2)
+                })
+            return True
+
+    def _save_snapshot(self, catalog: MetadataCatalog):
+        """Tulis snapshot; sha1 file yang tidak berubah diambil dari manifest sebelumnya"""
+        manifest = save_snapshot(self.metadata_dir, catalog.files, catalog.metadata, catalog.index,
+                                 catalog.tables, previous_manifest=self._snapshot_manifest)
+        if manifest is not None:
+            self._snapshot_manifest = manifest
+
+    def _swap(self, catalog: MetadataCatalog):
+        if config.METADATA_RETRIEVAL == "bm25":
+            catalog.bm25()  # bangun sebelum swap, bukan di request pertama
+        self._catalog = catalog
+
+    def maybe_reload(self):
+        """
+        Cek perubahan folder metadata (dibatasi reload_interval).
+        Jika berubah, reload dijalankan di background thread sehingga caller tetap memakai
+        katalog lama sampai katalog baru selesai dibangun.
+        """
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+
+        files = self._scan()
+        current = self._catalog
+        if (files or {}) != current.files and not self._reload_lock.locked():
+            threading.Thread(target=self._reload, kwargs={"files": files},
+                             name="metadata-reload", daemon=True).start()
+
+    @property
+    def generation(self) -> int:
+        return self._catalog.generation if self._catalog is not None else 0
+
     def get_table_metadata(self, table_name: str) -> Optional[Dict]:
         """Get metadata untuk tabel spesifik"""
         metadata = self.load_all_metadata()
         return metadata.get(table_name)
     
-    def find_relevant_tables(self, user_query: str, top_k: int = 3) -> List[Dict]:
-        """Cari tabel yang relevan dengan query user"""
-        metadata = self.load_all_metadata()
+    def get_table(self, table_name: str) -> Optional[TableMeta]:
+        """TableMeta terkompilasi (kolom ter-normalisasi, flag peran, fragment prompt)"""
+        return self._current().tables.get(table_name)
+
+    def find_relevant_tables(self, user_query: str, top_k: int = 3,
+                             entity_hits: List[Dict] = None) -> List[Dict]:
+        """
+        Cari tabel yang relevan dengan query user.
+        entity_hits: hasil EntityIndex.lookup; tabel yang memuat nilai yang disebut user
+        mendapat +ENTITY_BOOST per nilai distinct (dan ikut kandidat walau skor teksnya 0).
+        """
+        catalog = self._current()
+        metadata = catalog.metadata
         if not metadata:
             return []
         
-        query_terms = set(user_query.lower().split())
-        
-        scores = []
-        for table_name, meta in metadata.items():
-            score = 0
-            
-            # Check description
-            desc = meta.get("description", "").lower()
-            if any(term in desc for term in query_terms):
-                score += 3
-            
-            # Check column names
-            columns = meta.get("columns", {})
-            for col_name in columns.keys():
-                col_lower = col_name.lower()
-                for term in query_terms:
-                    if term in col_lower:
-                        score += 2
-                    elif len(term) > 3 and col_lower.startswith(term[:3]):
-                        score += 1
-            
-            # Check example data
-            examples = meta.get("example_rows", [])
-            for row in examples:
-                for value in row.values():
-                    if isinstance(value, str):
-                        value_lower = value.lower()
-                        for term in query_terms:
-                            if term in value_lower:
-                                score += 0.5
-            
-            if score > 0:
-                # --- PERBAIKAN: Menghapus slicing pada description ---
-                scores.append({
-                    "table_name": table_name,
-                    "metadata": meta,
-                    "relevance_score": score,
-                    "description": meta.get("description", "") # Full description
-                })
-        
-        # Sort by score highest first
-        scores.sort(key=lambda x: x["relevance_score"], reverse=True)
+        if config.METADATA_RETRIEVAL == "bm25":
+            # Skor BM25 (description, kolom, nilai example_rows) via perkalian sparse matrix
+            ranked = catalog.bm25().top_k(user_query, top_k)
+        else:
+            query_terms = set(user_query.lower().split())
+
+            # Skor: +3 description, +2 kolom (+1 prefix 3 huruf), +0.5 nilai example_rows
+            # dihitung dari posting list index (bukan scan substring per tabel)
+            ranked = catalog.index.score(query_terms)
+
+        if entity_hits:
+            values: Dict[str, set] = {}
+            for hit in entity_hits:
+                values.setdefault(hit["table"], set()).add(hit["value"])
+            scores = dict(ranked)
+            for table_name, table_values in values.items():
+                if table_name in metadata:
+                    scores[table_name] = scores.get(table_name, 0) + ENTITY_BOOST * len(table_values)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
         
-        top_results = scores[:top_k]
+        # --- PERBAIKAN: Menghapus slicing pada description ---
+        top_results = [
+            {
+                "table_name": table_name,
+                "metadata": metadata[table_name],
+                "relevance_score": score,
+                "description": metadata[table_name].get("description", ""), # Full description
+                "table": catalog.tables[table_name]
+            }
+            for table_name, score in ranked[:top_k]
+        ]
         
         logger.log("METADATA_RETRIEVAL", {
             "user_query": user_query, # Full query
-            "total_candidates": len(scores),
+            "mode": config.METADATA_RETRIEVAL,
+            "total_candidates": len(ranked),
+            "entity_tables": sorted({hit["table"] for hit in entity_hits or []}),
             "top_results_names": [s["table_name"] for s in top_results],
             "scores": [s["relevance_score"] for s in top_results]
         })
         
         return top_results
     
-    def build_schema_prompt(self, table_info: Dict) -> str:
-        """Build schema description untuk prompt SQL"""
-        meta = table_info["metadata"]
-        columns = meta.get("columns", {})
-        
-        schema_lines = []
-        for col_name, col_info in columns.items():
-            # Handle jika col_info hanya string deskripsi
-            if isinstance(col_info, str):
-                col_info = {
-                    "type": "string",
-                    "description": col_info
-                }
-
-            col_type = col_info.get("type", "unknown")
-            col_desc = col_info.get("description", "no description")
-            schema_lines.append(f"  - {col_name} ({col_type}): {col_desc}")
-        
-        schema_text = "\n".join(schema_lines)
-        
-        # Mengembalikan prompt schema lengkap
-        return f"""Table: {table_info['table_name']}
-Description: {meta.get('description', 'No description')}
-Columns:
-{schema_text}
-Access Column: {meta.get('access_column', 'None')}
-Example Data: {json.dumps(meta.get('example_rows', [])[:2], ensure_ascii=False)}"""
\ No newline at end of file
+    def build_schema_prompt(self, table_info: Dict, user_query: str = None) -> str:
+        """
+        Build schema description untuk prompt SQL. Tanpa user_query: schema lengkap
+        (sudah di-render saat katalog dikompilasi); dengan user_query: kolom dipangkas ke token budget.
+        """
+        table = table_meta_of(table_info)
+        if user_query is None:
+            return table.schema_prompt
+        return schema_prompt_builder.schema_prompt(table, user_query)
\ No newline at end of file
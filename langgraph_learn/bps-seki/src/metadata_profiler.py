@@ -0,0 +1,215 @@
+# src/metadata_profiler.py
+"""Generate / refresh metadata JSON per tabel ref_mkt_* langsung dari database.db"""
+
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+TABLE_PREFIX = "ref_mkt_"
+VALUE_COLUMNS = ("region", "leveldata", "area")  # daftar nilai distinct disimpan di metadata
+YEAR_COLUMN = "year"
+VERSION_COLUMN = "job_insertdate"
+EXAMPLE_ROWS = 3
+
+_TYPE_MAP = (("INT", "integer"), ("REAL", "float"), ("FLOA", "float"), ("DOUB", "float"),
+             ("NUM", "float"), ("CHAR", "string"), ("TEXT", "string"), ("CLOB", "string"))
+
+def column_type(declared: str) -> str:
+    """Tipe deklarasi SQLite -> tipe di metadata (integer | float | string | unknown)"""
+    declared = (declared or "").upper()
+    for marker, name in _TYPE_MAP:
+        if marker in declared:
+            return name
+    return "unknown"
+
+def _source_label(table: str) -> str:
+    if table.startswith(f"{TABLE_PREFIX}bps_"):
+        return "BPS"
+    if table.startswith(f"{TABLE_PREFIX}seki_"):
+        return "SEKI (Bank Indonesia)"
+    return "database"
+
+def _readable(name: str) -> str:
+    for prefix in (f"{TABLE_PREFIX}bps_", f"{TABLE_PREFIX}seki_", TABLE_PREFIX):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    return name.replace("_", " ").strip()
+
+class MetadataProfiler:
+    """
+    Profil tiap tabel ref_mkt_*: tipe kolom, null rate, distinct count, rentang tahun,
+    nilai distinct region/leveldata/area dan example_rows, lalu tulis METADATA_DIR/<tabel>.json.
+
+    Incremental: fingerprint (row_count, MAX(job_insertdate)) disimpan di key "profile";
+    tabel yang fingerprint-nya sama dilewati. Description dan access_column yang ditulis manual dipertahankan.
+    Tabel diprofil paralel, satu koneksi read-only per worker.
+    """
+
+    def __init__(self, db_path: Path = None, metadata_dir: Path = None, workers: int = None):
+        self.db_path = Path(db_path or config.DB_PATH)
+        self.metadata_dir = Path(metadata_dir or config.METADATA_DIR)
+        self.workers = max(1, workers or config.METADATA_PROFILE_WORKERS)
+        self.max_values = config.METADATA_PROFILE_MAX_VALUES
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+
+    def list_tables(self) -> List[str]:
+        conn = self._connect()
+        try:
+            return [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ? ORDER BY name;",
+                (f"{TABLE_PREFIX}%",)
+            ).fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _fingerprint(conn: sqlite3.Connection, table: str, columns: List[str]) -> Dict[str, Any]:
+        """Murah dibanding profil penuh: COUNT(*) + MAX(job_insertdate)"""
+        version = f'MAX("{VERSION_COLUMN}")' if VERSION_COLUMN in columns else "NULL"
+        row_count, max_insertdate = conn.execute(f'SELECT COUNT(*), {version} FROM "{table}";').fetchone()
+        return {"row_count": row_count, "max_job_insertdate": max_insertdate}
+
+    def _load_existing(self, table: str) -> Optional[Dict[str, Any]]:
+        path = self.metadata_dir / f"{table}.json"
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def profile_table(self, table: str, force: bool = False) -> Dict[str, Any]:
+        """Profil satu tabel; return entry report {table, status, ...}"""
+        conn = self._connect()
+        try:
+            info = conn.execute(f'PRAGMA table_info("{table}");').fetchall()
+            columns = [row[1] for row in info]
+            fingerprint = self._fingerprint(conn, table, columns)
+
+            existing = self._load_existing(table)
+            previous = (existing or {}).get("profile", {})
+            if (not force and existing is not None
+                    and previous.get("row_count") == fingerprint["row_count"]
+                    and previous.get("max_job_insertdate") == fingerprint["max_job_insertdate"]):
+                return {"table": table, "status": "fresh", **fingerprint}
+
+            metadata = self._profile(conn, table, info, fingerprint, existing or {})
+        finally:
+            conn.close()
+
+        self._write(table, metadata)
+        return {"table": table, "status": "profiled", **fingerprint}
+
+    def _profile(self, conn: sqlite3.Connection, table: str, info: List[tuple],
+                 fingerprint: Dict[str, Any], existing: Dict[str, Any]) -> Dict[str, Any]:
+        columns = [row[1] for row in info]
+        row_count = fingerprint["row_count"]
+
+        # Satu scan untuk semua kolom: COUNT(col) dan COUNT(DISTINCT col)
+        aggregates = ", ".join(f'COUNT("{c}"), COUNT(DISTINCT "{c}")' for c in columns)
+        stats = conn.execute(f'SELECT {aggregates} FROM "{table}";').fetchone() if columns else ()
+
+        old_columns = existing.get("columns", {})
+        column_meta = {}
+        for i, (_, name, declared, *_rest) in enumerate(info):
+            non_null, distinct = stats[2 * i], stats[2 * i + 1]
+            old = old_columns.get(name)
+            description = old.get("description") if isinstance(old, dict) else old
+            column_meta[name] = {
+                "type": column_type(declared),
+                "description": description or _readable(name).capitalize(),
+                "null_rate": round(1 - non_null / row_count, 4) if row_count else 0.0,
+                "distinct_count": distinct
+            }
+
+        metadata = {
+            "description": existing.get("description") or (
+                f"Data {_readable(table)} dari {_source_label(table)}"
+            ),
+            "columns": column_meta,
+            # access_column menentukan filter region: nilai yang ditulis manual dipertahankan
+            "access_column": existing.get("access_column") or ("region" if "region" in columns else None),
+        }
+
+        if YEAR_COLUMN in columns:
+            year_min, year_max = conn.execute(
+                f'SELECT MIN("{YEAR_COLUMN}"), MAX("{YEAR_COLUMN}") FROM "{table}";'
+            ).fetchone()
+            metadata["year_range"] = {"min": year_min, "max": year_max}
+
+        values = {}
+        for name in VALUE_COLUMNS:
+            if name in columns:
+                values[name] = [row[0] for row in conn.execute(
+                    f'SELECT DISTINCT "{name}" FROM "{table}" WHERE "{name}" IS NOT NULL '
+                    f'ORDER BY "{name}" LIMIT ?;', (self.max_values,)
+                ).fetchall()]
+        if values:
+            metadata["values"] = values
+
+        metadata["example_rows"] = self._example_rows(conn, table, row_count)
+        metadata["profile"] = {**fingerprint, "profiled_at": datetime.now().isoformat(timespec="seconds")}
+        return metadata
+
+    @staticmethod
+    def _example_rows(conn: sqlite3.Connection, table: str, row_count: int) -> List[Dict[str, Any]]:
+        """Sampel deterministik: baris dengan jarak rata di seluruh tabel (bukan hanya baris awal)"""
+        if not row_count:
+            return []
+        step = max(1, row_count // EXAMPLE_ROWS)
+        cursor = conn.execute(
+            f'SELECT * FROM (SELECT *, ROW_NUMBER() OVER () - 1 AS _rn FROM "{table}") '
+            f'WHERE _rn % ? = 0 LIMIT ?;', (step, EXAMPLE_ROWS)
+        )
+        names = [d[0] for d in cursor.description]
+        return [
+            {k: v for k, v in zip(names, row) if k not in ("_rn", VERSION_COLUMN)}
+            for row in cursor.fetchall()
+        ]
+
+    def _write(self, table: str, metadata: Dict[str, Any]):
+        """Tulis ke file sementara lalu rename, agar MetadataManager tidak membaca JSON setengah jadi"""
+        self.metadata_dir.mkdir(parents=True, exist_ok=True)
+        path = self.metadata_dir / f"{table}.json"
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+
+    def run(self, tables: List[str] = None, force: bool = False) -> List[Dict[str, Any]]:
+        """Profil semua tabel ref_mkt_* (atau `tables`) secara paralel"""
+        tables = tables or self.list_tables()
+        started = datetime.now()
+
+        def task(table):
+            try:
+                return self.profile_table(table, force=force)
+            except sqlite3.Error as e:
+                logger.log("METADATA_PROFILE_ERROR", {"table": table, "error": str(e)}, level="ERROR")
+                return {"table": table, "status": "error", "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="metadata-profile") as pool:
+            report = list(pool.map(task, tables))
+
+        logger.log("METADATA_PROFILE", {
+            "tables": len(report),
+            "profiled": [r["table"] for r in report if r["status"] == "profiled"],
+            "fresh": sum(1 for r in report if r["status"] == "fresh"),
+            "errors": sum(1 for r in report if r["status"] == "error"),
+            "workers": self.workers,
+            "time_ms": round((datetime.now() - started).total_seconds() * 1000, 2),
+            "metadata_dir": str(self.metadata_dir)
+        })
+        return report
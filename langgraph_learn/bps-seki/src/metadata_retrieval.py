@@ -0,0 +1,184 @@
+# src/metadata_retrieval.py
+"""Retrieval tabel berbasis BM25 (sparse matrix) dengan index yang dipersist ke DATA_DIR"""
+
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .config import config
+from .logger import AuditLogger
+from .metadata_snapshot import metadata_dir_key
+
+logger = AuditLogger()
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Bobot term per field (BM25F sederhana): tf efektif = sum(boost_field * tf_field)
+FIELD_BOOSTS = {
+    "description": 3.0,
+    "column_name": 2.0,
+    "column_description": 1.0,
+    "example_value": 0.5,
+}
+
+INDEX_VERSION = 1
+
+def tokenize_text(text: str) -> List[str]:
+    """Lowercase + pecah di non-alfanumerik (nama kolom `jumlah_penduduk` -> jumlah, penduduk)"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+def table_fields(meta: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Token per field dari satu entry metadata"""
+    fields = {name: [] for name in FIELD_BOOSTS}
+    fields["description"] = tokenize_text(meta.get("description", ""))
+    for col_name, col_info in meta.get("columns", {}).items():
+        fields["column_name"] += tokenize_text(col_name)
+        description = col_info.get("description", "") if isinstance(col_info, dict) else col_info
+        fields["column_description"] += tokenize_text(description or "")
+    for row in meta.get("example_rows", []):
+        for value in row.values():
+            if isinstance(value, str):
+                fields["example_value"] += tokenize_text(value)
+    return fields
+
+class BM25Index:
+    """
+    Matriks tabel x vocab berisi bobot BM25 yang sudah dihitung (idf * saturasi tf * normalisasi panjang).
+    Skor query = matriks @ vektor term query, top-k via argpartition.
+    Panjang dokumen dinormalisasi sehingga tabel lebar tidak otomatis menang.
+    """
+
+    def __init__(self, tables: List[str], vocab: Dict[str, int], matrix: sparse.csr_matrix, signature: str = ""):
+        self.tables = tables
+        self.vocab = vocab
+        self.matrix = matrix
+        self.signature = signature
+
+    @classmethod
+    def build(cls, metadata: Dict[str, Any], signature: str = "", k1: float = None, b: float = None) -> "BM25Index":
+        k1 = k1 if k1 is not None else config.METADATA_BM25_K1
+        b = b if b is not None else config.METADATA_BM25_B
+
+        tables = list(metadata.keys())
+        vocab: Dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        lengths = np.zeros(len(tables), dtype=np.float64)
+
+        for doc_idx, meta in enumerate(metadata.values()):
+            weighted = Counter()
+            for field, tokens in table_fields(meta).items():
+                boost = FIELD_BOOSTS[field]
+                for token in tokens:
+                    weighted[token] += boost
+            lengths[doc_idx] = sum(weighted.values())
+            for token, tf in weighted.items():
+                rows.append(doc_idx)
+                cols.append(vocab.setdefault(token, len(vocab)))
+                tfs.append(tf)
+
+        rows = np.asarray(rows, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        tfs = np.asarray(tfs, dtype=np.float64)
+
+        n_docs = max(len(tables), 1)
+        df = np.bincount(cols, minlength=len(vocab))
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        avg_length = lengths.mean() if len(tables) else 1.0
+        norm = k1 * (1.0 - b + b * lengths[rows] / (avg_length or 1.0))
+        weights = idf[cols] * tfs * (k1 + 1.0) / (tfs + norm)
+
+        matrix = sparse.csr_matrix((weights, (rows, cols)), shape=(len(tables), len(vocab)), dtype=np.float64)
+        return cls(tables, vocab, matrix, signature)
+
+    def query_vector(self, query: str) -> Optional[sparse.csr_matrix]:
+        ids = [self.vocab[token] for token in set(tokenize_text(query)) if token in self.vocab]
+        if not ids:
+            return None
+        return sparse.csr_matrix((np.ones(len(ids)), (ids, np.zeros(len(ids), dtype=np.int32))),
+                                 shape=(len(self.vocab), 1))
+
+    def top_k(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """[(table_name, score)] top-k dengan score > 0, urut dari skor tertinggi"""
+        vector = self.query_vector(query)
+        if vector is None or not self.tables:
+            return []
+
+        scores = np.asarray((self.matrix @ vector).todense()).ravel()
+        k = min(k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # Urutan stabil: skor desc, lalu urutan metadata
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.tables[i], float(scores[i])) for i in candidates if scores[i] > 0]
+
+    # ---------- Persistence ----------
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        vocab = sorted(self.vocab, key=self.vocab.get)
+        np.savez_compressed(
+            tmp_path,
+            version=np.array(INDEX_VERSION),
+            signature=np.array(self.signature),
+            tables=np.array(self.tables, dtype=str),
+            vocab=np.array(vocab, dtype=str),
+            data=self.matrix.data,
+            indices=self.matrix.indices,
+            indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape)
+        )
+        tmp_path.replace(path)  # atomik: reader tidak pernah melihat file setengah jadi
+
+    @classmethod
+    def load(cls, path: Path, signature: str = None) -> Optional["BM25Index"]:
+        """Load index dari disk; None jika tidak ada, versi beda, atau signature metadata berubah"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                if int(npz["version"]) != INDEX_VERSION:
+                    return None
+                if signature is not None and str(npz["signature"]) != signature:
+                    return None
+                matrix = sparse.csr_matrix((npz["data"], npz["indices"], npz["indptr"]), shape=tuple(npz["shape"]))
+                vocab = {token: i for i, token in enumerate(npz["vocab"].tolist())}
+                return cls(npz["tables"].tolist(), vocab, matrix, str(npz["signature"]))
+        except (OSError, KeyError, ValueError) as e:
+            logger.log("METADATA_BM25_ERROR", {"path": str(path), "error": str(e)}, level="WARNING")
+            return None
+
+def index_path(metadata_dir: Path) -> Path:
+    """Satu index per folder metadata, seperti snapshot katalog"""
+    return config.DATA_DIR / f"metadata_bm25_{metadata_dir_key(metadata_dir)}.npz"
+
+def load_or_build(metadata: Dict[str, Any], signature: str, metadata_dir: Path = None,
+                  path: Path = None) -> BM25Index:
+    """Pakai index di disk jika signature metadata sama; jika tidak, bangun ulang dan simpan"""
+    path = path or index_path(metadata_dir or config.METADATA_DIR)
+    start = time.perf_counter()
+    index = BM25Index.load(path, signature)
+    status = "LOADED"
+    if index is None:
+        index = BM25Index.build(metadata, signature)
+        try:
+            index.save(path)
+        except OSError as e:
+            logger.log("METADATA_BM25_ERROR", {"path": str(path), "error": str(e)}, level="WARNING")
+        status = "BUILT"
+
+    logger.log("METADATA_BM25_INDEX", {
+        "status": status,
+        "tables": len(index.tables),
+        "vocab": len(index.vocab),
+        "nnz": int(index.matrix.nnz),
+        "time_ms": round((time.perf_counter() - start) * 1000, 2),
+        "path": str(path)
+    })
+    return index
@@ -0,0 +1,122 @@
+# src/metadata_snapshot.py
+"""Snapshot biner katalog metadata (pickle + manifest hash) untuk cold start cepat"""
+
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+# Naikkan jika struktur katalog / MetadataIndex berubah agar snapshot lama diabaikan
+SNAPSHOT_VERSION = 3
+
+def metadata_dir_key(metadata_dir: Path) -> str:
+    """Kunci file turunan per folder metadata (manager dengan metadata_dir berbeda tidak saling menimpa)"""
+    return hashlib.sha1(str(Path(metadata_dir).resolve()).encode("utf-8")).hexdigest()[:12]
+
+def snapshot_path(metadata_dir: Path) -> Path:
+    """Satu file snapshot per folder metadata"""
+    return config.DATA_DIR / f"metadata_snapshot_{metadata_dir_key(metadata_dir)}.pkl"
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def save_snapshot(metadata_dir: Path, files: Dict[str, Tuple[int, int]], metadata: Dict[str, Any],
+                  index, tables: Dict[str, Any], path: Path = None,
+                  previous_manifest: Dict[str, Tuple[int, int, str]] = None) -> Optional[Dict[str, Tuple[int, int, str]]]:
+    """
+    Tulis katalog, index, dan TableMeta terkompilasi dalam satu file pickle.
+    Manifest berisi (mtime_ns, size, sha1) per file JSON; sha1 dipakai saat mtime berubah
+    tetapi isi file sama (mis. hasil `touch` atau checkout ulang).
+    previous_manifest: sha1 file yang (mtime_ns, size)-nya tidak berubah dipakai ulang (hot reload
+    hanya meng-hash file yang berubah). Return manifest yang ditulis, None jika gagal / dilewati.
+    """
+    path = Path(path or snapshot_path(metadata_dir))
+    metadata_dir = Path(metadata_dir)
+    previous_manifest = previous_manifest or {}
+    try:
+        manifest = {}
+        for name, (mtime_ns, size) in files.items():
+            previous = previous_manifest.get(name)
+            if previous is not None and previous[:2] == (mtime_ns, size):
+                manifest[name] = previous
+                continue
+            digest = file_digest(metadata_dir / name)
+            st = os.stat(metadata_dir / name)
+            if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+                return None  # file berubah setelah di-parse; snapshot ditulis di reload berikutnya
+            manifest[name] = (mtime_ns, size, digest)
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "metadata_dir": str(Path(metadata_dir).resolve()),
+            "manifest": manifest,
+            "metadata": metadata,
+            "index": index,
+            "tables": tables
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)  # atomik: proses lain tidak pernah membaca snapshot setengah jadi
+        return manifest
+    except (OSError, pickle.PicklingError) as e:
+        logger.log("METADATA_SNAPSHOT_ERROR", {"path": str(path), "error": str(e)}, level="WARNING")
+        return None
+
+def load_snapshot(metadata_dir: Path, files: Dict[str, Tuple[int, int]],
+                  path: Path = None) -> Optional[Dict[str, Any]]:
+    """
+    Load snapshot jika manifest masih cocok dengan file JSON di disk, selain itu None
+    (caller kembali ke parse JSON). Return {"metadata", "index", "tables", "files", "manifest", "touched"};
+    touched=True jika ada file yang mtime-nya berubah tapi isinya sama (manifest perlu ditulis ulang).
+    Snapshot hanya dibaca dari DATA_DIR milik aplikasi sendiri (pickle tidak aman untuk file asing).
+    """
+    path = Path(path or snapshot_path(metadata_dir))
+    if not path.exists():
+        return None
+
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logger.log("METADATA_SNAPSHOT_ERROR", {"path": str(path), "error": str(e)}, level="WARNING")
+        return None
+
+    reason, touched = None, False
+    if not isinstance(payload, dict) or payload.get("version") != SNAPSHOT_VERSION:
+        reason = "version"
+    elif payload["metadata_dir"] != str(Path(metadata_dir).resolve()):
+        reason = "metadata_dir"
+    elif set(payload["manifest"]) != set(files):
+        reason = "files"
+    else:
+        for name, (mtime_ns, size) in files.items():
+            old_mtime_ns, old_size, digest = payload["manifest"][name]
+            if (old_mtime_ns, old_size) == (mtime_ns, size):
+                continue
+            if old_size != size or file_digest(Path(metadata_dir) / name) != digest:
+                reason = f"content:{name}"
+                break
+            touched = True
+
+    if reason:
+        logger.log("METADATA_SNAPSHOT_STALE", {"path": str(path), "reason": reason})
+        return None
+
+    logger.log("METADATA_SNAPSHOT_LOADED", {
+        "path": str(path),
+        "tables": len(payload["metadata"]),
+        "bytes": os.path.getsize(path),
+        "load_time_ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+    return {"metadata": payload["metadata"], "index": payload["index"], "tables": payload["tables"],
+            "files": files, "manifest": payload["manifest"], "touched": touched}
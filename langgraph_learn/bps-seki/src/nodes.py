@@ -9,8 +9,13 @@ from .state import AgentState
 from .config import config
 from .logger import AuditLogger
 from .metadata_manager import MetadataManager
+from .entity_index import get_entity_index, entity_filters
 from .sql_validator import SQLValidator
+from .sql_pipeline import SQLPipeline
 from .sql_executor import SQLExecutor
+from .slow_query import query_context
+from .rollup import get_rollup_manager
+from .result_spill import page_count
 from .llm_client import llm_client
 from .smart_selector import SmartTableSelector
 from .forecast_agent import EnhancedForecastAgent, SimpleForecastAgent
@@ -20,10 +25,38 @@ from .tools import web_search_tool  # <--- IMPORT BARU
 logger = AuditLogger()
 metadata_manager = MetadataManager()
 sql_executor = SQLExecutor()
+rollup_manager = get_rollup_manager()
+entity_index = get_entity_index()
 smart_selector = SmartTableSelector()
 enhanced_forecast_agent = EnhancedForecastAgent(llm_client)
 simple_forecast_agent = SimpleForecastAgent()
 
+def execution_error_details(result: Dict[str, Any]) -> Dict[str, Any]:
+    """error_details untuk error_handler dari hasil sql_executor yang gagal (timeout / cost_guard / not_authorized)"""
+    return {
+        "error_type": result["error_type"],
+        "timeout_reason": result.get("timeout_reason"),
+        "execution_time": result.get("execution_time"),
+        "vm_steps": result.get("vm_steps"),
+        "plan": result.get("plan", []),
+        "scanned_tables": result.get("scanned_tables", []),
+        "sql": result.get("sql")
+    }
+
+def _lookup_entities(user_input: str) -> list:
+    """Nilai area/region/kategori yang disebut user (FTS5 lookup, tanpa LLM)"""
+    if not config.ENTITY_INDEX_ENABLED:
+        return []
+    return entity_index.lookup(user_input)
+
+def _entity_filters(state: AgentState, table_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Filter entitas untuk tabel terpilih; access column tetap diatur oleh filter region"""
+    return entity_filters(
+        state.get("entity_hits") or [],
+        state["selected_table"],
+        exclude=[table_info["metadata"].get("access_column")]
+    )
+
 # --- Basic Nodes ---
 
 def router_node(state: AgentState) -> AgentState:
@@ -62,8 +95,10 @@ def enhanced_metadata_retriever_node(state: AgentState) -> AgentState:
         state["next_node"] = "clarify_agent"
         return state
 
-    # Find relevant tables
-    relevant_tables = metadata_manager.find_relevant_tables(state["user_input"], top_k=5)
+    # Find relevant tables (tabel yang memuat entitas yang disebut user ikut diprioritaskan)
+    entity_hits = _lookup_entities(state["user_input"])
+    state["entity_hits"] = entity_hits
+    relevant_tables = metadata_manager.find_relevant_tables(state["user_input"], top_k=5, entity_hits=entity_hits)
     state["relevant_tables"] = relevant_tables
     
     if not relevant_tables:
@@ -147,17 +182,20 @@ def enhanced_sql_agent_node(state: AgentState) -> AgentState:
         # Coba construct table info manual jika tidak ada di relevant_tables (fallback)
         meta = metadata_manager.get_table_metadata(state["selected_table"])
         if meta:
-             table_info = {"table_name": state["selected_table"], "metadata": meta}
+             table_info = {"table_name": state["selected_table"], "metadata": meta,
+                           "table": metadata_manager.get_table(state["selected_table"])}
         else:
             state["error"] = f"Table {state['selected_table']} not found"
             state["next_node"] = "error_handler"
             return state
     
     # Build smart prompt
+    filters = _entity_filters(state, table_info)
     prompt = smart_selector.build_smart_sql_prompt(
         user_query=state["user_input"],
         table_info=table_info,
-        user_context=state.get("user_context", {})
+        user_context=state.get("user_context", {}),
+        entity_filters=filters
     )
     
     # Generate SQL dengan LLM
@@ -172,32 +210,30 @@ def enhanced_sql_agent_node(state: AgentState) -> AgentState:
     raw_sql = response["content"].strip()
     raw_sql = raw_sql.replace("```sql", "").replace("```", "").strip()
     
-    # Validate SQL
-    validation = SQLValidator.validate_sql(raw_sql)
-    if not validation["is_valid"]:
-        state["error"] = f"SQL validation failed: {validation['reason']}"
+    # Parse sekali: validasi, region & tahun sebagai bound parameters, LIMIT -> serialisasi sekali
+    prepared = SQLPipeline.run(
+        raw_sql,
+        access_column=table_info["metadata"].get("access_column"),
+        region=state.get("user_context", {}).get("region"),
+        table=state["selected_table"],
+        filters=filters
+    )
+    if not prepared["is_valid"]:
+        state["error"] = f"SQL validation failed: {prepared['reason']}"
         state["next_node"] = "error_handler"
         return state
     
-    # Inject region filter
-    access_column = table_info["metadata"].get("access_column")
-    if access_column and state.get("user_context", {}).get("region"):
-        raw_sql = SQLValidator.inject_region_filter(
-            raw_sql, 
-            access_column, 
-            state["user_context"]["region"]
-        )
-    
-    # Add LIMIT jika tidak ada
-    raw_sql = SQLValidator.add_limit_if_missing(raw_sql)
+    validated_sql, sql_params = prepared["validated_sql"], prepared["params"]
     
     state["raw_sql"] = raw_sql
-    state["validated_sql"] = raw_sql
+    state["validated_sql"] = validated_sql
+    state["sql_params"] = sql_params
     state["next_node"] = "sql_executor"
     
     logger.log("ENHANCED_SQL_GENERATED", {
         "table": state["selected_table"],
-        "sql_preview": raw_sql
+        "sql_preview": validated_sql,
+        "params": sql_params
     }, level="SUCCESS")
     
     return state
@@ -211,13 +247,39 @@ def sql_executor_node(state: AgentState) -> AgentState:
         state["next_node"] = "error_handler"
         return state
     
-    result = sql_executor.execute(state["validated_sql"])
+    # Rewrite pass: agregasi year/region/leveldata dijawab dari rollup table (jika tersedia & fresh)
+    sql_to_run = state["validated_sql"]
+    rewrite = rollup_manager.rewrite(sql_to_run)
+    if rewrite:
+        sql_to_run = rewrite["sql"]
+        logger.log("ROLLUP_REWRITE", {
+            "base_table": rewrite["base_table"],
+            "rollup_table": rewrite["rollup_table"],
+            "original_sql": state["validated_sql"],
+            "sql_preview": sql_to_run,
+            "message": f"Query answered from {rewrite['rollup_table']}"
+        })
+    
+    # Streaming: hanya head rows + running aggregates yang disimpan di state
+    # query_context: pertanyaan user ikut tercatat di slow-query log
+    with query_context(state.get("user_input")):
+        result = sql_executor.execute_summary(
+            sql_to_run,
+            params=state.get("sql_params") or None,
+            head_rows=getattr(config, 'RESULT_HEAD_ROWS', 10),
+            cancel_token=state.get("cancel_token")
+        )
+    
+    if result["success"] and rewrite:
+        result["rollup_table"] = rewrite["rollup_table"]
     
     if result["success"]:
         state["execution_result"] = result
         state["next_node"] = "response_formatter"
     else:
         state["error"] = result["error"]
+        if result.get("error_type"):
+            state["error_details"] = execution_error_details(result)
         state["next_node"] = "error_handler"
     
     return state
@@ -233,9 +295,12 @@ def metadata_retriever_node_basic(state: AgentState) -> AgentState:
         return state
     
     # Cari tabel relevan (hanya top 3 untuk simplicity)
+    entity_hits = _lookup_entities(state["user_input"])
+    state["entity_hits"] = entity_hits
     relevant_tables = metadata_manager.find_relevant_tables(
         state["user_input"], 
-        top_k=3
+        top_k=3,
+        entity_hits=entity_hits
     )
     
     state["relevant_tables"] = relevant_tables
@@ -304,13 +369,14 @@ def sql_agent_node_basic(state: AgentState) -> AgentState:
         # Fallback load manual
         meta = metadata_manager.get_table_metadata(state["selected_table"])
         if meta:
-             table_info = {"table_name": state["selected_table"], "metadata": meta}
+             table_info = {"table_name": state["selected_table"], "metadata": meta,
+                           "table": metadata_manager.get_table(state["selected_table"])}
         else:
             state["error"] = f"Tabel {state['selected_table']} tidak ditemukan"
             state["next_node"] = "error_handler"
             return state
     
-    schema_text = metadata_manager.build_schema_prompt(table_info)
+    schema_text = metadata_manager.build_schema_prompt(table_info, state["user_input"])
     default_limit = getattr(config, 'DEFAULT_LIMIT', 5)
 
     prompt = f"""
@@ -340,29 +406,29 @@ def sql_agent_node_basic(state: AgentState) -> AgentState:
     raw_sql = response["content"].strip()
     raw_sql = raw_sql.replace("```sql", "").replace("```", "").strip()
     
-    validation = SQLValidator.validate_sql(raw_sql)
-    if not validation["is_valid"]:
-        state["error"] = f"SQL validation failed: {validation['reason']}"
+    prepared = SQLPipeline.run(
+        raw_sql,
+        access_column=table_info["metadata"].get("access_column"),
+        region=state.get("user_context", {}).get("region"),
+        table=state["selected_table"],
+        filters=_entity_filters(state, table_info)
+    )
+    if not prepared["is_valid"]:
+        state["error"] = f"SQL validation failed: {prepared['reason']}"
         state["next_node"] = "error_handler"
         return state
     
-    access_column = table_info["metadata"].get("access_column")
-    if access_column and state.get("user_context", {}).get("region"):
-        raw_sql = SQLValidator.inject_region_filter(
-            raw_sql, 
-            access_column, 
-            state["user_context"]["region"]
-        )
-    
-    raw_sql = SQLValidator.add_limit_if_missing(raw_sql)
+    validated_sql, sql_params = prepared["validated_sql"], prepared["params"]
     
     state["raw_sql"] = raw_sql
-    state["validated_sql"] = raw_sql
+    state["validated_sql"] = validated_sql
+    state["sql_params"] = sql_params
     state["next_node"] = "sql_executor"
     
     logger.log("SQL_BASIC_GENERATED", {
         "table": state["selected_table"],
-        "sql_preview": raw_sql
+        "sql_preview": validated_sql,
+        "params": sql_params
     }, level="SUCCESS")
     
     return state
@@ -410,17 +476,23 @@ def forecast_agent_node_basic(state: AgentState) -> AgentState:
     value_col = value_candidates[0] if value_candidates else list(columns.keys())[1] if len(columns) > 1 else list(columns.keys())[0]
     
     sql = f"SELECT {date_col}, {value_col} FROM {table_name}"
+    params = {}
     
     access_column = table_meta.get("access_column")
     if access_column and state.get("user_context", {}).get("region"):
-        sql += f" WHERE {access_column} LIKE '{state['user_context']['region']}%'"
+        sql += f" WHERE {access_column} LIKE :{SQLValidator.REGION_PARAM}"
+        params[SQLValidator.REGION_PARAM] = f"{state['user_context']['region']}%"
     
     sql += f" ORDER BY {date_col}"
     
-    result = sql_executor.execute(sql)
+    with query_context(state.get("user_input")):
+        result = sql_executor.execute(sql, params or None, spill=False,
+                                      cancel_token=state.get("cancel_token"))
     
     if not result["success"]:
         state["error"] = result.get("error", "Unknown SQL error")
+        if result.get("error_type"):
+            state["error_details"] = execution_error_details(result)
         state["next_node"] = "error_handler"
         return state
     
@@ -561,6 +633,8 @@ def response_formatter_node(state: AgentState) -> AgentState:
                 # Jika ada SQL, tampilkan untuk debug
                 if state.get("validated_sql"):
                     response += f"\n\n**Query SQL:**\n```sql\n{state.get('validated_sql')}\n```"
+                    if state.get("sql_params"):
+                        response += f"\n**Parameter:** `{state.get('sql_params')}`"
                 
                 state["final_answer"] = response
             
@@ -571,6 +645,19 @@ def response_formatter_node(state: AgentState) -> AgentState:
                 # Konversi data ke string CSV/Markdown untuk prompt
                 data_preview = df.head(10).to_markdown(index=False)
                 
+                # Jika hasil di-stream, tambahkan ringkasan seluruh baris (bukan hanya head)
+                summary_text = ""
+                if result.get("is_partial"):
+                    summary_lines = [
+                        f"Total baris: {result.get('row_count', len(df))} (ditampilkan {len(df)} baris pertama)"
+                    ]
+                    for col, stats in result.get("aggregates", {}).items():
+                        summary_lines.append(
+                            f"- {col}: count={stats['count']}, sum={stats['sum']:.2f}, "
+                            f"min={stats['min']:.2f}, max={stats['max']:.2f}, mean={stats['mean']:.2f}"
+                        )
+                    summary_text = "RINGKASAN SELURUH DATA:\n" + "\n".join(summary_lines)
+                
                 user_query = state['user_input']
                 table_name = state.get('selected_table', 'Unknown')
                 
@@ -583,6 +670,8 @@ def response_formatter_node(state: AgentState) -> AgentState:
                 SUMBER DATA (Tabel: {table_name}):
                 {data_preview}
                 
+                {summary_text}
+                
                 INSTRUKSI:
                 1. Jawab pertanyaan pengguna berdasarkan data di atas.
                 2. Berikan analisis singkat atau highlight (misal: tren, nilai tertinggi/terendah).
@@ -600,6 +689,14 @@ def response_formatter_node(state: AgentState) -> AgentState:
                 else:
                     # Fallback jika LLM gagal format
                     state["final_answer"] = f"Berikut data yang ditemukan:\n\n{data_preview}\n\n(Gagal membuat narasi penjelasan)"
+                
+                # Hasil lengkap ada di file spill; UI membacanya per halaman
+                spill = result.get("spill")
+                if spill:
+                    state["final_answer"] += (
+                        f"\n\n📄 _Hasil lengkap: {spill['row_count']} baris "
+                        f"({page_count(spill)} halaman × {spill['page_size']} baris)._"
+                    )
 
         # --- KASUS 2: Hasil dari Forecast Agent ---
         elif state.get("forecast_result"):
@@ -655,17 +752,50 @@ def error_handler_node(state: AgentState) -> AgentState:
     logger.log("NODE_ENTER", {"node": "error_handler"})
     
     error_msg = state.get("error", "Unknown error")
-    
-    response = f"⚠️ **ERROR**\n\n{error_msg}\n\n"
-    response += f"**Query:** {state.get('user_input', 'N/A')}\n"
-    response += f"**Table:** {state.get('selected_table', 'N/A')}\n\n"
-    response += "Silakan coba lagi dengan query yang lebih spesifik."
+    error_details = state.get("error_details") or {}
+    
+    if error_details.get("error_type") == "timeout":
+        # Query dihentikan oleh budget waktu/VM-step atau dibatalkan
+        reasons = {
+            "timeout": "melebihi batas waktu eksekusi",
+            "step_budget": "melebihi batas komputasi (VM steps)",
+            "cancelled": "dibatalkan"
+        }
+        reason_text = reasons.get(error_details.get("timeout_reason"), "dihentikan")
+        
+        response = f"⏱️ **QUERY DIHENTIKAN**\n\n"
+        response += f"Query {reason_text} setelah {error_details.get('execution_time', 0):.2f} detik.\n\n"
+        response += f"**Query:** {state.get('user_input', 'N/A')}\n"
+        response += f"**Table:** {state.get('selected_table', 'N/A')}\n"
+        if error_details.get("plan"):
+            plan_text = "\n".join(f"- {step}" for step in error_details["plan"])
+            response += f"\n**Query Plan:**\n{plan_text}\n"
+        response += "\nSilakan persempit pertanyaan (misal: sebutkan tahun atau wilayah tertentu)."
+    elif error_details.get("error_type") == "cost_guard":
+        # Query ditolak sebelum dieksekusi karena full scan tabel besar tanpa LIMIT
+        response = f"🛑 **QUERY TERLALU BERAT**\n\n"
+        response += f"Query akan membaca seluruh isi tabel {', '.join(error_details.get('scanned_tables', []))} tanpa batas baris.\n\n"
+        response += f"**Query:** {state.get('user_input', 'N/A')}\n"
+        response += f"**Table:** {state.get('selected_table', 'N/A')}\n"
+        response += "\nSilakan persempit pertanyaan (misal: sebutkan tahun atau wilayah tertentu)."
+    elif error_details.get("error_type") == "not_authorized":
+        # Ditolak authorizer SQLite: operasi tulis / PRAGMA / baca data di luar region user
+        response = f"🔒 **AKSES DITOLAK**\n\n"
+        response += "Query mencoba operasi yang tidak diizinkan atau membaca data di luar wilayah akses Anda.\n\n"
+        response += f"**Query:** {state.get('user_input', 'N/A')}\n"
+        response += f"**Region:** {state.get('user_context', {}).get('region', 'N/A')}\n"
+    else:
+        response = f"⚠️ **ERROR**\n\n{error_msg}\n\n"
+        response += f"**Query:** {state.get('user_input', 'N/A')}\n"
+        response += f"**Table:** {state.get('selected_table', 'N/A')}\n\n"
+        response += "Silakan coba lagi dengan query yang lebih spesifik."
     
     state["final_answer"] = response
     state["next_node"] = "end"
     
     logger.log("ERROR_HANDLED", {
         "error": error_msg,
+        "error_type": error_details.get("error_type"),
         "user_input": state.get("user_input")
     }, level="ERROR")
     
@@ -0,0 +1,158 @@
+# src/prompt_builder.py
+"""Schema prompt yang dipangkas sesuai pertanyaan dan dibatasi token budget"""
+
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, NamedTuple, Tuple
+
+from .config import config
+from .logger import AuditLogger
+from .catalog import TableMeta, ColumnMeta
+
+logger = AuditLogger()
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+CHARS_PER_TOKEN = 4  # estimasi tanpa tokenizer model (BPE rata-rata ~4 karakter per token)
+EXAMPLE_ROWS = 2
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+class SchemaFragment(NamedTuple):
+    columns: Tuple[str, ...]   # kolom yang dipertahankan (urutan tabel)
+    columns_text: str          # blok "  - nama (tipe): deskripsi"
+    example_json: str          # example_rows yang diproyeksikan ke kolom terpilih
+    tokens_before: int         # estimasi token schema lengkap
+    tokens_after: int
+
+class SchemaPromptBuilder:
+    """
+    Ranking kolom terhadap pertanyaan (kata di nama kolom > kata di deskripsi > prefix 4 huruf).
+    Access column, kolom tahun/tanggal utama dan kolom nilai utama selalu dipertahankan;
+    kolom lain ditambahkan sesuai ranking selama masih muat di budget, lalu example_rows
+    (hanya kolom terpilih) jika sisa budget cukup.
+    Fragment yang sudah di-render di-memoize per (tabel, subset kolom).
+    """
+
+    def __init__(self, token_budget: int = None, max_entries: int = 512):
+        self.token_budget = token_budget if token_budget is not None else config.SCHEMA_PROMPT_TOKEN_BUDGET
+        self.max_entries = max_entries
+        self._fragments: "OrderedDict[Tuple, Tuple[TableMeta, Tuple[str, str, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------- Ranking ----------
+
+    @staticmethod
+    def required_columns(table: TableMeta) -> List[str]:
+        """Access column + kolom tanggal & nilai utama (sama dengan pilihan detect_time_series_columns)"""
+        required = [c.name for c in table.columns if c.is_access]
+        dates = [c for c in table.columns if c.is_date]
+        values = [c for c in table.columns if c.is_value]
+        if dates:
+            required.append(max(dates, key=lambda c: c.date_score).name)
+        if values:
+            required.append(max(values, key=lambda c: c.value_score).name)
+        required += [c.name for c in table.columns if c.is_year]
+        return list(dict.fromkeys(required))
+
+    @staticmethod
+    def _score(column: ColumnMeta, words: set) -> float:
+        parts = set(_WORD_RE.findall(column.name_lower))
+        description = set(_WORD_RE.findall(str(column.description).lower()))
+        score = 3.0 * len(parts & words) + 1.0 * len(description & words)
+        prefixes = {w[:4] for w in words if len(w) >= 4}
+        score += sum(1 for part in parts - words if len(part) >= 4 and part[:4] in prefixes)
+        if column.is_value:
+            score += 0.5  # kolom nilai lebih mungkin dibutuhkan daripada kolom atribut
+        return score
+
+    def rank_columns(self, table: TableMeta, question: str, keep: Iterable[str] = ()) -> List[ColumnMeta]:
+        """Kolom urut prioritas: wajib (required + keep) dulu, lalu skor relevansi, lalu urutan tabel"""
+        words = {w for w in _WORD_RE.findall(question.lower()) if len(w) >= 3}
+        required = {name.lower() for name in self.required_columns(table)} | {name.lower() for name in keep}
+        order = {c.name: i for i, c in enumerate(table.columns)}
+        return sorted(
+            table.columns,
+            key=lambda c: (c.name_lower not in required, -self._score(c, words), order[c.name])
+        )
+
+    # ---------- Render ----------
+
+    def _render(self, table: TableMeta, columns: Tuple[str, ...], examples: int) -> Tuple[str, str, int]:
+        """columns_text, example_json, estimasi token untuk satu subset kolom (memo LRU)"""
+        key = (table.name, id(table), columns, examples)
+        with self._lock:
+            entry = self._fragments.get(key)
+            if entry is not None and entry[0] is table:
+                self._fragments.move_to_end(key)
+                return entry[1]
+
+        selected = set(columns)
+        columns_text = "\n".join(c.prompt_line for c in table.columns if c.name in selected)
+        rows = [{k: v for k, v in row.items() if k in selected} for row in table.example_rows[:examples]]
+        example_json = json.dumps(rows, ensure_ascii=False)
+        rendered = (columns_text, example_json, estimate_tokens(columns_text) + estimate_tokens(example_json))
+
+        with self._lock:
+            self._fragments[key] = (table, rendered)
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return rendered
+
+    def build(self, table: TableMeta, question: str, keep: Iterable[str] = (), log: bool = True) -> SchemaFragment:
+        """Blok kolom + example data untuk prompt SQL yang muat di token_budget"""
+        all_columns = tuple(table.column_names)
+        tokens_before = estimate_tokens(table.columns_text) + estimate_tokens(table.example_json)
+
+        if not config.SCHEMA_PROMPT_PRUNING or self.token_budget <= 0 or tokens_before <= self.token_budget:
+            fragment = SchemaFragment(all_columns, table.columns_text, table.example_json, tokens_before, tokens_before)
+        else:
+            keep = list(keep)
+            required = {name.lower() for name in self.required_columns(table)} | {name.lower() for name in keep}
+            selected, used = [], 0
+            for column in self.rank_columns(table, question, keep):
+                cost = estimate_tokens(column.prompt_line) + 1  # +1 newline
+                if column.name_lower in required or used + cost <= self.token_budget:
+                    selected.append(column.name)
+                    used += cost
+
+            selected_set = set(selected)
+            columns = tuple(name for name in all_columns if name in selected_set)
+            # Example rows hanya jika masih muat (makin sedikit baris makin murah)
+            for examples in range(EXAMPLE_ROWS, -1, -1):
+                columns_text, example_json, tokens_after = self._render(table, columns, examples)
+                if tokens_after <= self.token_budget or examples == 0:
+                    break
+            fragment = SchemaFragment(columns, columns_text, example_json, tokens_before, tokens_after)
+
+        if log:
+            logger.log("SCHEMA_PROMPT", {
+                "table": table.name,
+                "columns_total": len(all_columns),
+                "columns_kept": len(fragment.columns),
+                "dropped": [name for name in all_columns if name not in fragment.columns],
+                "tokens_before": fragment.tokens_before,
+                "tokens_after": fragment.tokens_after,
+                "token_budget": self.token_budget
+            })
+        return fragment
+
+    def schema_prompt(self, table: TableMeta, question: str, keep: Iterable[str] = ()) -> str:
+        """Versi terpangkas dari TableMeta.schema_prompt (format sama)"""
+        fragment = self.build(table, question, keep)
+        return f"""Table: {table.name}
+Description: {table.description}
+Columns:
+{fragment.columns_text}
+Access Column: {table.raw.get('access_column', 'None')}
+Example Data: {fragment.example_json}"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"fragments": len(self._fragments), "token_budget": self.token_budget}
+
+# Builder bersama (memo fragment dipakai lintas node)
+schema_prompt_builder = SchemaPromptBuilder()
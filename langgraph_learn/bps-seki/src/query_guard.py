@@ -0,0 +1,96 @@
+# src/query_guard.py
+"""Budget waktu / VM-step dan pembatalan query via SQLite progress handler"""
+
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .config import config
+
+class CancelToken:
+    """Handle pembatalan query yang bisa dipicu dari workflow / thread lain"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = "cancelled"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+class QueryInterrupted(sqlite3.OperationalError):
+    """Query dihentikan karena melewati budget atau dibatalkan"""
+
+    def __init__(self, reason: str, elapsed: float, vm_steps: int, detail: str = ""):
+        super().__init__(f"Query interrupted ({reason}) after {elapsed:.2f}s / {vm_steps} VM steps. {detail}".strip())
+        self.reason = reason      # "timeout" | "step_budget" | "cancelled"
+        self.elapsed = elapsed
+        self.vm_steps = vm_steps
+
+class QueryGuard:
+    """
+    Context manager yang memasang progress handler di koneksi selama query berjalan.
+    Handler dipanggil tiap `interval` instruksi VM; return 1 = SQLite menghentikan query.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, timeout: float = None, max_steps: int = None,
+                 cancel_token: Optional[CancelToken] = None, interval: int = None):
+        self.conn = conn
+        self.timeout = timeout if timeout is not None else config.QUERY_TIMEOUT_SECONDS
+        self.max_steps = max_steps if max_steps is not None else config.QUERY_MAX_VM_STEPS
+        self.cancel_token = cancel_token or CancelToken()
+        self.interval = interval or config.QUERY_PROGRESS_INTERVAL
+
+        self.deadline = None
+        self.start = None
+        self.steps = 0
+        self.reason = None
+
+    def _check(self) -> int:
+        self.steps += self.interval
+
+        if self.cancel_token.cancelled:
+            self.reason = "cancelled"
+            return 1
+        if self.max_steps and self.steps > self.max_steps:
+            self.reason = "step_budget"
+            return 1
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = "timeout"
+            return 1
+        return 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start if self.start is not None else 0.0
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        self.deadline = self.start + self.timeout if self.timeout else None
+        self.conn.set_progress_handler(self._check, self.interval)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.set_progress_handler(None, 0)
+        except sqlite3.Error:
+            pass
+
+        if (exc_type is not None and issubclass(exc_type, sqlite3.OperationalError)
+                and not isinstance(exc, QueryInterrupted) and self.reason):
+            raise QueryInterrupted(self.reason, self.elapsed, self.steps, self.describe()) from exc
+        return False
+
+    def describe(self) -> str:
+        if self.reason == "timeout":
+            return f"Time budget {self.timeout}s exceeded."
+        if self.reason == "step_budget":
+            return f"VM step budget {self.max_steps} exceeded."
+        if self.reason == "cancelled":
+            return f"Cancelled: {self.cancel_token.reason}."
+        return ""
@@ -0,0 +1,203 @@
+# src/result_cache.py
+"""Versioned query-result cache untuk SQLExecutor"""
+
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .config import config
+from .logger import AuditLogger
+from .memory_replica import get_replica_if_enabled
+
+logger = AuditLogger()
+
+# Token: string literal | quoted identifier | whitespace | sisanya
+_SQL_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+|[^'\"\s]+|['\"]")
+
+def normalize_sql(sql: str) -> str:
+    """Normalisasi SQL untuk cache key: whitespace dirapikan, lowercase di luar string literal"""
+    parts = []
+    for match in _SQL_TOKEN_RE.finditer(sql.strip().rstrip(";").strip()):
+        token = match.group()
+        if token.isspace():
+            parts.append(" ")
+        elif token[0] in ("'", '"'):
+            # Isi literal case-sensitive ('=' di SQLite membedakan huruf besar/kecil)
+            parts.append(token)
+        else:
+            parts.append(token.lower())
+    return "".join(parts)
+
+def make_cache_key(sql: str, params: Any = None) -> Tuple:
+    """Cache key = normalized SQL + params"""
+    if isinstance(params, dict):
+        params_key = tuple(sorted(params.items()))
+    elif params:
+        params_key = tuple(params)
+    else:
+        params_key = ()
+    return (normalize_sql(sql), repr(params_key))
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Buat DataFrame dengan array read-only agar isi cache tidak bisa diubah caller"""
+    arrays = {}
+    # Akses posisional: nama kolom bisa duplikat (misal SELECT year, year)
+    for i in range(df.shape[1]):
+        arr = np.array(df.iloc[:, i].to_numpy(), copy=True)
+        arr.flags.writeable = False
+        arrays[i] = arr
+    frozen = pd.DataFrame(arrays, index=df.index, copy=False)
+    frozen.columns = df.columns
+    return frozen
+
+class QueryResultCache:
+    """LRU cache hasil query, dibatasi jumlah entry & total bytes, invalidasi via versi database"""
+
+    def __init__(self, db_path: Path, max_entries: int = None, max_bytes: int = None, replica=None):
+        self.db_path = Path(db_path)
+        # Jika query dibaca dari MemoryReplica, generasi replica ikut menentukan versi
+        self.replica = replica
+        self.max_entries = max_entries or config.QUERY_CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or config.QUERY_CACHE_MAX_BYTES
+
+        self._entries = OrderedDict()  # key -> (result, size_bytes)
+        self._total_bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._watch_conn = None
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0
+        }
+
+    def _data_version(self) -> Optional[int]:
+        """PRAGMA data_version dari koneksi 'watch' khusus (berubah jika ada commit dari koneksi lain)"""
+        try:
+            if self._watch_conn is None:
+                uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+                self._watch_conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return self._watch_conn.execute("PRAGMA data_version;").fetchone()[0]
+        except sqlite3.Error:
+            self._watch_conn = None
+            return None
+
+    def current_version(self) -> Tuple:
+        """Versi database saat ini: (mtime_ns, size, data_version)"""
+        with self._lock:
+            return self._current_version_locked()
+
+    def _current_version_locked(self) -> Tuple:
+        try:
+            stat = self.db_path.stat()
+            file_sig = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_sig = (None, None)
+        version = file_sig + (self._data_version(),)
+        if self.replica is not None:
+            version += (self.replica.generation,)
+        return version
+
+    def _check_version_locked(self) -> Tuple:
+        """Kosongkan cache jika versi database berubah"""
+        version = self._current_version_locked()
+        if version != self._version:
+            if self._entries:
+                self.stats["invalidations"] += 1
+                logger.log("QUERY_CACHE_INVALIDATED", {
+                    "old_version": list(self._version) if self._version else None,
+                    "new_version": list(version),
+                    "dropped_entries": len(self._entries),
+                    "message": "Database changed, query cache cleared"
+                }, level="WARNING")
+            self._entries.clear()
+            self._total_bytes = 0
+            self._version = version
+        return version
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Ambil hasil dari cache (None jika miss)"""
+        with self._lock:
+            self._check_version_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            result = entry[0]
+
+        # Shallow copy: DataFrame baru yang berbagi array read-only
+        return {**result, "data": result["data"].copy(deep=False), "cached": True}
+
+    def put(self, key: Tuple, result: Dict[str, Any], version: Tuple = None):
+        """Simpan hasil query sukses ke cache"""
+        df = result.get("data")
+        if not result.get("success") or not isinstance(df, pd.DataFrame):
+            return
+
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        frozen = {**result, "data": freeze_frame(df)}
+
+        with self._lock:
+            current = self._check_version_locked()
+            if version is not None and version != current:
+                # Data berubah selama query berjalan: jangan simpan hasil lama
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+
+            self._entries[key] = (frozen, size)
+            self._total_bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """Kosongkan cache"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistik cache (hit/miss, ukuran)"""
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / total if total else 0.0,
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes
+            }
+
+# Registry cache per file database (dipakai bersama oleh semua instance SQLExecutor)
+_caches: Dict[str, QueryResultCache] = {}
+_caches_lock = threading.Lock()
+
+def get_result_cache(db_path: Path) -> QueryResultCache:
+    """Ambil (atau buat) result cache untuk file database tertentu"""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = QueryResultCache(Path(db_path), replica=get_replica_if_enabled(Path(db_path)))
+            _caches[key] = cache
+        return cache
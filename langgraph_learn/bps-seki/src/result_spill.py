@@ -0,0 +1,217 @@
+# src/result_spill.py
+"""Spill hasil query besar ke file Parquet di DATA_DIR; state hanya menyimpan handle + head + aggregates"""
+
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from .config import config
+from .logger import AuditLogger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional: tanpa pyarrow hasil tetap di memory (head saja)
+    pa = None
+    pq = None
+
+logger = AuditLogger()
+
+SPILL_FOLDER = "result_spill"
+
+def spill_available() -> bool:
+    return pq is not None
+
+def spill_dir() -> Path:
+    return config.DATA_DIR / SPILL_FOLDER
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Perkiraan ukuran DataFrame di memory (termasuk isi string)"""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+def over_budget(row_count: int, nbytes: int) -> bool:
+    """True jika hasil melewati RESULT_MAX_ROWS / RESULT_MAX_BYTES (0 = tanpa batas)"""
+    if config.RESULT_MAX_ROWS and row_count > config.RESULT_MAX_ROWS:
+        return True
+    return bool(config.RESULT_MAX_BYTES and nbytes > config.RESULT_MAX_BYTES)
+
+# Kind kolom dari columnar.resolve_column_kinds -> tipe Arrow (nullable, tidak bergantung isi chunk pertama)
+_KIND_TYPES = {"int": "int64", "real": "float64", "text": "string"}
+
+class ResultSpill:
+    """
+    Writer Parquet inkremental: tiap chunk hasil fetch ditulis sebagai row group,
+    sehingga halaman bisa dibaca ulang tanpa memuat seluruh file.
+    Schema ditetapkan sekali (dari declared kind kolom jika ada) dan setiap chunk di-cast ke schema itu,
+    jadi chunk dengan NULL di kolom integer (float64 di pandas) atau chunk pertama yang kosong tetap bisa ditulis.
+    """
+
+    def __init__(self, sql: str = None, params: Any = None, kinds: List[str] = None):
+        self.sql = sql
+        self.params = params
+        self.kinds = kinds
+        self.path = spill_dir() / f"result_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.parquet"
+        self.row_count = 0
+        self.columns: List[str] = []
+        self._writer = None
+        self._schema = None
+
+    @staticmethod
+    def _infer_type(series: pd.Series, complete: bool) -> "pa.DataType":
+        """Tipe Arrow untuk kolom tanpa declared kind (ekspresi / alias); complete=False: series hanya sampel"""
+        try:
+            inferred = pa.array(series, from_pandas=True).type
+        except (pa.ArrowException, TypeError, ValueError):
+            return pa.string()  # object campuran (mis. angka + teks)
+        if pa.types.is_null(inferred):
+            return pa.string()  # semua NULL di sampel: tipe sebenarnya belum diketahui
+        if not complete and (pa.types.is_integer(inferred) or pa.types.is_floating(inferred)):
+            return pa.float64()  # ekspresi bisa berisi NULL / pecahan di chunk berikutnya
+        return inferred
+
+    def open(self, sample: pd.DataFrame, complete: bool = False):
+        """Tetapkan schema dari declared kind (atau sample) dan buka file. complete: sample = seluruh hasil"""
+        kinds = self.kinds or [None] * sample.shape[1]
+        fields = []
+        for i, kind in enumerate(kinds):
+            name = _KIND_TYPES.get(kind)
+            arrow_type = getattr(pa, name)() if name else self._infer_type(sample.iloc[:, i], complete)
+            fields.append(pa.field(str(sample.columns[i]), arrow_type))
+        self._schema = pa.schema(fields)
+        self.columns = [str(c) for c in sample.columns]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    @staticmethod
+    def _to_array(series: pd.Series, arrow_type: "pa.DataType") -> "pa.Array":
+        if pa.types.is_string(arrow_type):
+            values = [None if pd.isna(v) else str(v) for v in series.tolist()]
+            return pa.array(values, type=arrow_type)
+        # from_pandas: NaN -> NULL, lalu cast aman (float64 berisi bilangan bulat -> int64)
+        return pa.array(series, from_pandas=True).cast(arrow_type)
+
+    def write(self, chunk: pd.DataFrame):
+        if self._writer is None:
+            self.open(chunk)
+        arrays = [self._to_array(chunk.iloc[:, i], field.type) for i, field in enumerate(self._schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self.row_count += len(chunk)
+
+    def close(self) -> Dict[str, Any]:
+        """Tutup file dan return handle (dict biasa, aman disimpan di AgentState)"""
+        if self._writer is not None:
+            self._writer.close()
+        return {
+            "path": str(self.path),
+            "format": "parquet",
+            "row_count": self.row_count,
+            "columns": self.columns,
+            "page_size": config.RESULT_PAGE_SIZE,
+            "bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "sql": self.sql,
+            "params": self.params,
+            "created_at": datetime.now().isoformat()
+        }
+
+    def abort(self, error: Exception):
+        """Batalkan spill (mis. tipe kolom berubah antar chunk); file parsial dihapus"""
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self.path.unlink(missing_ok=True)
+        logger.log("RESULT_SPILL_ERROR", {
+            "error": str(error),
+            "sql_preview": self.sql,
+            "rows_written": self.row_count,
+            "message": "Result spill aborted, keeping head rows only"
+        }, level="WARNING")
+
+def spill_frame(df: pd.DataFrame, sql: str = None, params: Any = None) -> Optional[Dict[str, Any]]:
+    """Tulis DataFrame penuh ke Parquet (row group = SQL_FETCH_CHUNK_SIZE). Return handle atau None jika gagal"""
+    if not spill_available():
+        return None
+    spill = ResultSpill(sql, params)
+    try:
+        spill.open(df, complete=True)  # schema dari seluruh frame, bukan dari chunk pertama
+        step = max(config.SQL_FETCH_CHUNK_SIZE, 1)
+        for start in range(0, len(df), step):
+            spill.write(df.iloc[start:start + step])
+        return spill.close()
+    except (pa.ArrowException, TypeError, ValueError, OSError) as e:
+        spill.abort(e)
+        return None
+
+def page_count(handle: Dict[str, Any], page_size: int = None) -> int:
+    page_size = page_size or handle.get("page_size") or config.RESULT_PAGE_SIZE
+    return max(1, -(-handle["row_count"] // page_size))
+
+def read_page(handle: Dict[str, Any], page: int = 0, page_size: int = None) -> pd.DataFrame:
+    """
+    Baca satu halaman (0-based) dari file spill.
+    Hanya row group yang beririsan dengan halaman yang dibaca dari disk.
+    """
+    if not spill_available():
+        raise RuntimeError("pyarrow is required to read spilled results")
+
+    page_size = page_size or handle.get("page_size") or config.RESULT_PAGE_SIZE
+    offset = max(page, 0) * page_size
+    parquet_file = pq.ParquetFile(handle["path"])
+
+    groups = []
+    group_start = 0
+    first_offset = None
+    for i in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(i).num_rows
+        group_end = group_start + group_rows
+        if group_end > offset and group_start < offset + page_size:
+            if first_offset is None:
+                first_offset = offset - group_start
+            groups.append(i)
+        group_start = group_end
+        if group_start >= offset + page_size:
+            break
+
+    if not groups:
+        return pd.DataFrame(columns=handle.get("columns", []))
+
+    table = parquet_file.read_row_groups(groups).slice(first_offset, page_size)
+    df = table.to_pandas()
+    df.index = range(offset, offset + len(df))
+    return df
+
+def load_frame(handle: Dict[str, Any]) -> pd.DataFrame:
+    """Muat seluruh hasil spill (hanya untuk caller yang memang butuh data lengkap)"""
+    if not spill_available():
+        raise RuntimeError("pyarrow is required to read spilled results")
+    return pq.read_table(handle["path"]).to_pandas()
+
+_cleanup_lock = threading.Lock()
+
+def cleanup_spills(max_age_hours: float = None) -> int:
+    """Hapus file spill yang lebih tua dari RESULT_SPILL_TTL_HOURS. Return jumlah file yang dihapus"""
+    max_age_hours = max_age_hours if max_age_hours is not None else config.RESULT_SPILL_TTL_HOURS
+    folder = spill_dir()
+    if not folder.exists():
+        return 0
+
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    with _cleanup_lock:
+        for path in folder.glob("result_*.parquet"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+
+    if removed:
+        logger.log("RESULT_SPILL_CLEANUP", {"removed": removed, "max_age_hours": max_age_hours})
+    return removed
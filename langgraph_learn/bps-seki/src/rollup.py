@@ -0,0 +1,367 @@
+# src/rollup.py
+"""Rollup (pre-aggregated) tables year x region x leveldata dan query rewrite ke rollup"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+ROLLUP_DIMENSIONS = ["year", "region", "leveldata"]
+ROLLUP_PREFIX = "rollup_"
+META_TABLE = "rollup_meta"
+
+_QUERY_RE = re.compile(
+    r"^\s*select\s+(?P<select>.+?)\s+from\s+[\"`\[]?(?P<table>[A-Za-z_][A-Za-z0-9_]*)[\"`\]]?"
+    r"(?:\s+where\s+(?P<where>.+?))?"
+    r"(?:\s+group\s+by\s+(?P<group>.+?))?"
+    r"(?:\s+having\s+(?P<having>.+?))?"
+    r"(?:\s+order\s+by\s+(?P<order>.+?))?"
+    r"(?:\s+limit\s+(?P<limit>[^;]+?))?"
+    r"\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+_AGG_RE = re.compile(r"\b(sum|count|min|max|avg)\s*\(\s*(distinct\s+)?(\*|[\"`\[]?[A-Za-z_][A-Za-z0-9_]*[\"`\]]?)\s*\)",
+                     re.IGNORECASE)
+_UNSUPPORTED_RE = re.compile(r"\b(join|union|intersect|except|with|over)\b|\(\s*select\b", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_ALIAS_RE = re.compile(r"^(?P<expr>.+?)\s+(?:as\s+)?(?P<alias>[\"`\[]?[A-Za-z_][A-Za-z0-9_]*[\"`\]]?)$",
+                       re.IGNORECASE | re.DOTALL)
+
+def rollup_table_name(base_table: str) -> str:
+    return f"{ROLLUP_PREFIX}{base_table}"
+
+def _split_top_level(text: str) -> List[str]:
+    """Split dengan koma yang tidak berada di dalam kurung / string"""
+    parts, depth, current, in_string = [], 0, [], False
+    for ch in text:
+        if ch == "'":
+            in_string = not in_string
+        elif not in_string and ch == "(":
+            depth += 1
+        elif not in_string and ch == ")":
+            depth -= 1
+        elif not in_string and ch == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current).strip())
+    return [p for p in parts if p]
+
+class RollupManager:
+    """Bangun / refresh rollup tables dan rewrite query GROUP BY agar dibaca dari rollup"""
+
+    def __init__(self, db_path: Path = None, base_tables: List[str] = None):
+        self.db_path = Path(db_path or config.DB_PATH)
+        self.base_tables = base_tables or config.ROLLUP_TABLES
+        self._lock = threading.Lock()
+        self._state_signature = None
+        self._state = {}  # base_table -> {"rollup", "dimensions", "measures", "fresh"}
+
+    # ---------- Build / refresh ----------
+
+    @staticmethod
+    def _measure_columns(conn: sqlite3.Connection, table: str) -> Tuple[List[str], List[str]]:
+        """(dimensi yang tersedia, kolom numerik yang diagregasi)"""
+        info = conn.execute(f'PRAGMA table_info("{table}");').fetchall()
+        names = [row[1] for row in info]
+        dimensions = [d for d in ROLLUP_DIMENSIONS if d in names]
+        measures = [
+            row[1] for row in info
+            if row[1] not in ROLLUP_DIMENSIONS
+            and not row[1].endswith("_imputed")
+            and row[1] != "job_insertdate"
+            and any(t in (row[2] or "").upper() for t in ("INT", "REAL", "FLOA", "DOUB", "NUM"))
+        ]
+        return dimensions, measures
+
+    @staticmethod
+    def _source_version(conn: sqlite3.Connection, table: str) -> Optional[str]:
+        """MAX(job_insertdate) tabel sumber: rollup basi jika nilainya bertambah"""
+        return conn.execute(f'SELECT MAX(job_insertdate) FROM "{table}";').fetchone()[0]
+
+    def refresh(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Buat / perbarui rollup yang basi (job_insertdate sumber lebih baru dari saat rollup dibuat)"""
+        report = []
+        # isolation_level=None: transaksi dikontrol eksplisit (BEGIN/COMMIT) di _build
+        conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=rw", uri=True, isolation_level=None)
+        try:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                    base_table TEXT PRIMARY KEY,
+                    rollup_table TEXT NOT NULL,
+                    source_insertdate TEXT,
+                    dimensions TEXT NOT NULL,
+                    measures TEXT NOT NULL,
+                    row_count INTEGER,
+                    refreshed_at TEXT NOT NULL
+                );
+            """)
+
+            for base in self.base_tables:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (base,)
+                ).fetchone()
+                if not exists:
+                    report.append({"base_table": base, "status": "missing"})
+                    continue
+
+                source_version = self._source_version(conn, base)
+                meta = conn.execute(
+                    f"SELECT source_insertdate FROM {META_TABLE} WHERE base_table=?;", (base,)
+                ).fetchone()
+                if not force and meta and meta[0] == source_version:
+                    report.append({"base_table": base, "status": "fresh", "source_insertdate": source_version})
+                    continue
+
+                report.append(self._build(conn, base, source_version))
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._state_signature = None  # paksa reload state rewrite
+
+        return report
+
+    def _build(self, conn: sqlite3.Connection, base: str, source_version: Optional[str]) -> Dict[str, Any]:
+        """CREATE rollup baru lalu swap nama dalam satu transaksi"""
+        dimensions, measures = self._measure_columns(conn, base)
+        rollup = rollup_table_name(base)
+        staging = f"{rollup}__new"
+
+        select_parts = [f'"{d}"' for d in dimensions] + ["COUNT(*) AS row_count"]
+        for m in measures:
+            select_parts += [
+                f'SUM("{m}") AS "{m}_sum"',
+                f'COUNT("{m}") AS "{m}_count"',
+                f'MIN("{m}") AS "{m}_min"',
+                f'MAX("{m}") AS "{m}_max"',
+            ]
+        group_by = ", ".join(f'"{d}"' for d in dimensions)
+
+        # DDL eksplisit dalam satu transaksi: reader melihat rollup lama atau baru, tidak pernah kosong
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            conn.execute(f'DROP TABLE IF EXISTS "{staging}";')
+            conn.execute(
+                f'CREATE TABLE "{staging}" AS SELECT {", ".join(select_parts)} FROM "{base}"'
+                + (f" GROUP BY {group_by}" if group_by else "") + ";"
+            )
+            conn.execute(f'DROP TABLE IF EXISTS "{rollup}";')
+            conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{rollup}";')
+            if dimensions:
+                conn.execute(f'CREATE INDEX "idx_{rollup}" ON "{rollup}" ({group_by});')
+            row_count = conn.execute(f'SELECT COUNT(*) FROM "{rollup}";').fetchone()[0]
+            conn.execute(
+                f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?);",
+                (base, rollup, source_version, ",".join(dimensions), ",".join(measures),
+                 row_count, datetime.now().isoformat())
+            )
+            conn.execute("COMMIT;")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            raise
+
+        logger.log("ROLLUP_REFRESHED", {
+            "base_table": base,
+            "rollup_table": rollup,
+            "source_insertdate": source_version,
+            "row_count": row_count,
+            "measures": measures,
+            "message": f"{rollup} rebuilt ({row_count} rows)"
+        }, level="SUCCESS")
+
+        return {
+            "base_table": base,
+            "rollup_table": rollup,
+            "status": "refreshed",
+            "source_insertdate": source_version,
+            "row_count": row_count
+        }
+
+    # ---------- Rewrite ----------
+
+    def _file_signature(self) -> Tuple:
+        try:
+            st = os.stat(self.db_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (None, None)
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        """Rollup yang tersedia & masih fresh (di-cache sampai file database berubah)"""
+        signature = self._file_signature()
+        with self._lock:
+            if signature == self._state_signature:
+                return self._state
+
+        state = {}
+        try:
+            conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            try:
+                has_meta = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (META_TABLE,)
+                ).fetchone()
+                rows = conn.execute(
+                    f"SELECT base_table, rollup_table, source_insertdate, dimensions, measures FROM {META_TABLE};"
+                ).fetchall() if has_meta else []
+                for base, rollup, source_version, dimensions, measures in rows:
+                    columns = [row[1].lower() for row in conn.execute(f'PRAGMA table_info("{base}");')]
+                    fresh = bool(columns) and self._source_version(conn, base) == source_version
+                    if not fresh:
+                        logger.log("ROLLUP_STALE", {
+                            "base_table": base,
+                            "rollup_table": rollup,
+                            "message": f"{rollup} is stale (job_insertdate advanced), rewrite disabled"
+                        }, level="WARNING")
+                    state[base.lower()] = {
+                        "base_table": base,
+                        "rollup": rollup,
+                        "dimensions": [d for d in dimensions.split(",") if d],
+                        "measures": [m for m in measures.split(",") if m],
+                        "columns": columns,
+                        "fresh": fresh
+                    }
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            state = {}
+
+        with self._lock:
+            self._state_signature = signature
+            self._state = state
+        return state
+
+    @staticmethod
+    def _identifiers(expr: str) -> List[str]:
+        """Identifier di ekspresi (tanpa isi string literal & nama parameter)"""
+        expr = _STRING_RE.sub("''", expr)
+        expr = re.sub(r"[:@$][A-Za-z_][A-Za-z0-9_]*", "?", expr)
+        return [token.lower() for token in _IDENT_RE.findall(expr)]
+
+    def rewrite(self, sql: str) -> Optional[Dict[str, Any]]:
+        """
+        Rewrite query agregasi satu tabel ke rollup-nya.
+        Syarat: semua kolom di WHERE/GROUP BY/kolom non-agregat adalah dimensi rollup,
+        agregat hanya SUM/COUNT/MIN/MAX/AVG (tanpa DISTINCT) atas kolom measure atau COUNT(*).
+        Return {"sql", "rollup_table", "base_table"} atau None jika tidak cocok.
+        """
+        # Row security: rollup yang dibangun setelah koneksi dibuka belum punya temp view region
+        if not config.ROLLUP_REWRITE_ENABLED or config.DB_ROW_SECURITY or _UNSUPPORTED_RE.search(sql):
+            return None
+
+        match = _QUERY_RE.match(sql.strip())
+        if not match:
+            return None
+
+        info = self._load_state().get(match.group("table").lower())
+        if not info or not info["fresh"]:
+            return None
+
+        dimensions = set(info["dimensions"])
+        measures = {m.lower(): m for m in info["measures"]}
+        base_columns = set(info["columns"])
+
+        unsupported = []
+
+        def substitute(m):
+            func, distinct, arg = m.group(1).upper(), m.group(2), m.group(3).strip('"`[]')
+            if distinct:
+                unsupported.append(m.group(0))
+                return m.group(0)
+            if arg == "*":
+                if func != "COUNT":
+                    unsupported.append(m.group(0))
+                return "COALESCE(SUM(row_count), 0)"
+            col = measures.get(arg.lower())
+            if col is None:
+                unsupported.append(m.group(0))
+                return m.group(0)
+            return {
+                "SUM": f'SUM("{col}_sum")',
+                "COUNT": f'COALESCE(SUM("{col}_count"), 0)',
+                "MIN": f'MIN("{col}_min")',
+                "MAX": f'MAX("{col}_max")',
+                "AVG": f'CAST(SUM("{col}_sum") AS REAL) / SUM("{col}_count")',
+            }[func]
+
+        def outside_aggregates_ok(expr: str) -> bool:
+            remaining = _AGG_RE.sub("", expr)
+            return all(ident not in base_columns or ident in dimensions
+                       for ident in self._identifiers(remaining))
+
+        # SELECT list: alias ekspresi agregat dengan teks aslinya agar nama kolom hasil tidak berubah
+        select_items = []
+        has_aggregate = False
+        for item in _split_top_level(match.group("select")):
+            if item == "*" or not outside_aggregates_ok(item):
+                return None
+            alias_match = _ALIAS_RE.match(item)
+            expr, alias = item, None
+            if alias_match and not _IDENT_RE.fullmatch(item) and _AGG_RE.search(alias_match.group("expr")):
+                expr, alias = alias_match.group("expr"), alias_match.group("alias")
+            if _AGG_RE.search(expr):
+                has_aggregate = True
+                new_expr = _AGG_RE.sub(substitute, expr)
+                alias = alias or '"' + item.replace('"', '""') + '"'
+                select_items.append(f"{new_expr} AS {alias}")
+            else:
+                select_items.append(item)
+
+        if not has_aggregate:
+            return None
+
+        where = match.group("where")
+        group = match.group("group")
+        having = match.group("having")
+        order = match.group("order")
+        limit = match.group("limit")
+
+        if where and (_AGG_RE.search(where) or not outside_aggregates_ok(where)):
+            return None
+        if group and not all(ident in dimensions or ident not in base_columns
+                             for ident in self._identifiers(group)):
+            return None
+        if any(clause and not outside_aggregates_ok(clause) for clause in (having, order)):
+            return None
+
+        having = _AGG_RE.sub(substitute, having) if having else None
+        order = _AGG_RE.sub(substitute, order) if order else None
+        if unsupported:
+            return None
+
+        rewritten = f'SELECT {", ".join(select_items)} FROM "{info["rollup"]}"'
+        if where:
+            rewritten += f" WHERE {where}"
+        if group:
+            rewritten += f" GROUP BY {group}"
+        if having:
+            rewritten += f" HAVING {having}"
+        if order:
+            rewritten += f" ORDER BY {order}"
+        if limit:
+            rewritten += f" LIMIT {limit}"
+
+        return {"sql": rewritten + ";", "rollup_table": info["rollup"], "base_table": info["base_table"]}
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        return list(self._load_state().values())
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_rollup_manager() -> RollupManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RollupManager()
+        return _manager
@@ -0,0 +1,95 @@
+# src/row_security.py
+"""Keamanan di level engine SQLite: authorizer read-only + temp view per region (row security)"""
+
+import sqlite3
+from typing import Dict, Any, Callable, Optional, Set
+
+from .config import config
+from .logger import AuditLogger
+
+logger = AuditLogger()
+
+# PRAGMA yang hanya membaca metadata (dipakai columnar fetch / introspeksi); PRAGMA lain ditolak
+READ_ONLY_PRAGMAS = frozenset([
+    "table_info", "table_xinfo", "table_list", "index_list", "index_info", "index_xinfo",
+    "foreign_key_list", "database_list", "collation_list", "function_list",
+    "page_count", "page_size", "data_version", "compile_options"
+])
+
+_ALLOWED_ACTIONS = frozenset([
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_TRANSACTION,  # BEGIN / ROLLBACK snapshot di execute_many (koneksi tetap query_only)
+    getattr(sqlite3, "SQLITE_RECURSIVE", 33),  # WITH RECURSIVE
+])
+
+def make_authorizer(protected_tables: Set[str] = None) -> Callable:
+    """
+    Callback untuk `conn.set_authorizer`.
+    Semua tulis, DDL, ATTACH/DETACH dan PRAGMA yang mengubah state ditolak saat statement di-prepare.
+    protected_tables: tabel main yang hanya boleh dibaca lewat temp view region (row security).
+    """
+    protected = {t.lower() for t in (protected_tables or ())}
+
+    def authorizer(action, arg1, arg2, db_name, source):
+        if action == sqlite3.SQLITE_READ:
+            # Baca langsung main.<tabel> (bukan dari dalam view region) -> tolak
+            if protected and source is None and db_name == "main" and (arg1 or "").lower() in protected:
+                return _deny(action, arg1, arg2, "direct read of region-protected table")
+            return sqlite3.SQLITE_OK
+        if action in _ALLOWED_ACTIONS:
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_PRAGMA and (arg1 or "").lower() in READ_ONLY_PRAGMAS:
+            return sqlite3.SQLITE_OK
+        return _deny(action, arg1, arg2, "write / DDL / ATTACH / PRAGMA not allowed")
+
+    return authorizer
+
+def _deny(action: int, arg1: Optional[str], arg2: Optional[str], reason: str) -> int:
+    logger.log("SQL_AUTHORIZER_DENIED", {
+        "action": action,
+        "arg1": arg1,
+        "arg2": arg2,
+        "reason": reason
+    }, level="WARNING")
+    return sqlite3.SQLITE_DENY
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+def create_region_views(conn: sqlite3.Connection, user_context: Dict[str, Any] = None) -> Set[str]:
+    """
+    Buat TEMP VIEW bernama sama dengan setiap tabel yang punya kolom region, berisi hanya baris
+    region user (dan leveldata jika DB_ROW_SECURITY_LEVELDATA). Nama tabel tanpa prefix schema
+    di-resolve ke temp lebih dulu, jadi SQL dari LLM otomatis membaca view.
+    Harus dipanggil sebelum PRAGMA query_only dan set_authorizer. Return nama tabel yang dilindungi.
+    View dibuat sekali per koneksi pool (region deployment), bukan per request: filter region
+    request tetap disisipkan SQLPipeline sebagai :region_prefix, view hanya lapisan tambahan.
+    """
+    user_context = user_context or config.USER_CONTEXT
+    region = user_context.get("region")
+    leveldata = user_context.get("leveldata") if config.DB_ROW_SECURITY_LEVELDATA else None
+    column = config.DB_ROW_SECURITY_COLUMN
+    if not region:
+        return set()
+
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()]
+
+    protected = set()
+    for table in tables:
+        columns = {row[1].lower() for row in conn.execute(f'PRAGMA main.table_info("{table}")').fetchall()}
+        if column.lower() not in columns:
+            continue
+        conditions = [f'"{column}" LIKE {_quote(region + "%")}']
+        if leveldata and "leveldata" in columns:
+            conditions.append(f'"leveldata" = {_quote(leveldata)}')
+        conn.execute(
+            f'CREATE TEMP VIEW IF NOT EXISTS "{table}" AS '
+            f'SELECT * FROM main."{table}" WHERE {" AND ".join(conditions)}'
+        )
+        protected.add(table)
+
+    return protected
@@ -0,0 +1,88 @@
+# src/slow_query.py
+"""Slow-query log (JSONL terpisah) dan cost guard untuk full scan tabel besar"""
+
+import json
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .config import config
+
+# Pertanyaan user yang sedang diproses (di-set oleh node workflow, dibaca SQLExecutor)
+_current_question: ContextVar[Optional[str]] = ContextVar("current_question", default=None)
+
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?([A-Za-z_][A-Za-z0-9_]*)")
+_LIMIT_RE = re.compile(r"\blimit\s+(?:\d+|[:?@$])", re.IGNORECASE)
+
+@contextmanager
+def query_context(user_question: Optional[str]):
+    """`with query_context(state["user_input"]): ...` agar slow-query log tahu asal query"""
+    token = _current_question.set(user_question)
+    try:
+        yield
+    finally:
+        _current_question.reset(token)
+
+def current_question() -> Optional[str]:
+    return _current_question.get()
+
+def has_limit(sql: str) -> bool:
+    return bool(_LIMIT_RE.search(sql))
+
+def find_large_scans(plan: List[str], table_rows: Dict[str, int], min_rows: int) -> List[str]:
+    """Tabel yang di-SCAN penuh (tanpa index) dan jumlah barisnya >= min_rows"""
+    scanned = []
+    for step in plan:
+        match = _SCAN_RE.match(step)
+        if match and table_rows.get(match.group(1), 0) >= min_rows:
+            scanned.append(match.group(1))
+    return list(dict.fromkeys(scanned))
+
+class SlowQueryLog:
+    """Tulis query lambat ke logs/slow_queries_YYYYMMDD.jsonl"""
+
+    def __init__(self, log_dir: Path = None, threshold_ms: float = None):
+        self.log_dir = Path(log_dir or config.LOG_DIR)
+        self.threshold_ms = threshold_ms if threshold_ms is not None else config.SLOW_QUERY_THRESHOLD_MS
+        self._lock = threading.Lock()
+        self.log_dir.mkdir(exist_ok=True)
+
+    def is_slow(self, execution_time: float) -> bool:
+        return config.SLOW_QUERY_LOG_ENABLED and execution_time * 1000 >= self.threshold_ms
+
+    def record(self, sql: str, params: Any, execution_time: float, row_count: int,
+               plan: List[str], table_rows: Dict[str, int], status: str = "success",
+               extra: Dict[str, Any] = None) -> Dict[str, Any]:
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "status": status,  # "success" | "timeout" | ...
+            "execution_time_ms": round(execution_time * 1000, 2),
+            "threshold_ms": self.threshold_ms,
+            "sql": sql,
+            "params": params,
+            "row_count": row_count,
+            "table_rows": table_rows,
+            "plan": plan,
+            "user_question": current_question(),
+            **(extra or {})
+        }
+
+        log_file = self.log_dir / f"slow_queries_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        with self._lock:
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        return entry
+
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            _slow_log = SlowQueryLog()
+        return _slow_log
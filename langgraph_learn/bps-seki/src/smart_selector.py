@@ -8,6 +8,8 @@ from typing import Dict, List, Any, Optional
 from .config import config
 from .logger import AuditLogger
 from .llm_client import llm_client
+from .catalog import table_meta_of
+from .prompt_builder import schema_prompt_builder
 
 logger = AuditLogger()
 
@@ -45,20 +47,16 @@ class SmartTableSelector:
         # Build context for LLM
         tables_context = []
         for i, table in enumerate(candidate_tables, 1):
-            meta = table["metadata"]
-            # Ambil 5 kolom pertama sebagai preview
-            columns = list(meta.get("columns", {}).keys())[:8] 
-            
-            # Check if table has year column
-            has_year_col = any("tahun" in col.lower() or "year" in col.lower() for col in columns)
+            meta = table_meta_of(table)
             
+            # Preview 8 kolom pertama & flag kolom tahun sudah dihitung saat katalog dikompilasi
             tables_context.append(f"""
             Table Index: {i}
             Name: {table['table_name']}
-            Description: {meta.get('description', 'No description')[:150]}
-            Columns: {', '.join(columns)}...
-            Has year column: {'Yes' if has_year_col else 'No'}
-            Access column: {meta.get('access_column', 'None')}
+            Description: {meta.description[:150]}
+            Columns: {meta.preview_columns}...
+            Has year column: {'Yes' if meta.preview_has_year else 'No'}
+            Access column: {meta.raw.get('access_column', 'None')}
             Relevance Score: {table.get('relevance_score', 0):.2f}
             """)
         
@@ -94,7 +92,7 @@ class SmartTableSelector:
         
         try:
             # Call LLM
-            response = llm_client.call_user_llm(prompt)
+            response = llm_client.call_user_llm(prompt, call_type="table_selection")
             
             if not response["success"]:
                 raise ValueError(f"LLM call failed: {response.get('error')}")
@@ -155,47 +153,35 @@ class SmartTableSelector:
             }
     
     def build_smart_sql_prompt(self, user_query: str, table_info: Dict, 
-                              user_context: Dict) -> str:
+                              user_context: Dict, entity_filters: Dict[str, List[str]] = None) -> str:
         """Build smart SQL generation prompt dengan context lengkap"""
         table_name = table_info["table_name"]
-        metadata = table_info["metadata"]
-        
-        # Build columns info
-        columns_info = []
-        for col_name, col_meta in metadata.get("columns", {}).items():
-            if isinstance(col_meta, str):
-                col_meta = {"type": "string", "description": col_meta}
-            col_type = col_meta.get("type", "unknown")
-            col_desc = col_meta.get("description", "no description")
-            columns_info.append(f"  - {col_name} ({col_type}): {col_desc}")
-        
-        columns_text = "\n".join(columns_info)
+        table = table_meta_of(table_info)
+        # Kolom relevan + access/tahun/nilai, dipangkas ke token budget (kolom filter entitas selalu ikut)
+        schema = schema_prompt_builder.build(table, user_query, keep=list(entity_filters or {}))
         
         # Extract years logic
         years = self.extract_years_from_query(user_query)
         years_filter = ""
-        if years:
-            year_cols = [col for col in metadata.get("columns", {}).keys() 
-                        if "tahun" in col.lower() or "year" in col.lower()]
-            if year_cols:
-                year_col = year_cols[0]
-                years_filter = f"User mentioned years: {years}. Add filter WHERE {year_col} IN ({', '.join(map(str, years))}) if relevant."
+        if years and table.year_column:
+            years_filter = f"User mentioned years: {years}. Add filter WHERE {table.year_column} IN ({', '.join(map(str, years))}) if relevant."
+        
+        # Nilai yang dikenali entity index: ejaan persis dari database
+        entity_rule = ""
+        if entity_filters:
+            recognized = "; ".join(
+                f"{col} IN ({', '.join(repr(v) for v in values)})" for col, values in entity_filters.items()
+            )
+            entity_rule = f"7. Values recognized in the question (exact spelling in the table): {recognized}. Filter with these values if relevant."
         
         # Safe get default limit
         default_limit = getattr(config, "DEFAULT_LIMIT", 5)
         
-        # --- PERBAIKAN LOGIKA ACCESS COLUMN (CRITICAL FIX) ---
-        raw_access_col = metadata.get('access_column')
-        
-        # Cek apakah access_col valid (bukan None, bukan "None", bukan kosong)
-        is_valid_access_col = (
-            raw_access_col is not None 
-            and str(raw_access_col).strip().lower() not in ['none', 'null', '']
-        )
-        
+        # access_column sudah dinormalisasi (None jika "None" / "null" / kosong)
         region_rule = ""
-        if is_valid_access_col and user_context.get('region'):
-            region_rule = f"2. The user is restricted to region '{user_context.get('region')}'. You MUST add: WHERE {raw_access_col} LIKE '{user_context.get('region')}%'"
+        if table.access_column and user_context.get('region'):
+            # Filter region di-inject sistem sebagai bound parameter (:region_prefix), bukan literal dari LLM
+            region_rule = f"2. Do NOT add a filter on {table.access_column}. The system automatically restricts the query to the user's region."
         else:
             # Eksplisit melarang filter region jika kolomnya tidak ada
             region_rule = "2. Do NOT add any region filter (Access Column is not applicable for this table)."
@@ -208,10 +194,10 @@ class SmartTableSelector:
         
         TABLE INFORMATION:
         Table: {table_name}
-        Description: {metadata.get('description', 'No description')}
+        Description: {table.description}
         
         COLUMNS:
-        {columns_text}
+        {schema.columns_text}
         
         IMPORTANT RULES:
         1. Generate ONLY SELECT statements.
@@ -220,6 +206,7 @@ class SmartTableSelector:
         4. Add LIMIT {default_limit} if the user does not specify a quantity.
         5. Return ONLY the SQL code. No markdown, no explanations.
         6. CRITICAL: Generate ONLY ONE SINGLE SQL STATEMENT.
+        {entity_rule}
         
         SQLITE SPECIFIC RULES (CRITICAL):
         - Do NOT use '::' for casting (e.g., '::numeric'). Use CAST(col AS TYPE).
@@ -229,7 +216,7 @@ class SmartTableSelector:
         - Case insensitive matching: use UPPER(col) LIKE '%VALUE%' if needed.
         
         EXAMPLE DATA (for context):
-        {json.dumps(metadata.get('example_rows', [])[:2], ensure_ascii=False)}
+        {schema.example_json}
         
         SQL QUERY:
         """
@@ -2,13 +2,24 @@
 """SQL execution module"""
 
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Iterator, Union, List
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
 from .config import config
 from .logger import AuditLogger
+from .connection_pool import get_pool
+from .result_cache import get_result_cache, make_cache_key
+from .columnar import ColumnarBuilder, build_frame, build_arrays, load_table_types, referenced_tables, resolve_column_kinds
+from .query_guard import CancelToken, QueryGuard, QueryInterrupted
+from .slow_query import get_slow_query_log, find_large_scans, has_limit
+from .result_spill import ResultSpill, spill_available, spill_frame, frame_nbytes, over_budget
+from .sql_validator import SQLValidator
 
 logger = AuditLogger()
 
@@ -17,10 +28,240 @@ class SQLExecutor:
     
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or config.DB_PATH
+        self._pool = None
+        self._result_cache = None
+        self._table_types = {}  # cache declared types per tabel untuk columnar fetch
+        self._table_rows = {}  # cache jumlah baris per tabel untuk slow-query log & cost guard
+        self._active_tokens = set()  # cancel token query yang sedang berjalan
+        self._tokens_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Connection pool read-only (dibuat saat pertama kali dipakai)"""
+        if self._pool is None:
+            self._pool = get_pool(self.db_path)
+        return self._pool
+
+    @property
+    def result_cache(self):
+        """Cache hasil query (dipakai bersama per file database)"""
+        if self._result_cache is None:
+            self._result_cache = get_result_cache(self.db_path)
+        return self._result_cache
+
+    def _column_kinds(self, conn: sqlite3.Connection, sql: str, columns: list) -> list:
+        """Kind kolom hasil (int/real/text/object) berdasarkan PRAGMA table_info tabel sumber"""
+        for table in referenced_tables(sql):
+            if table not in self._table_types:
+                self._table_types[table] = load_table_types(conn, table)
+        return resolve_column_kinds(columns, sql, self._table_types)
+
+    def _guard(self, conn: sqlite3.Connection, timeout: float = None, max_steps: int = None,
+               cancel_token: Optional[CancelToken] = None) -> QueryGuard:
+        """Buat QueryGuard dan daftarkan token-nya agar bisa dibatalkan via cancel_all()"""
+        guard = QueryGuard(conn, timeout=timeout, max_steps=max_steps, cancel_token=cancel_token)
+        with self._tokens_lock:
+            self._active_tokens.add(guard.cancel_token)
+        return guard
+
+    def _release_guard(self, guard: QueryGuard):
+        with self._tokens_lock:
+            self._active_tokens.discard(guard.cancel_token)
+
+    def cancel_all(self, reason: str = "cancelled by workflow") -> int:
+        """Batalkan semua query yang sedang berjalan di executor ini"""
+        with self._tokens_lock:
+            tokens = list(self._active_tokens)
+        for token in tokens:
+            token.cancel(reason)
+        if tokens:
+            logger.log("SQL_CANCEL", {
+                "cancelled_queries": len(tokens),
+                "reason": reason,
+                "message": f"Cancelled {len(tokens)} running queries"
+            }, level="WARNING")
+        return len(tokens)
+
+    def _borrow(self, conn: Optional[sqlite3.Connection] = None):
+        """Koneksi yang sudah dipegang caller, atau pinjam dari pool (acquire kedua di thread yang sama bisa deadlock)"""
+        return nullcontext(conn) if conn is not None else self.pool.connection()
+
+    def explain(self, sql: str, params: Tuple = None, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """EXPLAIN QUERY PLAN (detail per langkah), kosong jika gagal"""
+        try:
+            with self._borrow(conn) as conn:
+                cursor = conn.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}", params or ())
+                plan = [row[3] for row in cursor.fetchall()]
+                cursor.close()
+            return plan
+        except sqlite3.Error:
+            return []
+
+    def _table_row_counts(self, sql: str, conn: Optional[sqlite3.Connection] = None) -> Dict[str, int]:
+        """Jumlah baris tabel yang dipakai query (di-cache per tabel)"""
+        counts = {}
+        try:
+            with self._borrow(conn) as conn:
+                for table in referenced_tables(sql):
+                    if table not in self._table_rows:
+                        self._table_rows[table] = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                    counts[table] = self._table_rows[table]
+        except sqlite3.Error:
+            pass  # tabel tidak ada / alias CTE -> dilewati
+        return counts
+
+    def _check_cost(self, sql: str, params: Tuple = None,
+                    conn: Optional[sqlite3.Connection] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Cost guard sebelum eksekusi (QUERY_COST_GUARD = off | reject | rewrite).
+        Plan yang SCAN penuh tabel besar (>= QUERY_COST_GUARD_MIN_ROWS) tanpa LIMIT
+        ditolak, atau diberi LIMIT default. Return (sql yang dieksekusi, hasil error jika ditolak).
+        """
+        mode = config.QUERY_COST_GUARD
+        if mode not in ("reject", "rewrite") or has_limit(sql):
+            return sql, None
+        
+        plan = self.explain(sql, params, conn)
+        scanned = find_large_scans(plan, self._table_row_counts(sql, conn), config.QUERY_COST_GUARD_MIN_ROWS)
+        if not scanned:
+            return sql, None
+        
+        logger.log("SQL_COST_GUARD", {
+            "sql": sql,
+            "params": params,
+            "action": mode,
+            "scanned_tables": scanned,
+            "plan": plan,
+            "message": f"Full scan without LIMIT on {', '.join(scanned)} ({mode})"
+        }, level="WARNING")
+        
+        if mode == "rewrite":
+            return SQLValidator.add_limit_if_missing(sql), None
+        
+        return sql, {
+            "success": False,
+            "error": f"Query rejected by cost guard: full scan of {', '.join(scanned)} without LIMIT",
+            "error_type": "cost_guard",
+            "data": None,
+            "row_count": 0,
+            "sql": sql,
+            "plan": plan,
+            "scanned_tables": scanned,
+            "execution_time": 0
+        }
+
+    def _record_if_slow(self, sql: str, params: Tuple, execution_time: float, row_count: int,
+                        status: str = "success", plan: List[str] = None, extra: Dict[str, Any] = None,
+                        conn: Optional[sqlite3.Connection] = None):
+        """Catat query ke slow-query log jika melewati SLOW_QUERY_THRESHOLD_MS"""
+        slow_log = get_slow_query_log()
+        if not slow_log.is_slow(execution_time):
+            return
+        
+        entry = slow_log.record(
+            sql, params, execution_time, row_count,
+            plan=plan if plan is not None else self.explain(sql, params, conn),
+            table_rows=self._table_row_counts(sql, conn),
+            status=status,
+            extra=extra
+        )
+        logger.log("SQL_SLOW_QUERY", {
+            "sql_preview": sql,
+            "execution_time": execution_time,
+            "message": f"Slow query ({entry['execution_time_ms']} ms >= {slow_log.threshold_ms} ms)"
+        }, level="WARNING")
+
+    def _interrupted_result(self, sql: str, params: Tuple, error: QueryInterrupted,
+                            conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """Hasil terstruktur untuk query yang melewati budget / dibatalkan"""
+        plan = self.explain(sql, params, conn)
+        
+        logger.log("SQL_EXECUTION_TIMEOUT", {
+            "sql": sql,
+            "params": params,
+            "reason": error.reason,
+            "elapsed": error.elapsed,
+            "vm_steps": error.vm_steps,
+            "plan": plan,
+            "message": f"Query stopped ({error.reason}) after {error.elapsed:.2f}s"
+        }, level="ERROR")
         
-    def execute(self, sql: str, params: Tuple = None) -> Dict[str, Any]:
-        """Eksekusi SQL query dan return hasil"""
+        self._record_if_slow(sql, params, error.elapsed, 0, status="timeout", plan=plan,
+                             extra={"timeout_reason": error.reason, "vm_steps": error.vm_steps}, conn=conn)
+        
+        return {
+            "success": False,
+            "error": f"SQL execution stopped: {str(error)}",
+            "error_type": "timeout",
+            "timeout_reason": error.reason,
+            "data": None,
+            "row_count": 0,
+            "sql": sql,
+            "plan": plan,
+            "vm_steps": error.vm_steps,
+            "execution_time": error.elapsed
+        }
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Statistik connection pool (hit/miss, idle, in_use)"""
+        return self.pool.get_stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Statistik result cache (hit/miss, entries, bytes)"""
+        return self.result_cache.get_stats()
+
+    def _fetch_frame(self, conn: sqlite3.Connection, sql: str, params: Tuple = None,
+                     timeout: float = None, max_steps: int = None,
+                     cancel_token: Optional[CancelToken] = None) -> Tuple[pd.DataFrame, list]:
+        """Jalankan satu query di koneksi yang sudah diambil dan bangun DataFrame (columnar / fetchall)"""
+        guard = self._guard(conn, timeout, max_steps, cancel_token)
+        try:
+            with guard:
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(sql, params)
+                else:
+                    cursor.execute(sql)
+                
+                # Get column names
+                columns = [description[0] for description in cursor.description] if cursor.description else []
+                
+                if columns and config.COLUMNAR_FETCH:
+                    # Columnar path: batch fetchmany langsung jadi typed array per kolom
+                    builder = ColumnarBuilder(columns, self._column_kinds(conn, sql, columns))
+                    while True:
+                        rows = cursor.fetchmany(config.SQL_FETCH_CHUNK_SIZE)
+                        if not rows:
+                            break
+                        builder.append(rows)
+                    rows = None
+                else:
+                    # Fetch all results
+                    rows = cursor.fetchall()
+                cursor.close()
+        finally:
+            self._release_guard(guard)
+        
+        # Convert to DataFrame
+        if not columns:
+            return pd.DataFrame(), columns
+        if rows is None:
+            return builder.to_frame(), columns
+        return pd.DataFrame(rows, columns=columns), columns
+        
+    def execute(self, sql: str, params: Tuple = None, use_cache: bool = True,
+                timeout: float = None, max_steps: int = None,
+                cancel_token: Optional[CancelToken] = None, spill: bool = None) -> Dict[str, Any]:
+        """
+        Eksekusi SQL query dan return hasil.
+        timeout (detik) / max_steps (VM steps) default dari config; cancel_token untuk pembatalan manual.
+        spill: hasil di atas RESULT_MAX_ROWS / RESULT_MAX_BYTES ditulis ke Parquet, `data` hanya berisi head
+        (default RESULT_SPILL_ENABLED; caller yang butuh DataFrame lengkap, mis. forecasting, pakai spill=False).
+        """
         start_time = time.time()
+        use_cache = use_cache and config.QUERY_CACHE_ENABLED
+        spill = (config.RESULT_SPILL_ENABLED if spill is None else spill) and spill_available()
         
         try:
             # Cek file database
@@ -33,48 +274,76 @@ class SQLExecutor:
                     "execution_time": 0
                 }
             
-            # Execute query
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
+            # Cek result cache (key: normalized SQL + params)
+            if use_cache:
+                cache_key = make_cache_key(sql, params) + (("spill",) if spill else ())
+                cache_version = self.result_cache.current_version()
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    cached["execution_time"] = time.time() - start_time
+                    logger.log("SQL_CACHE_HIT", {
+                        "sql_preview": sql,
+                        "row_count": cached["row_count"],
+                        "execution_time": cached["execution_time"]
+                    })
+                    return cached
             
-            try:
-                if params:
-                    cursor.execute(sql, params)
-                else:
-                    cursor.execute(sql)
-                
-                # Get column names
-                columns = [description[0] for description in cursor.description] if cursor.description else []
-                
-                # Fetch all results
-                rows = cursor.fetchall()
-                
-                # Convert to DataFrame
-                df = pd.DataFrame(rows, columns=columns) if columns else pd.DataFrame()
-                
-                execution_time = time.time() - start_time
-                
-                result = {
-                    "success": True,
-                    "data": df,
-                    "row_count": len(df),
-                    "columns": columns,
-                    "sql": sql,
-                    "execution_time": execution_time
-                }
-                
-                # --- LOGGING FULL CONTENT (Tanpa slicing) ---
-                logger.log("SQL_EXECUTION_SUCCESS", {
-                    "sql_preview": sql,  # Menyimpan full SQL
-                    "row_count": len(df),
-                    "columns": columns,  # Menyimpan full columns
-                    "execution_time": execution_time
-                }, level="SUCCESS")
-                
-                return result
-                
-            finally:
-                conn.close()
+            # Cost guard: tolak / beri LIMIT pada full scan tabel besar
+            sql, rejected = self._check_cost(sql, params)
+            if rejected:
+                return rejected
+            
+            # Execute query (koneksi diambil dari pool, dikembalikan setelah fetch)
+            self.pool.note_statement(sql)
+            with self.pool.connection() as conn:
+                df, columns = self._fetch_frame(conn, sql, params, timeout, max_steps, cancel_token)
+            
+            execution_time = time.time() - start_time
+            
+            result = {
+                "success": True,
+                "data": df,
+                "row_count": len(df),
+                "columns": columns,
+                "sql": sql,
+                "params": params,
+                "execution_time": execution_time
+            }
+            
+            # Di atas budget: DataFrame lengkap pindah ke file, state hanya pegang handle + head + aggregates
+            if spill and over_budget(len(df), frame_nbytes(df)):
+                handle = spill_frame(df, sql, params)
+                if handle:
+                    aggregates = {}
+                    self._update_aggregates(aggregates, df)
+                    for stats in aggregates.values():
+                        stats["mean"] = stats["sum"] / stats["count"] if stats["count"] else None
+                    result.update({
+                        "data": df.head(config.RESULT_HEAD_ROWS).copy(),
+                        "aggregates": aggregates,
+                        "is_partial": True,
+                        "spill": handle
+                    })
+            
+            # --- LOGGING FULL CONTENT (Tanpa slicing) ---
+            logger.log("SQL_EXECUTION_SUCCESS", {
+                "sql_preview": sql,  # Menyimpan full SQL
+                "params": params,
+                "row_count": len(df),
+                "columns": columns,  # Menyimpan full columns
+                "execution_time": execution_time,
+                "spill_path": result.get("spill", {}).get("path")
+            }, level="SUCCESS")
+            
+            self._record_if_slow(sql, params, execution_time, len(df))
+            
+            if use_cache:
+                self.result_cache.put(cache_key, result, version=cache_version)
+            
+            return result
+        
+        except QueryInterrupted as e:
+            return self._interrupted_result(sql, params, e)
                 
         except sqlite3.Error as e:
             execution_time = time.time() - start_time
@@ -83,17 +352,400 @@ class SQLExecutor:
             logger.log("SQL_EXECUTION_ERROR", {
                 "error": str(e),
                 "sql": sql, # Menyimpan full SQL error
+                "params": params,
                 "execution_time": execution_time
             }, level="ERROR")
             
             return {
                 "success": False,
                 "error": error_msg,
+                "error_type": self._error_type(e),
                 "data": None,
                 "row_count": 0,
+                "sql": sql,
                 "execution_time": execution_time
             }
     
+    def execute_many(self, queries: List[Union[str, Tuple[str, Any], Dict[str, Any]]],
+                     concurrent: bool = False, use_cache: bool = True,
+                     timeout: float = None, max_steps: int = None,
+                     cancel_token: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Eksekusi beberapa SELECT sekaligus. Item: "sql", (sql, params) atau {"sql": ..., "params": ...}.
+        
+        - concurrent=False (default): satu koneksi pool, satu read transaction (BEGIN ... ROLLBACK)
+          sehingga semua query membaca snapshot database yang sama. Result cache tidak dipakai
+          karena hasil cache bisa berasal dari versi database lain.
+        - concurrent=True: query independen dijalankan paralel di koneksi pool terpisah via execute()
+          (tanpa jaminan snapshot yang sama).
+        
+        Return {"success", "mode", "results" (urutan sama dengan input), "execution_time"}.
+        """
+        start_time = time.time()
+        
+        items = []
+        for query in queries:
+            if isinstance(query, dict):
+                items.append((query["sql"], query.get("params")))
+            elif isinstance(query, (tuple, list)):
+                items.append((query[0], query[1] if len(query) > 1 else None))
+            else:
+                items.append((query, None))
+        
+        if concurrent:
+            mode = "concurrent"
+            workers = max(1, min(len(items), self.pool.max_size))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-batch") as pool:
+                futures = [
+                    pool.submit(self.execute, sql, params, use_cache, timeout, max_steps, cancel_token)
+                    for sql, params in items
+                ]
+                results = [future.result() for future in futures]
+        else:
+            mode = "snapshot"
+            results = self._execute_snapshot(items, timeout, max_steps, cancel_token)
+        
+        execution_time = time.time() - start_time
+        succeeded = sum(1 for r in results if r["success"])
+        
+        logger.log("SQL_BATCH_EXECUTION", {
+            "mode": mode,
+            "query_count": len(items),
+            "succeeded": succeeded,
+            "execution_time": execution_time,
+            "query_times": [r.get("execution_time") for r in results],
+            "message": f"{succeeded}/{len(items)} queries succeeded ({mode})"
+        }, level="SUCCESS" if succeeded == len(items) else "WARNING")
+        
+        return {
+            "success": succeeded == len(items),
+            "mode": mode,
+            "results": results,
+            "execution_time": execution_time
+        }
+    
+    def _execute_snapshot(self, items: List[Tuple[str, Any]], timeout: float = None, max_steps: int = None,
+                          cancel_token: Optional[CancelToken] = None) -> List[Dict[str, Any]]:
+        """Semua query di satu koneksi dan satu read transaction (snapshot konsisten)"""
+        results = []
+        
+        if not self.db_path.exists():
+            return [{
+                "success": False,
+                "error": f"Database not found: {self.db_path}",
+                "data": None,
+                "row_count": 0,
+                "execution_time": 0
+            } for _ in items]
+        
+        with self.pool.connection() as conn:
+            # Read lock diambil saat query pertama membaca dan ditahan sampai transaksi selesai
+            conn.execute("BEGIN;")
+            try:
+                for sql, params in items:
+                    query_start = time.time()
+                    
+                    # Helper explain / row count / slow log memakai koneksi yang sama (bukan acquire kedua)
+                    sql, rejected = self._check_cost(sql, params, conn)
+                    if rejected:
+                        results.append(rejected)
+                        continue
+                    
+                    try:
+                        self.pool.note_statement(sql)
+                        df, columns = self._fetch_frame(conn, sql, params, timeout, max_steps, cancel_token)
+                    except QueryInterrupted as e:
+                        results.append(self._interrupted_result(sql, params, e, conn))
+                        continue
+                    except sqlite3.Error as e:
+                        execution_time = time.time() - query_start
+                        logger.log("SQL_EXECUTION_ERROR", {
+                            "error": str(e),
+                            "sql": sql,
+                            "params": params,
+                            "execution_time": execution_time,
+                            "mode": "batch"
+                        }, level="ERROR")
+                        results.append({
+                            "success": False,
+                            "error": f"SQL execution error: {str(e)}",
+                            "error_type": self._error_type(e),
+                            "data": None,
+                            "row_count": 0,
+                            "sql": sql,
+                            "params": params,
+                            "execution_time": execution_time
+                        })
+                        continue
+                    
+                    execution_time = time.time() - query_start
+                    logger.log("SQL_EXECUTION_SUCCESS", {
+                        "sql_preview": sql,
+                        "params": params,
+                        "row_count": len(df),
+                        "columns": columns,
+                        "execution_time": execution_time,
+                        "mode": "batch"
+                    }, level="SUCCESS")
+                    self._record_if_slow(sql, params, execution_time, len(df), conn=conn)
+                    
+                    results.append({
+                        "success": True,
+                        "data": df,
+                        "row_count": len(df),
+                        "columns": columns,
+                        "sql": sql,
+                        "params": params,
+                        "execution_time": execution_time
+                    })
+            finally:
+                # Read-only: cukup rollback untuk melepas snapshot
+                if conn.in_transaction:
+                    conn.rollback()
+        
+        return results
+    
+    def execute_chunks(self, sql: str, params: Tuple = None, chunk_size: int = None,
+                       as_frame: bool = True, timeout: float = None, max_steps: int = None,
+                       cancel_token: Optional[CancelToken] = None) -> Iterator[Union[pd.DataFrame, Dict[str, np.ndarray]]]:
+        """
+        Eksekusi SQL dan yield hasil per batch `fetchmany` (DataFrame atau dict-of-arrays).
+        Koneksi pool dipegang selama generator berjalan dan dikembalikan saat generator selesai/ditutup.
+        Jika hasil kosong, yield satu batch kosong agar caller tetap mendapat nama kolom.
+        Melempar QueryInterrupted jika budget waktu/VM-step terlampaui atau dibatalkan.
+        """
+        chunk_size = chunk_size or config.SQL_FETCH_CHUNK_SIZE
+        
+        self.pool.note_statement(sql)
+        with self.pool.connection() as conn:
+            guard = self._guard(conn, timeout, max_steps, cancel_token)
+            cursor = conn.cursor()
+            try:
+                with guard:
+                    if params:
+                        cursor.execute(sql, params)
+                    else:
+                        cursor.execute(sql)
+                
+                    columns = [description[0] for description in cursor.description] if cursor.description else []
+                    if not columns:
+                        return
+                
+                    kinds = self._column_kinds(conn, sql, columns) if config.COLUMNAR_FETCH else None
+                
+                    has_rows = False
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows and has_rows:
+                            break
+                        has_rows = True
+                    
+                        if kinds is not None:
+                            yield build_frame(rows, columns, kinds) if as_frame else build_arrays(rows, columns, kinds)
+                        elif as_frame:
+                            yield pd.DataFrame(rows, columns=columns)
+                        elif rows:
+                            yield {col: np.array(values, dtype=object) for col, values in zip(columns, zip(*rows))}
+                        else:
+                            yield {col: np.array([], dtype=object) for col in columns}
+                    
+                        if not rows:
+                            break
+            finally:
+                self._release_guard(guard)
+                cursor.close()
+    
+    def execute_summary(self, sql: str, params: Tuple = None, head_rows: int = None,
+                        use_cache: bool = True, timeout: float = None, max_steps: int = None,
+                        cancel_token: Optional[CancelToken] = None, spill: bool = None) -> Dict[str, Any]:
+        """
+        Eksekusi SQL secara streaming: simpan hanya `head_rows` baris pertama,
+        sisanya hanya dihitung (row count + running aggregates kolom numerik).
+        spill: jika hasil melewati RESULT_MAX_ROWS / RESULT_MAX_BYTES, seluruh baris ikut ditulis ke Parquet
+        agar bisa di-page (default RESULT_SPILL_ENABLED). Hasil di bawah budget tidak menyentuh disk.
+        """
+        head_rows = head_rows if head_rows is not None else config.RESULT_HEAD_ROWS
+        start_time = time.time()
+        use_cache = use_cache and config.QUERY_CACHE_ENABLED
+        spill = (config.RESULT_SPILL_ENABLED if spill is None else spill) and spill_available()
+        
+        try:
+            if not self.db_path.exists():
+                return {
+                    "success": False,
+                    "error": f"Database not found: {self.db_path}",
+                    "data": None,
+                    "row_count": 0,
+                    "execution_time": 0
+                }
+            
+            if use_cache:
+                cache_key = make_cache_key(sql, params) + (f"summary:{head_rows}",) + (("spill",) if spill else ())
+                cache_version = self.result_cache.current_version()
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    cached["execution_time"] = time.time() - start_time
+                    logger.log("SQL_CACHE_HIT", {
+                        "sql_preview": sql,
+                        "row_count": cached["row_count"],
+                        "execution_time": cached["execution_time"]
+                    })
+                    return cached
+            
+            sql, rejected = self._check_cost(sql, params)
+            if rejected:
+                return rejected
+            
+            head_parts = []
+            head_count = 0
+            row_count = 0
+            columns = []
+            aggregates = {}
+            # Chunk ditahan sampai hasil melewati budget (over_budget, sama dengan execute());
+            # baru saat itu file spill dibuat. pending dibatasi oleh budget itu sendiri.
+            spill_writer = None
+            pending = []
+            pending_bytes = 0
+            
+            try:
+                for chunk in self.execute_chunks(sql, params, timeout=timeout, max_steps=max_steps,
+                                                 cancel_token=cancel_token):
+                    columns = list(chunk.columns)
+                    row_count += len(chunk)
+                    
+                    if head_count < head_rows:
+                        part = chunk.head(head_rows - head_count)
+                        head_parts.append(part)
+                        head_count += len(part)
+                    
+                    self._update_aggregates(aggregates, chunk)
+                    
+                    if spill and spill_writer is None:
+                        pending.append(chunk)
+                        pending_bytes += frame_nbytes(chunk)
+                        if row_count > head_rows and over_budget(row_count, pending_bytes):
+                            # Declared kind kolom (sudah di-cache execute_chunks) menentukan schema Parquet
+                            kinds = resolve_column_kinds(columns, sql, self._table_types) if config.COLUMNAR_FETCH else None
+                            spill_writer = ResultSpill(sql, params, kinds)
+                    
+                    if spill_writer is not None:
+                        try:
+                            for part in pending or [chunk]:
+                                spill_writer.write(part)
+                        except (TypeError, ValueError, OSError) as e:  # ArrowInvalid / ArrowTypeError termasuk
+                            spill_writer.abort(e)
+                            spill_writer = None
+                            spill = False
+                        pending = []
+            except (QueryInterrupted, sqlite3.Error) as e:
+                if spill_writer is not None:
+                    spill_writer.abort(e)
+                raise
+            
+            handle = None
+            if spill_writer is not None and spill_writer.row_count:
+                handle = spill_writer.close()
+            
+            if head_parts:
+                df = pd.concat(head_parts, ignore_index=True)
+            else:
+                df = pd.DataFrame(columns=columns)
+            
+            for stats in aggregates.values():
+                stats["mean"] = stats["sum"] / stats["count"] if stats["count"] else None
+            
+            execution_time = time.time() - start_time
+            
+            result = {
+                "success": True,
+                "data": df,
+                "row_count": row_count,
+                "columns": columns,
+                "sql": sql,
+                "params": params,
+                "execution_time": execution_time,
+                "aggregates": aggregates,
+                "is_partial": row_count > len(df)
+            }
+            if handle:
+                result["spill"] = handle
+            
+            logger.log("SQL_EXECUTION_SUCCESS", {
+                "sql_preview": sql,
+                "params": params,
+                "row_count": row_count,
+                "columns": columns,
+                "execution_time": execution_time,
+                "mode": "streaming",
+                "head_rows": len(df),
+                "spill_path": handle["path"] if handle else None
+            }, level="SUCCESS")
+            
+            self._record_if_slow(sql, params, execution_time, row_count)
+            
+            if use_cache:
+                self.result_cache.put(cache_key, result, version=cache_version)
+            
+            return result
+        
+        except QueryInterrupted as e:
+            return self._interrupted_result(sql, params, e)
+            
+        except sqlite3.Error as e:
+            execution_time = time.time() - start_time
+            
+            logger.log("SQL_EXECUTION_ERROR", {
+                "error": str(e),
+                "sql": sql,
+                "params": params,
+                "execution_time": execution_time,
+                "mode": "streaming"
+            }, level="ERROR")
+            
+            return {
+                "success": False,
+                "error": f"SQL execution error: {str(e)}",
+                "error_type": self._error_type(e),
+                "data": None,
+                "row_count": 0,
+                "sql": sql,
+                "execution_time": execution_time
+            }
+    
+    @staticmethod
+    def _error_type(error: sqlite3.Error) -> Optional[str]:
+        """'not_authorized' jika statement ditolak authorizer (tulis / PRAGMA / baca tabel di luar region)"""
+        return "not_authorized" if getattr(error, "sqlite_errorname", None) == "SQLITE_AUTH" else None
+    
+    @staticmethod
+    def _update_aggregates(aggregates: Dict[str, Dict], chunk: pd.DataFrame):
+        """Update running aggregates (count/sum/min/max) kolom numerik dari satu batch"""
+        numeric = chunk.select_dtypes(include="number")
+        if numeric.empty:
+            return
+        
+        counts = numeric.count()
+        sums = numeric.sum()
+        mins = numeric.min()
+        maxs = numeric.max()
+        
+        for col in numeric.columns:
+            if not counts[col]:
+                continue
+            stats = aggregates.get(col)
+            if stats is None:
+                aggregates[col] = {
+                    "count": int(counts[col]),
+                    "sum": float(sums[col]),
+                    "min": float(mins[col]),
+                    "max": float(maxs[col])
+                }
+            else:
+                stats["count"] += int(counts[col])
+                stats["sum"] += float(sums[col])
+                stats["min"] = min(stats["min"], float(mins[col]))
+                stats["max"] = max(stats["max"], float(maxs[col]))
+    
     def test_connection(self) -> bool:
         """Test koneksi ke database"""
         try:
@@ -104,11 +756,11 @@ class SQLExecutor:
                 }, level="ERROR")
                 return False
             
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' LIMIT 1;")
-            tables = cursor.fetchall()
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' LIMIT 1;")
+                tables = cursor.fetchall()
+                cursor.close()
             
             logger.log("DB_CONNECTION", {
                 "status": "SUCCESS",
@@ -129,20 +781,19 @@ class SQLExecutor:
     def get_table_info(self, table_name: str) -> Dict[str, Any]:
         """Get informasi tentang tabel"""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            # Get column information
-            # Note: PRAGMA statements cannot use parameterized queries in standard way for table names,
-            # but in this controlled environment where table_name comes from metadata selection, it's acceptable.
-            cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = cursor.fetchall()
-            
-            # Get sample data
-            cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
-            sample_data = cursor.fetchall()
-            
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Get column information
+                # Note: PRAGMA statements cannot use parameterized queries in standard way for table names,
+                # but in this controlled environment where table_name comes from metadata selection, it's acceptable.
+                cursor.execute(f"PRAGMA table_info({table_name});")
+                columns = cursor.fetchall()
+                
+                # Get sample data
+                cursor.execute(f"SELECT * FROM {table_name} LIMIT 5;")
+                sample_data = cursor.fetchall()
+                cursor.close()
             
             return {
                 "success": True,
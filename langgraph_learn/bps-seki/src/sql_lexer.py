@@ -0,0 +1,69 @@
+# src/sql_lexer.py
+"""Tokenizer SQL satu pass (SQLite dialect) untuk validator dan SQL pipeline"""
+
+import re
+from typing import List, NamedTuple
+
+class Token(NamedTuple):
+    kind: str    # keyword | name | qname | string | number | param | op | lparen | rparen | comma | dot | semicolon | comment | ws | error
+    value: str   # teks asli
+    pos: int     # offset di SQL asli (-1 untuk token sintetis)
+    space: str = ""  # whitespace sebelum token, agar serialisasi mempertahankan format asli
+
+    @property
+    def lower(self) -> str:
+        return self.value.lower()
+
+# Satu regex gabungan, dicompile sekali. Urutan alternatif menentukan prioritas:
+# komentar & literal lebih dulu agar isinya tidak pernah dibaca sebagai keyword.
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'(?:[^']|'')*(?:'|\Z)|[xX]'[0-9A-Fa-f]*')
+  | (?P<qname>"(?:[^"]|"")*(?:"|\Z)|`(?:[^`]|``)*(?:`|\Z)|\[[^\]]*(?:\]|\Z))
+  | (?P<number>0[xX][0-9A-Fa-f]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<param>[:@$][A-Za-z_][A-Za-z0-9_]*|\?\d*)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<lparen>\()
+  | (?P<rparen>\))
+  | (?P<comma>,)
+  | (?P<dot>\.)
+  | (?P<semicolon>;)
+  | (?P<op>\|\||<<|>>|<=|>=|==|!=|<>|->>|->|[-+*/%<>=&|~])
+  | (?P<error>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Keyword SQLite yang relevan untuk klasifikasi (selain ini -> name)
+KEYWORDS = frozenset("""
+    select from where group by having order limit offset union all intersect except distinct
+    as on join inner left right full outer cross natural using and or not in is null like glob
+    regexp match between case when then else end exists with recursive asc desc collate escape
+    cast values over partition filter window rows range preceding following current unbounded
+    drop delete update insert alter truncate create attach detach grant revoke commit rollback
+    savepoint exec execute shutdown replace pragma vacuum reindex analyze begin transaction into set
+""".split())
+
+def tokenize(sql: str, skip_ws: bool = True) -> List[Token]:
+    """
+    Pecah SQL menjadi token dalam satu pass (O(n)).
+    Whitespace tidak jadi token sendiri (kecuali skip_ws=False) tetapi disimpan di `space` token berikutnya.
+    """
+    tokens = []
+    append = tokens.append
+    keywords = KEYWORDS
+    space = ""
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == "ws" and skip_ws:
+            space = value
+            continue
+        if kind == "word":
+            kind = "keyword" if value.lower() in keywords else "name"
+        append(Token(kind, value, match.start(), space))
+        space = ""
+    return tokens
+
+def to_sql(tokens: List[Token]) -> str:
+    """Gabungkan token kembali menjadi teks SQL (kebalikan tokenize)"""
+    return "".join(token.space + token.value for token in tokens).strip()
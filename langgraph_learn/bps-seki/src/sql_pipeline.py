@@ -0,0 +1,512 @@
+# src/sql_pipeline.py
+"""
+Pipeline SQL parse-once: tokenize -> parse ke tree -> validasi, filter region (bound parameter),
+binding tahun, LIMIT -> serialisasi sekali.
+
+Tree-nya sengaja kecil (Query / Select / Clause / Group di atas Token dari sql_lexer),
+cukup untuk menemukan scope SELECT termasuk subquery, tanpa menebak posisi klausa dari teks.
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from .config import config
+from .logger import AuditLogger
+from .sql_lexer import Token, tokenize
+from .sql_validator import SQLValidator
+
+logger = AuditLogger()
+
+class SQLParseError(ValueError):
+    """SQL tidak bisa di-parse menjadi tree (mis. kurung tidak seimbang)"""
+
+# Keyword pembuka klausa di level satu SELECT -> nama klausa
+CLAUSE_KEYWORDS = {
+    "select": "select", "from": "from", "where": "where", "group": "group by",
+    "having": "having", "window": "window", "order": "order by", "limit": "limit"
+}
+COMPOUND_KEYWORDS = frozenset(["union", "intersect", "except"])
+COMPARISON_OPS = frozenset(["=", "==", ">=", "<=", "<>", "!=", ">", "<"])
+_YEAR_RE = re.compile(r"\d{4}")
+
+class Group:
+    """( ... ): ekspresi biasa atau subquery (items berisi satu Query)"""
+
+    def __init__(self, open_token: Token, items: list, close_token: Token):
+        self.open = open_token
+        self.items = items
+        self.close = close_token
+
+class Clause:
+    """Satu klausa SELECT; head = token keyword-nya (mis. GROUP, BY), items = isi klausa"""
+
+    def __init__(self, keyword: Optional[str], head: List[Token], items: list):
+        self.keyword = keyword
+        self.head = head
+        self.items = items
+
+class Select:
+    """Satu inti SELECT (tanpa compound operator)"""
+
+    def __init__(self, clauses: List[Clause]):
+        self.clauses = clauses
+
+    def clause(self, keyword: str) -> Optional[Clause]:
+        for clause in self.clauses:
+            if clause.keyword == keyword:
+                return clause
+        return None
+
+class Query:
+    """SELECT tunggal atau compound (INTERSECT / EXCEPT ...); ops[i] berada di antara cores[i] dan cores[i+1]"""
+
+    def __init__(self, cores: List[Select], ops: List[List[Token]]):
+        self.cores = cores
+        self.ops = ops
+
+Item = Union[Token, Group]
+
+# ================== PARSE & SERIALIZE ==================
+
+class _Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.i + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def is_keyword(self, token: Optional[Token], *words: str) -> bool:
+        return token is not None and token.kind == "keyword" and token.lower in words
+
+    def parse_query(self) -> Query:
+        cores = [self.parse_core()]
+        ops = []
+        while self.is_keyword(self.peek(), *COMPOUND_KEYWORDS):
+            op = [self.peek()]
+            self.i += 1
+            if self.is_keyword(self.peek(), "all"):
+                op.append(self.peek())
+                self.i += 1
+            ops.append(op)
+            cores.append(self.parse_core())
+        return Query(cores, ops)
+
+    def parse_core(self) -> Select:
+        clauses = []
+        while True:
+            token = self.peek()
+            if token is None or token.kind in ("rparen", "semicolon"):
+                break
+            if token.kind == "keyword":
+                word = token.lower
+                if word in COMPOUND_KEYWORDS:
+                    break
+                if word in CLAUSE_KEYWORDS and (word not in ("group", "order") or self.is_keyword(self.peek(1), "by")):
+                    head = [token] if word not in ("group", "order") else [token, self.peek(1)]
+                    self.i += len(head)
+                    clauses.append(Clause(CLAUSE_KEYWORDS[word], head, []))
+                    continue
+            if not clauses:
+                clauses.append(Clause(None, [], []))
+            clauses[-1].items.append(self.parse_item())
+        return Select(clauses)
+
+    def parse_item(self) -> Item:
+        token = self.peek()
+        if token.kind == "lparen":
+            return self.parse_group()
+        self.i += 1
+        return token
+
+    def parse_group(self) -> Group:
+        open_token = self.peek()
+        self.i += 1
+        if self.is_keyword(self.peek(), "select"):
+            items = [self.parse_query()]
+        else:
+            items = []
+            while self.peek() is not None and self.peek().kind not in ("rparen", "semicolon"):
+                items.append(self.parse_item())
+        close_token = self.peek()
+        if close_token is None or close_token.kind != "rparen":
+            raise SQLParseError("Unbalanced parentheses")
+        self.i += 1
+        return Group(open_token, items, close_token)
+
+def parse(tokens: List[Token]) -> Tuple[Query, List[Token]]:
+    """Token -> (Query, tail). tail = token sisa setelah statement (semicolon)"""
+    parser = _Parser(tokens)
+    query = parser.parse_query()
+    tail = tokens[parser.i:]
+    if any(token.kind == "rparen" for token in tail):
+        raise SQLParseError("Unbalanced parentheses")
+    return query, tail
+
+def _emit(node, out: List[str]):
+    if isinstance(node, Token):
+        out.append(node.space + node.value)
+    elif isinstance(node, Group):
+        _emit(node.open, out)
+        for item in node.items:
+            _emit(item, out)
+        _emit(node.close, out)
+    elif isinstance(node, Clause):
+        for item in node.head + node.items:
+            _emit(item, out)
+    elif isinstance(node, Select):
+        for clause in node.clauses:
+            _emit(clause, out)
+    elif isinstance(node, Query):
+        for i, core in enumerate(node.cores):
+            if i:
+                for token in node.ops[i - 1]:
+                    _emit(token, out)
+            _emit(core, out)
+
+def serialize(query: Query, tail: List[Token] = ()) -> str:
+    """Tree -> teks SQL. Token asli membawa whitespace-nya sendiri, jadi format LLM tetap terjaga"""
+    out = []
+    _emit(query, out)
+    for token in tail:
+        _emit(token, out)
+    return "".join(out).strip()
+
+# ================== TREE HELPERS ==================
+
+def _synthetic(kind: str, value: str, space: str = " ") -> Token:
+    return Token(kind, value, -1, space)
+
+def iter_selects(query: Query, depth: int = 0):
+    """Semua scope SELECT (termasuk subquery di FROM / WHERE / SELECT list) beserta kedalamannya"""
+    for core in query.cores:
+        yield core, depth
+        for clause in core.clauses:
+            for item in clause.items:
+                yield from _iter_nested(item, depth + 1)
+
+def _iter_nested(item: Item, depth: int):
+    if isinstance(item, Group):
+        for sub in item.items:
+            if isinstance(sub, Query):
+                yield from iter_selects(sub, depth)
+            else:
+                yield from _iter_nested(sub, depth)
+
+def _unquote(value: str) -> str:
+    if value[:1] in ('"', '`', '['):
+        return value[1:-1]
+    return value
+
+def _is_name(item: Item, name: str = None) -> bool:
+    if not isinstance(item, Token) or item.kind not in ("name", "qname"):
+        return False
+    return name is None or _unquote(item.value).lower() == name.lower()
+
+def table_sources(select: Select) -> List[Tuple[str, str]]:
+    """Tabel yang dibaca langsung oleh scope ini: [(nama_tabel, alias_atau_nama)] (subquery di FROM dilewati)"""
+    from_clause = select.clause("from")
+    if from_clause is None:
+        return []
+
+    items = from_clause.items
+    sources = []
+    expect_source = True
+    k = 0
+    while k < len(items):
+        item = items[k]
+        if expect_source and _is_name(item):
+            # schema.table
+            j = k + 1
+            name = _unquote(item.value)
+            if j + 1 < len(items) and isinstance(items[j], Token) and items[j].kind == "dot" and _is_name(items[j + 1]):
+                name = _unquote(items[j + 1].value)
+                j += 2
+            # table-valued function (json_each(...)) bukan tabel
+            if not (j < len(items) and isinstance(items[j], Group)):
+                alias = name
+                if j < len(items) and isinstance(items[j], Token) and items[j].kind == "keyword" and items[j].lower == "as":
+                    j += 1
+                if j < len(items) and _is_name(items[j]):
+                    alias = _unquote(items[j].value)
+                sources.append((name, alias))
+            expect_source = False
+        elif isinstance(item, Token) and (item.kind == "comma" or (item.kind == "keyword" and item.lower == "join")):
+            expect_source = True
+        else:
+            expect_source = False
+        k += 1
+    return sources
+
+def _mentions(items: list, column: str) -> bool:
+    """Kolom disebut di items (masuk ke group ekspresi, tidak ke subquery yang punya scope sendiri)"""
+    for item in items:
+        if _is_name(item, column):
+            return True
+        if isinstance(item, Group) and not any(isinstance(sub, Query) for sub in item.items):
+            if _mentions(item.items, column):
+                return True
+    return False
+
+def _ends_with_name(item: Item, column: str) -> bool:
+    """`region` atau `UPPER(region)` / `(t.region)` sebelum LIKE"""
+    if isinstance(item, Group):
+        return bool(item.items) and _ends_with_name(item.items[-1], column)
+    return _is_name(item, column)
+
+# ================== TRANSFORMS ==================
+
+def _walk_filters(select: Select):
+    """Daftar items (klausa WHERE/HAVING + group ekspresi di dalamnya) untuk transform literal"""
+    stack = [clause.items for clause in select.clauses if clause.keyword in ("where", "having")]
+    while stack:
+        items = stack.pop()
+        yield items
+        for item in items:
+            if isinstance(item, Group) and not any(isinstance(sub, Query) for sub in item.items):
+                stack.append(item.items)
+
+def bind_region_literals(select: Select, access_column: str, params: Dict[str, Any], value: str) -> int:
+    """
+    `<access_column> LIKE 'RM I%'` -> `LIKE :region_prefix` dengan nilai `value` (prefix region user),
+    bukan literal dari LLM: filter region lain tidak boleh terlihat seperti filter milik user.
+    Return jumlah literal yang di-bind
+    """
+    bound = 0
+    for items in _walk_filters(select):
+        for k in range(1, len(items) - 1):
+            item, literal = items[k], items[k + 1]
+            if (isinstance(item, Token) and item.kind == "keyword" and item.lower == "like"
+                    and isinstance(literal, Token) and literal.kind == "string"
+                    and _ends_with_name(items[k - 1], access_column)):
+                params[SQLValidator.REGION_PARAM] = value
+                items[k + 1] = _synthetic("param", f":{SQLValidator.REGION_PARAM}", literal.space)
+                bound += 1
+    return bound
+
+def bind_year_literals(select: Select, params: Dict[str, Any]) -> int:
+    """`year = 2023`, `year IN (2022, 2023)`, `year BETWEEN 2020 AND 2023` -> :year_N"""
+    columns = SQLValidator.YEAR_COLUMNS
+    bound = 0
+
+    def bind(items: list, k: int):
+        nonlocal bound
+        token = items[k]
+        name = f"{SQLValidator.YEAR_PARAM}_{sum(1 for key in params if key.startswith(SQLValidator.YEAR_PARAM + '_'))}"
+        params[name] = int(token.value)
+        items[k] = _synthetic("param", f":{name}", token.space)
+        bound += 1
+
+    def is_year(item: Item) -> bool:
+        return isinstance(item, Token) and item.kind == "number" and bool(_YEAR_RE.fullmatch(item.value))
+
+    def is_keyword(item: Item, word: str) -> bool:
+        return isinstance(item, Token) and item.kind == "keyword" and item.lower == word
+
+    for items in _walk_filters(select):
+        for k, item in enumerate(items):
+            if not any(_is_name(item, col) for col in columns) or k + 1 >= len(items):
+                continue
+            nxt = items[k + 1]
+            if isinstance(nxt, Token) and nxt.kind == "op" and nxt.value in COMPARISON_OPS:
+                if k + 2 < len(items) and is_year(items[k + 2]):
+                    bind(items, k + 2)
+            elif is_keyword(nxt, "in") and k + 2 < len(items) and isinstance(items[k + 2], Group):
+                values = items[k + 2].items
+                if values and all(is_year(v) or (isinstance(v, Token) and v.kind == "comma") for v in values):
+                    for j, value in enumerate(values):
+                        if is_year(value):
+                            bind(values, j)
+            elif (is_keyword(nxt, "between") and k + 4 < len(items) and is_year(items[k + 2])
+                  and is_keyword(items[k + 3], "and") and is_year(items[k + 4])):
+                bind(items, k + 2)
+                bind(items, k + 4)
+    return bound
+
+def inject_condition(select: Select, condition: List[Item]):
+    """
+    Tambah kondisi ke WHERE scope ini: `WHERE <kondisi> AND <where lama>`.
+    WHERE lama yang punya OR di level atas dibungkus kurung agar kondisi tetap berlaku untuk semua cabang.
+    """
+    where = select.clause("where")
+    if where is not None:
+        existing = where.items
+        if any(isinstance(item, Token) and item.kind == "keyword" and item.lower == "or" for item in existing):
+            first = existing[0]
+            existing = [Group(_synthetic("lparen", "("),
+                              [first._replace(space="") if isinstance(first, Token) else first] + existing[1:],
+                              _synthetic("rparen", ")", ""))]
+        where.items = condition + [_synthetic("keyword", "AND")] + existing
+        return
+
+    new_where = Clause("where", [_synthetic("keyword", "WHERE")], condition)
+    position = next((i + 1 for i, clause in enumerate(select.clauses) if clause.keyword == "from"), None)
+    if position is None:
+        return
+    select.clauses.insert(position, new_where)
+
+def ensure_limit(query: Query, default_limit: int) -> bool:
+    """LIMIT di level terluar (subquery tidak dihitung). Return True jika ditambahkan"""
+    last = query.cores[-1]
+    if last.clause("limit") is not None:
+        return False
+    last.clauses.append(Clause("limit", [_synthetic("keyword", "LIMIT")], [_synthetic("number", str(default_limit))]))
+    return True
+
+# ================== PIPELINE ==================
+
+class SQLPipeline:
+    """Validasi + filter region + binding tahun + LIMIT atas satu parse tree"""
+
+    @classmethod
+    def run(cls, sql: str, access_column: str = None, region: str = None,
+            table: str = None, default_limit: int = None,
+            filters: Dict[str, List[str]] = None) -> Dict[str, Any]:
+        """
+        Return hasil validasi (format SQLValidator.validate_sql) ditambah
+        `validated_sql` (hasil serialisasi) dan `params` (named parameters untuk SQLExecutor).
+        table: tabel yang dipilih; filter region dipasang di setiap scope SELECT yang membacanya.
+        filters: {kolom: [nilai]} dari entity index; dipasang hanya untuk kolom di ENTITY_FILTER_COLUMNS
+        dengan tepat satu nilai cocok, dan hanya jika SQL belum menyebut kolom itu.
+        """
+        if default_limit is None:
+            default_limit = getattr(config, 'DEFAULT_LIMIT', 10)
+
+        tokens = tokenize(sql)
+        # DB_ROW_SECURITY: authorizer menolak tulis / DDL di engine, validator cukup cek struktur.
+        # Filter region tetap disisipkan: temp view dibuat per koneksi pool dari USER_CONTEXT env,
+        # sedangkan region request bisa berbeda (main.py --region, user_context per sesi)
+        validation = SQLValidator.validate_tokens(tokens, sql, engine_enforced=config.DB_ROW_SECURITY)
+        if not validation["is_valid"]:
+            return validation
+
+        try:
+            query, tail = parse(tokens)
+        except SQLParseError as e:
+            return {
+                "is_valid": False,
+                "reason": f"SQL parse error: {e}",
+                "suggested_fix": "Check parentheses and query structure"
+            }
+
+        params: Dict[str, Any] = {}
+        region_status = None
+        scopes = list(iter_selects(query))
+
+        if access_column and region:
+            region_status = cls._apply_region(scopes, access_column, region, table, params)
+
+        entity_filters = cls._apply_filters(scopes, filters, table, params) if filters else []
+
+        for select, _ in scopes:
+            bind_year_literals(select, params)
+
+        limit_added = ensure_limit(query, default_limit)
+
+        return {
+            **validation,
+            "validated_sql": serialize(query, tail),
+            "params": params,
+            "region_filter": region_status,
+            "entity_filters": entity_filters,
+            "limit_added": limit_added
+        }
+
+    @staticmethod
+    def _targets(scopes: List[Tuple[Select, int]], table: Optional[str]) -> List[Tuple[Select, int, list]]:
+        """Scope SELECT yang membaca `table` (atau scope terluar jika LLM memakai nama tabel lain)"""
+        sourced = [(select, depth, table_sources(select)) for select, depth in scopes]
+        sourced = [entry for entry in sourced if entry[2]]
+
+        targets = sourced
+        if table:
+            targets = [entry for entry in sourced if any(name.lower() == table.lower() for name, _ in entry[2])]
+            if not targets:
+                # LLM memakai nama tabel lain: minimal scope terluar tetap difilter
+                targets = [entry for entry in sourced if entry[1] == 0]
+        return targets
+
+    @staticmethod
+    def _column_ref(sources: list, table: Optional[str], column: str) -> List[Token]:
+        """`column`, atau `<alias>.column` jika scope membaca lebih dari satu tabel (JOIN)"""
+        if len(sources) > 1:
+            alias = next((a for name, a in sources if table and name.lower() == table.lower()), sources[0][1])
+            return [_synthetic("name", alias), _synthetic("dot", ".", ""), _synthetic("name", column, "")]
+        return [_synthetic("name", column)]
+
+    @classmethod
+    def _apply_filters(cls, scopes: List[Tuple[Select, int]], filters: Dict[str, List[str]],
+                       table: Optional[str], params: Dict[str, Any]) -> List[str]:
+        """
+        Pasang `<kolom> = :entity_<kolom>_0` untuk entitas yang dikenali entity index, hanya jika
+        kolomnya ada di ENTITY_FILTER_COLUMNS (selektif, mis. area) dan tepat satu nilai cocok.
+        Nilai generik ("Total" di category) atau ambigu (beberapa area) hanya menjadi petunjuk di prompt:
+        LLM boleh sengaja tidak memfilter. Scope yang sudah menyebut kolom tersebut (SELECT, WHERE,
+        GROUP BY, ...) juga dibiarkan, misal membandingkan semua area.
+        """
+        allowed = {c.lower() for c in config.ENTITY_FILTER_COLUMNS}
+        injectable = {column: values[0] for column, values in filters.items()
+                      if column.lower() in allowed and len(values) == 1}
+        skipped = {column: values for column, values in filters.items() if column not in injectable and values}
+
+        applied, predicates = [], []
+        for select, depth, sources in cls._targets(scopes, table):
+            for column, value in injectable.items():
+                if any(_mentions(clause.items, column) for clause in select.clauses):
+                    continue
+                name = f"entity_{column}_0"
+                while name in params:
+                    name += "_"
+                params[name] = value
+                condition = cls._column_ref(sources, table, column)
+                condition += [_synthetic("op", "="), _synthetic("param", f":{name}")]
+                inject_condition(select, condition)
+                applied.append(column)
+                predicates.append({"column": column, "value": value, "param": name, "depth": depth})
+
+        if predicates or skipped:
+            logger.log("ENTITY_FILTER", {
+                "table": table,
+                "injected": predicates,
+                "prompt_only": skipped
+            })
+        return applied
+
+    @classmethod
+    def _apply_region(cls, scopes: List[Tuple[Select, int]], access_column: str, region: str,
+                      table: Optional[str], params: Dict[str, Any]) -> str:
+        """
+        Pasang `<alias>.<access_column> LIKE :region_prefix` di setiap scope target, selalu.
+        Predikat access column milik LLM (`= 'RM I ...'`, `IN (...)`, cabang OR) tidak dipercaya:
+        literal LIKE-nya di-bind ke prefix region user, bentuk lain dibiarkan tetapi tetap di-AND
+        dengan filter region user sehingga tidak bisa membaca region lain.
+        """
+        targets = cls._targets(scopes, table)
+        prefix = f"{region}%"
+
+        bound = injected = existing = 0
+        for select, depth, sources in targets:
+            bound += bind_region_literals(select, access_column, params, prefix)
+            where = select.clause("where")
+            if where is not None and _mentions(where.items, access_column):
+                existing += 1
+
+            params[SQLValidator.REGION_PARAM] = prefix
+            condition = cls._column_ref(sources, table, access_column)
+            condition += [_synthetic("keyword", "LIKE"), _synthetic("param", f":{SQLValidator.REGION_PARAM}")]
+            inject_condition(select, condition)
+            injected += 1
+
+        status = "INJECTED" if injected else "NO_TARGET"
+        logger.log("REGION_FILTER", {
+            "status": status,
+            "access_column": access_column,
+            "region": region,
+            "scopes": len(targets),
+            "injected": injected,
+            "bound_literals": bound,
+            "llm_region_filters": existing,
+            "params": params
+        })
+        return status
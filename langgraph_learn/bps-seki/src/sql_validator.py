@@ -2,41 +2,89 @@
 """SQL validation and security module"""
 
 import re
-import sqlparse
 from typing import Dict, Any, List, Tuple
 
 from .config import config
 from .logger import AuditLogger
+from .sql_lexer import Token, tokenize
 
 logger = AuditLogger()
 
 class SQLValidator:
     """Validasi dan keamanan SQL query"""
     
-    FORBIDDEN_KEYWORDS = [
+    # Lookup table (precompiled): dicek per token, bukan per regex
+    FORBIDDEN_KEYWORDS = frozenset([
         "drop", "delete", "update", "insert", "alter",
         "truncate", "create", "attach", "detach", "grant",
         "revoke", "commit", "rollback", "savepoint", "exec",
-        "execute", "sp_", "xp_", "shutdown"
-    ]
-    
-    FORBIDDEN_PATTERNS = [
-        r"--.*$",  # SQL comments
-        r";\s*--",  # Multiple statements with comments
-        r"union.*select",  # SQL injection patterns
-        r"exec.*\(|sp_",  # Stored procedure execution
-        r"xp_",  # Extended stored procedures
-        r"waitfor.*delay|sleep\s*\(",  # Time-based attacks
-        r"benchmark\s*\(|pg_sleep",  # Performance attacks
-    ]
+        "execute", "shutdown"
+    ])
+    FORBIDDEN_PREFIXES = ("sp_", "xp_")  # Stored / extended procedures
+    DANGEROUS_FUNCTIONS = frozenset(["sleep", "benchmark", "pg_sleep"])  # Time-based / performance attacks
+    DANGEROUS_KEYWORDS = frozenset(["waitfor"])
     
     @classmethod
     def validate_sql(cls, sql: str) -> Dict[str, Any]:
-        """Validasi keamanan SQL query"""
-        sql_lower = sql.lower().strip()
+        """
+        Validasi keamanan SQL query dalam satu pass tokenizer.
+        Isi string literal dan quoted identifier tidak pernah dianggap keyword,
+        jadi `WHERE status = 'update'` tidak lagi ditolak.
+        """
+        return cls.validate_tokens(tokenize(sql), sql)
+    
+    @classmethod
+    def validate_tokens(cls, tokens: List[Token], sql: str = None, engine_enforced: bool = False) -> Dict[str, Any]:
+        """
+        Validasi atas token yang sudah ada (dipakai SQLPipeline agar SQL tidak di-tokenize ulang).
+        engine_enforced: authorizer koneksi sudah menolak tulis / DDL / ATTACH / PRAGMA,
+        jadi cukup cek struktur (SELECT tunggal dengan FROM) tanpa lookup keyword terlarang.
+        """
+        if engine_enforced:
+            return cls._validate_structure(tokens, sql)
+        
+        first_word = None
+        forbidden = None
+        dangerous = False
+        has_from = False
+        seen_union = False
+        statements = 0
+        in_statement = False
+        
+        for i, token in enumerate(tokens):
+            kind = token.kind
+            if kind == "comment":
+                dangerous = True
+                continue
+            if kind == "semicolon":
+                in_statement = False
+                continue
+            if not in_statement:
+                statements += 1
+                in_statement = True
+            
+            if kind == "keyword" or kind == "name":
+                word = token.lower
+                if first_word is None:
+                    first_word = word
+                if word in cls.FORBIDDEN_KEYWORDS or word.startswith(cls.FORBIDDEN_PREFIXES):
+                    forbidden = forbidden or word
+                elif word == "from":
+                    has_from = True
+                elif word == "union":
+                    seen_union = True
+                elif word == "select" and seen_union:
+                    dangerous = True  # UNION ... SELECT (pola injeksi)
+                elif word in cls.DANGEROUS_KEYWORDS:
+                    dangerous = True
+                elif (word in cls.DANGEROUS_FUNCTIONS and i + 1 < len(tokens)
+                      and tokens[i + 1].kind == "lparen"):
+                    dangerous = True
+            elif first_word is None:
+                first_word = ""
         
         # 1. Basic checks
-        if not sql_lower.startswith("select"):
+        if first_word != "select":
             return {
                 "is_valid": False,
                 "reason": "Only SELECT queries are allowed",
@@ -44,43 +92,36 @@ class SQLValidator:
             }
         
         # 2. Check forbidden keywords
-        for keyword in cls.FORBIDDEN_KEYWORDS:
-            # Menggunakan regex word boundary agar keyword seperti 'update' tidak match 'last_updated'
-            if re.search(rf'\b{keyword}\b', sql_lower):
-                return {
-                    "is_valid": False,
-                    "reason": f"Contains forbidden keyword: {keyword}",
-                    "suggested_fix": "Remove non-SELECT operations"
-                }
-        
-        # 3. Check forbidden patterns
-        for pattern in cls.FORBIDDEN_PATTERNS:
-            if re.search(pattern, sql_lower, re.IGNORECASE):
-                return {
-                    "is_valid": False,
-                    "reason": "Contains dangerous SQL pattern",
-                    "suggested_fix": "Avoid comments or dangerous patterns"
-                }
+        if forbidden:
+            return {
+                "is_valid": False,
+                "reason": f"Contains forbidden keyword: {forbidden}",
+                "suggested_fix": "Remove non-SELECT operations"
+            }
+        
+        # 3. Check forbidden patterns (komentar, UNION SELECT, sleep/benchmark)
+        if dangerous:
+            return {
+                "is_valid": False,
+                "reason": "Contains dangerous SQL pattern",
+                "suggested_fix": "Avoid comments or dangerous patterns"
+            }
         
         # 4. Check structure
-        if "from" not in sql_lower:
+        if not has_from:
             return {
                 "is_valid": False,
                 "reason": "Query missing FROM clause",
                 "suggested_fix": "Add FROM clause with table name"
             }
         
-        # 5. Parse SQL untuk validasi struktur multi-statement
-        try:
-            parsed = sqlparse.parse(sql)
-            if len(parsed) > 1:
-                return {
-                    "is_valid": False,
-                    "reason": "Multiple SQL statements detected",
-                    "suggested_fix": "Use only one SELECT statement"
-                }
-        except:
-            pass  # Jika parse gagal, tetap lanjut dengan warning/logging (fail open but safe by regex)
+        # 5. Multi-statement (dihitung dari semicolon di luar string/komentar)
+        if statements > 1:
+            return {
+                "is_valid": False,
+                "reason": "Multiple SQL statements detected",
+                "suggested_fix": "Use only one SELECT statement"
+            }
         
         return {
             "is_valid": True,
@@ -88,17 +129,81 @@ class SQLValidator:
             "validated_sql": sql
         }
     
+    @classmethod
+    def _validate_structure(cls, tokens: List[Token], sql: str = None) -> Dict[str, Any]:
+        """Fast path: token pertama SELECT, ada FROM, satu statement, tanpa komentar"""
+        # Komentar tetap ditolak: `--` di akhir SQL akan menelan WHERE region / LIMIT yang disisipkan pipeline
+        if any(t.kind == "comment" for t in tokens):
+            return {
+                "is_valid": False,
+                "reason": "Contains dangerous SQL pattern",
+                "suggested_fix": "Avoid comments or dangerous patterns"
+            }
+        
+        if not tokens or tokens[0].kind != "keyword" or tokens[0].lower != "select":
+            return {
+                "is_valid": False,
+                "reason": "Only SELECT queries are allowed",
+                "suggested_fix": "Use SELECT statement only"
+            }
+        
+        semicolons = [i for i, t in enumerate(tokens) if t.kind == "semicolon"]
+        if semicolons and semicolons[0] != len(tokens) - len(semicolons):
+            return {
+                "is_valid": False,
+                "reason": "Multiple SQL statements detected",
+                "suggested_fix": "Use only one SELECT statement"
+            }
+        
+        if not any(t.kind == "keyword" and t.lower == "from" for t in tokens):
+            return {
+                "is_valid": False,
+                "reason": "Query missing FROM clause",
+                "suggested_fix": "Add FROM clause with table name"
+            }
+        
+        return {
+            "is_valid": True,
+            "reason": "Query is safe (enforced by database authorizer)",
+            "validated_sql": sql
+        }
+    
+    # Nama parameter untuk filter yang di-bind (bukan disambung ke teks SQL)
+    REGION_PARAM = "region_prefix"
+    YEAR_PARAM = "year"
+    YEAR_COLUMNS = ["year", "tahun"]
+    
+    @classmethod
+    def _insert_condition(cls, sql: str, condition: str) -> str:
+        """Sisipkan kondisi ke WHERE (AND) atau buat WHERE sebelum GROUP BY/ORDER BY/LIMIT"""
+        sql_lower = sql.lower()
+        
+        # Strategi: Jika ada WHERE, tambahkan AND. Jika tidak, cari tempat sebelum GROUP BY/ORDER BY/LIMIT.
+        where = re.search(r"\bwhere\b", sql, re.IGNORECASE)
+        if where:
+            # Kondisi lama dibungkus kurung: `a OR b` tidak boleh lolos dari kondisi baru
+            end = re.compile(r"\b(?:group\s+by|order\s+by|limit)\b|;", re.IGNORECASE).search(sql, where.end())
+            end = end.start() if end else len(sql)
+            body = sql[where.end():end].strip()
+            return f"{sql[:where.start()]}WHERE {condition} AND ({body}) {sql[end:]}".rstrip()
+        
+        # Mencari posisi untuk menyisipkan WHERE
+        for clause in ["group by", "order by", "limit"]:
+            idx = sql_lower.find(clause)
+            if idx != -1:
+                return sql[:idx] + f" WHERE {condition} " + sql[idx:]
+        
+        # Jika tidak ada clause lain, tambahkan di akhir (sebelum semicolon)
+        return sql.rstrip(";") + f" WHERE {condition};"
+    
     @classmethod
     def inject_region_filter(cls, sql: str, access_column: str, region: str) -> str:
-        """Inject region filter ke SQL query"""
+        """Inject region filter ke SQL query (literal; gunakan bind_region_filter untuk versi parameter)"""
         if not access_column or not region:
             return sql
         
-        sql_lower = sql.lower()
-        access_column_lower = access_column.lower()
-        
         # Cek jika access_column sudah ada di WHERE
-        if re.search(rf"where.*{re.escape(access_column_lower)}", sql_lower, re.IGNORECASE):
+        if re.search(rf"where.*{re.escape(access_column.lower())}", sql.lower(), re.IGNORECASE):
             logger.log("REGION_FILTER", {
                 "status": "ALREADY_EXISTS",
                 "access_column": access_column,
@@ -106,22 +211,73 @@ class SQLValidator:
             })
             return sql
         
-        # Inject WHERE clause
-        # Strategi: Jika ada WHERE, tambahkan AND. Jika tidak, cari tempat sebelum GROUP BY/ORDER BY/LIMIT.
-        if "where" in sql_lower:
-            # Menggunakan regex case insensitive untuk mengganti 'where' dengan 'where <condition> AND'
-            # Kita ganti occurrence pertama 'where'
-            pattern = re.compile(r"where", re.IGNORECASE)
-            return pattern.sub(f"WHERE {access_column} LIKE '{region}%' AND", sql, count=1)
-        else:
-            # Mencari posisi untuk menyisipkan WHERE
-            for clause in ["group by", "order by", "limit"]:
-                idx = sql_lower.find(clause)
-                if idx != -1:
-                    return sql[:idx] + f" WHERE {access_column} LIKE '{region}%' " + sql[idx:]
-            
-            # Jika tidak ada clause lain, tambahkan di akhir (sebelum semicolon)
-            return sql.rstrip(";") + f" WHERE {access_column} LIKE '{region}%';"
+        return cls._insert_condition(sql, f"{access_column} LIKE '{region}%'")
+    
+    @classmethod
+    def bind_region_filter(cls, sql: str, access_column: str, region: str,
+                           params: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Filter region sebagai bound parameter: `<access_column> LIKE :region_prefix`.
+        Teks SQL jadi sama untuk semua region sehingga statement cache SQLite & result cache bisa dipakai ulang.
+        Literal LIKE pada access_column yang ditulis LLM ikut diubah menjadi parameter bernilai prefix
+        region user, dan filter region user selalu disisipkan (predikat LLM bisa menyebut region lain).
+        """
+        params = dict(params or {})
+        if not access_column or not region:
+            return sql, params
+        
+        # Literal dari LLM: region LIKE 'RM I%' -> region LIKE :region_prefix (nilai = region user)
+        literal_re = re.compile(
+            rf"(\b{re.escape(access_column)}\b\)?\s+LIKE\s+)'(?:[^']|'')*'", re.IGNORECASE
+        )
+        sql, replaced = literal_re.subn(lambda m: f"{m.group(1)}:{cls.REGION_PARAM}", sql)
+        
+        params[cls.REGION_PARAM] = f"{region}%"
+        logger.log("REGION_FILTER", {
+            "status": "INJECTED",
+            "access_column": access_column,
+            "region": region,
+            "bound_literals": replaced,
+            "params": params
+        })
+        return cls._insert_condition(sql, f"{access_column} LIKE :{cls.REGION_PARAM}"), params
+    
+    @classmethod
+    def bind_year_literals(cls, sql: str, params: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+        """Ubah literal tahun (year = 2023, year IN (2022, 2023), BETWEEN) menjadi :year_0, :year_1, ..."""
+        params = dict(params or {})
+        columns = "|".join(cls.YEAR_COLUMNS)
+        
+        def bind(value: str) -> str:
+            name = f"{cls.YEAR_PARAM}_{sum(1 for k in params if k.startswith(cls.YEAR_PARAM + '_'))}"
+            params[name] = int(value)
+            return f":{name}"
+        
+        # year IN (2022, 2023)
+        sql = re.sub(
+            rf"(\b(?:{columns})\b\s+IN\s*\()(\s*\d{{4}}(?:\s*,\s*\d{{4}})*\s*)(\))",
+            lambda m: m.group(1) + ", ".join(bind(v) for v in re.findall(r"\d{4}", m.group(2))) + m.group(3),
+            sql, flags=re.IGNORECASE
+        )
+        # year BETWEEN 2020 AND 2023
+        sql = re.sub(
+            rf"(\b(?:{columns})\b\s+BETWEEN\s+)(\d{{4}})(\s+AND\s+)(\d{{4}})\b",
+            lambda m: m.group(1) + bind(m.group(2)) + m.group(3) + bind(m.group(4)),
+            sql, flags=re.IGNORECASE
+        )
+        # year = 2023, year >= 2020, ...
+        sql = re.sub(
+            rf"(\b(?:{columns})\b\s*(?:=|==|>=|<=|<>|!=|>|<)\s*)(\d{{4}})\b",
+            lambda m: m.group(1) + bind(m.group(2)),
+            sql, flags=re.IGNORECASE
+        )
+        return sql, params
+    
+    @classmethod
+    def bind_filters(cls, sql: str, access_column: str = None, region: str = None) -> Tuple[str, Dict[str, Any]]:
+        """Region + tahun sebagai named parameters. Return (sql, params) untuk SQLExecutor.execute(sql, params)"""
+        sql, params = cls.bind_region_filter(sql, access_column, region)
+        return cls.bind_year_literals(sql, params)
     
     @classmethod
     def add_limit_if_missing(cls, sql: str, default_limit: int = None) -> str:
@@ -11,6 +11,7 @@ class AgentState(TypedDict):
     # --- User Input & Context ---
     user_input: str
     user_context: Dict[str, str]
+    cancel_token: Optional[Any]  # query_guard.CancelToken dari UI/CLI: membatalkan query yang sedang berjalan
     
     # --- Agent Communication ---
     # operator.add digunakan agar pesan baru ditambahkan ke list (append), bukan menimpa
@@ -24,6 +25,7 @@ class AgentState(TypedDict):
     
     # --- Metadata & Table Selection ---
     relevant_tables: List[Dict]
+    entity_hits: List[Dict]  # nilai yang dikenali entity index: [{"value", "table", "column"}]
     selected_table: Optional[str]
     table_metadata: Optional[Dict]
     selection_confidence: Optional[float]
@@ -32,6 +34,7 @@ class AgentState(TypedDict):
     # --- SQL Generation ---
     raw_sql: Optional[str]
     validated_sql: Optional[str]
+    sql_params: Optional[Dict[str, Any]]  # bound parameters untuk validated_sql, misal {"region_prefix": "RM III%"}
     
     # --- Execution Results ---
     execution_result: Optional[Dict]
@@ -40,6 +43,7 @@ class AgentState(TypedDict):
     # --- Final Output ---
     final_answer: Optional[str]
     error: Optional[str]
+    error_details: Optional[Dict]  # detail terstruktur, misal {"error_type": "timeout", "plan": [...]}
     
     # --- Routing ---
     next_node: Optional[str]
\ No newline at end of file
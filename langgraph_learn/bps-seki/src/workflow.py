@@ -22,10 +22,13 @@ from .nodes import (
     
     # Enhanced Nodes
     enhanced_metadata_retriever_node,
-    enhanced_sql_agent_node
+    enhanced_sql_agent_node,
     # Note: enhanced_forecast_agent_node didefinisikan di file ini
+    metadata_manager,
+    execution_error_details
 )
 from .forecast_agent import EnhancedForecastAgent
+from .slow_query import query_context
 from .llm_client import llm_client
 
 logger = AuditLogger()
@@ -48,18 +51,22 @@ def enhanced_forecast_agent_node(state: AgentState) -> AgentState:
     user_context = state.get("user_context", {})
     
     # Gunakan enhanced forecast agent
-    result = enhanced_forecast_agent.enhanced_forecast(
-        table_name=table_name,
-        metadata=table_meta,
-        region=user_context.get("region"),
-        user_query=state.get("user_input")
-    )
+    with query_context(state.get("user_input")):
+        result = enhanced_forecast_agent.enhanced_forecast(
+            table_name=table_name,
+            metadata=metadata_manager.get_table(table_name) or table_meta,  # TableMeta terkompilasi jika ada
+            region=user_context.get("region"),
+            user_query=state.get("user_input"),
+            cancel_token=state.get("cancel_token")
+        )
     
     if result["success"]:
         state["forecast_result"] = result
         state["next_node"] = "response_formatter"
     else:
         state["error"] = result.get("error", "Forecast failed")
+        if result.get("error_type"):
+            state["error_details"] = execution_error_details(result)
         state["next_node"] = "error_handler"
     
     return state
@@ -0,0 +1,29 @@
+# tests/conftest.py
+"""Fixture bersama: DATA_DIR per test (cache, spill, index tidak menyentuh data/ milik aplikasi)"""
+
+import sqlite3
+
+import pytest
+
+from src.config import config
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    path = tmp_path / "data"
+    monkeypatch.setattr(config, "DATA_FOLDER", str(path))
+    return path
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Buat file SQLite kecil: make_db({"tabel": ("kolom DDL", [rows])}) -> Path"""
+    def factory(tables, name="test.db"):
+        path = tmp_path / name
+        conn = sqlite3.connect(path)
+        for table, (columns, rows) in tables.items():
+            conn.execute(f"CREATE TABLE {table} ({columns})")
+            if rows:
+                conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+        conn.commit()
+        conn.close()
+        return path
+    return factory
@@ -0,0 +1,81 @@
+# tests/test_connection_pool.py
+"""ConnectionPool: reuse koneksi, batas max_size, koneksi read-only, discard koneksi rusak"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.connection_pool import ConnectionPool, get_pool
+
+@pytest.fixture
+def db(make_db):
+    return make_db({"ref_mkt_t": ("x INTEGER", [(1,), (2,)])})
+
+def test_connection_is_reused(db):
+    pool = ConnectionPool(db, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert (pool.stats["created"], pool.stats["hits"]) == (1, 1)
+    pool.close()
+
+def test_connections_are_read_only(db):
+    pool = ConnectionPool(db, max_size=1)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM ref_mkt_t").fetchone() == (2,)
+        with pytest.raises(sqlite3.DatabaseError):
+            conn.execute("INSERT INTO ref_mkt_t VALUES (3)")
+    pool.close()
+
+def test_exhausted_pool_times_out(db):
+    pool = ConnectionPool(db, max_size=1)
+    conn = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError, match="exhausted"):
+        pool.acquire(timeout=0.05)
+    assert pool.stats["waits"] >= 1
+    pool.release(conn)
+    pool.close()
+
+def test_waiter_gets_released_connection(db):
+    pool = ConnectionPool(db, max_size=1)
+    conn = pool.acquire()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5)))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(5)
+    assert acquired == [conn]
+    pool.release(conn)
+    pool.close()
+
+def test_idle_connections_expire(db):
+    pool = ConnectionPool(db, max_size=2, idle_timeout=0.001)
+    with pool.connection():
+        pass
+    threading.Event().wait(0.01)
+    with pool.connection():
+        pass
+    assert (pool.stats["created"], pool.stats["closed"]) == (2, 1)
+    pool.close()
+
+def test_broken_connection_is_discarded(db):
+    pool = ConnectionPool(db, max_size=1)
+    with pytest.raises(sqlite3.DatabaseError):
+        with pool.connection():
+            raise sqlite3.DatabaseError("database disk image is malformed")
+    assert pool.get_stats()["idle"] == 0
+    assert pool.stats["closed"] == 1
+    pool.close()
+
+def test_operational_error_keeps_connection(db):
+    pool = ConnectionPool(db, max_size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("SELECT * FROM tidak_ada")
+    assert pool.get_stats()["idle"] == 1
+    pool.close()
+
+def test_pool_registry_shared_per_file(db):
+    assert get_pool(db) is get_pool(db.parent / "." / db.name)
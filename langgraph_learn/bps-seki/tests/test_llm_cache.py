@@ -0,0 +1,182 @@
+# tests/test_llm_cache.py
+"""Cache respons LLM: cache key, TTL, eviction LRU dan opt-in per call_type"""
+
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from src import llm_cache
+from src.config import config
+from src.llm_cache import LLMResponseCache, make_llm_key
+from src.llm_client import LLMClient
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+class FakeLLM:
+    """Pengganti AzureChatOpenAI: mencatat prompt yang benar-benar dikirim"""
+
+    def __init__(self, content="SELECT 1;"):
+        self.content = content
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return FakeResponse(self.content)
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+@pytest.fixture
+def cache(data_dir, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)  # cache bersama dibuat ulang di DATA_DIR test
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_CACHE_CALL_TYPES", "sql_generation,table_selection")
+    return llm_cache.get_llm_cache()
+
+@pytest.fixture
+def client(cache):
+    client = LLMClient()
+    client.user_llm, client.sql_llm = FakeLLM("jawaban"), FakeLLM()
+    client._llm_params = {"user": (0.7, 512), "sql": (0, 512)}
+    client._initialized = True
+    return client
+
+# ---------- Key ----------
+
+def test_key_depends_on_every_output_parameter():
+    base = ("gpt", "2024-02-15-preview", 0, 512, "SELECT ...")
+    key = make_llm_key(*base)
+    assert key == make_llm_key(*base)
+    assert key != make_llm_key("gpt-lain", *base[1:])
+    assert key != make_llm_key(base[0], "2025-01-01", *base[2:])
+    assert key != make_llm_key(*base[:2], 0.7, *base[3:])
+    assert key != make_llm_key(*base[:3], 1024, base[4])
+    assert key != make_llm_key(*base[:4], "SELECT ... ")
+    assert key != make_llm_key(*base, extra={"stop": [";"]})
+    assert make_llm_key(*base, extra={"a": 1, "b": 2}) == make_llm_key(*base, extra={"b": 2, "a": 1})
+
+# ---------- Store ----------
+
+def test_put_then_get(cache):
+    cache.put("k", "sql_generation", "gpt", "SELECT 1;", 850.0)
+    assert cache.get("k") == {"content": "SELECT 1;", "latency_ms": 850.0}
+    assert cache.get("lain") is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["saved_ms"]) == (1, 1, 850.0)
+    assert stats["by_call_type"]["sql_generation"] == {"entries": 1, "hits": 1, "saved_ms": 850.0}
+
+def test_expired_entry_is_a_miss(cache):
+    cache.put("k", "sql_generation", "gpt", "SELECT 1;", 10.0)
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = created_at - ?", (cache.ttl_seconds + 1,))
+    assert cache.get("k") is None
+    assert cache.stats["expired"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+def test_purge_expired(cache):
+    cache.put("lama", "sql_generation", "gpt", "a", 1.0)
+    cache.put("baru", "sql_generation", "gpt", "b", 1.0)
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = 0 WHERE key = 'lama'")
+    assert cache.purge_expired() == 1
+    assert cache.get("baru") is not None
+
+def test_zero_ttl_never_expires(data_dir):
+    cache = LLMResponseCache(ttl_hours=0)
+    cache.put("k", "sql_generation", "gpt", "a", 1.0)
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE llm_cache SET created_at = 0")
+    assert cache.get("k") is not None
+
+def test_lru_eviction(data_dir):
+    cache = LLMResponseCache(max_entries=2)
+    cache.put("a", "sql_generation", "gpt", "a", 1.0)
+    cache.put("b", "sql_generation", "gpt", "b", 1.0)
+    with sqlite3.connect(cache.path) as conn:
+        conn.execute("UPDATE llm_cache SET last_access = 0 WHERE key = 'b'")
+    cache.put("c", "sql_generation", "gpt", "c", 1.0)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats["evictions"] == 1
+
+# ---------- Opt-in lewat LLMClient ----------
+
+def test_sql_generation_is_cached(client):
+    first = client.call_sql_llm("prompt sql")
+    second = client.call_sql_llm("prompt sql")
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["content"] == first["content"]
+    assert client.sql_llm.prompts == ["prompt sql"]
+
+def test_answer_is_not_cached_by_default(client):
+    client.call_user_llm("ringkas data")
+    result = client.call_user_llm("ringkas data")
+    assert not result["cached"]
+    assert len(client.user_llm.prompts) == 2
+
+def test_call_type_opt_in_from_config(client, monkeypatch):
+    monkeypatch.setattr(config, "LLM_CACHE_CALL_TYPES", "answer")
+    client.call_user_llm("ringkas data")
+    assert client.call_user_llm("ringkas data")["cached"]
+    client.call_sql_llm("prompt sql")
+    assert not client.call_sql_llm("prompt sql")["cached"]
+
+def test_disabled_cache_skips_store(client, monkeypatch):
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+    client.call_sql_llm("prompt sql")
+    assert not client.call_sql_llm("prompt sql")["cached"]
+
+def test_empty_response_not_cached(client):
+    client.sql_llm.content = ""
+    client.call_sql_llm("prompt sql")
+    assert not client.call_sql_llm("prompt sql")["cached"]
+
+def test_sampling_parameters_are_part_of_key(client):
+    client.call_sql_llm("prompt sql")
+    client._llm_params["sql"] = (0.2, 512)
+    assert not client.call_sql_llm("prompt sql")["cached"]
+
+# ---------- Async batch ----------
+
+class SlowLLM(FakeLLM):
+    """ainvoke dengan jeda: mencatat jumlah request in-flight maksimum"""
+
+    def __init__(self):
+        super().__init__()
+        self.in_flight = self.peak = 0
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if prompt == "gagal":
+            raise RuntimeError("Azure error")
+        return FakeResponse(f"SQL untuk {prompt}")
+
+def test_batch_keeps_order_and_limits_concurrency(client):
+    client.sql_llm = SlowLLM()
+    prompts = [f"p{i}" for i in range(10)]
+    results = client.batch(prompts, max_concurrency=3)
+    assert [r["content"] for r in results] == [f"SQL untuk p{i}" for i in range(10)]
+    assert client.sql_llm.peak == 3
+
+def test_batch_failure_does_not_stop_other_prompts(client):
+    client.sql_llm = SlowLLM()
+    results = client.batch(["p0", "gagal", "p2"])
+    assert [r["success"] for r in results] == [True, False, True]
+
+def test_batch_uses_cache_off_the_event_loop(client, cache, monkeypatch):
+    client.sql_llm = SlowLLM()
+    threads = []
+    get, put = cache.get, cache.put
+    monkeypatch.setattr(cache, "get", lambda *a: threads.append(threading.current_thread()) or get(*a))
+    monkeypatch.setattr(cache, "put", lambda *a: threads.append(threading.current_thread()) or put(*a))
+
+    client.batch(["p0", "p1"])
+    assert [r["cached"] for r in client.batch(["p0", "p1"])] == [True, True]
+    assert threads and threading.main_thread() not in threads
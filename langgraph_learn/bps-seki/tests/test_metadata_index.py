@@ -0,0 +1,84 @@
+# tests/test_metadata_index.py
+"""MetadataIndex.updated (hot reload inkremental) harus identik dengan build penuh"""
+
+import json
+import pickle
+
+from src.metadata_index import MetadataIndex
+from src.metadata_manager import MetadataManager
+
+QUERIES = [
+    {"umr", "jawa", "barat"},
+    {"penduduk", "bogor"},
+    {"pdrb", "kabupaten", "harga"},
+    {"ba", "x"},
+    {"tahun", "year", "region"},
+]
+
+def table(description, columns, *values):
+    return {
+        "description": description,
+        "columns": {name: {"type": "TEXT"} for name in columns},
+        "example_rows": [{"area": value} for value in values]
+    }
+
+def metadata_v1():
+    return {
+        "ref_umr": table("Upah minimum regional Jawa Barat", ["area", "year", "umr"], "Kota Bandung", "Kab Bogor"),
+        "ref_penduduk": table("Jumlah penduduk per kabupaten", ["area", "year", "penduduk"], "Kab Bogor"),
+        "ref_pdrb": table("PDRB atas dasar harga berlaku", ["area", "year", "pdrb_adhb"], "Kota Bekasi"),
+    }
+
+def scores(index):
+    return [index.score(terms) for terms in QUERIES]
+
+def test_update_matches_full_rebuild():
+    old = metadata_v1()
+    previous = MetadataIndex(old)
+    before = pickle.dumps(previous)
+
+    new = dict(old)
+    new["ref_umr"] = table("Upah minimum kabupaten", ["area", "year", "umr", "region"], "Kota Depok")
+    del new["ref_penduduk"]
+    new["ref_aaa_baru"] = table("Tabel baru penduduk Jawa Barat", ["area", "tahun"], "Kab Bogor")
+    new = dict(sorted(new.items()))  # urutan manager: nama file terurut
+
+    updated = MetadataIndex.updated(previous, new, ["ref_umr", "ref_aaa_baru"])
+    assert scores(updated) == scores(MetadataIndex(new))
+    assert updated.get_stats()["tables"] == 3
+    # Index lama masih dipakai katalog lama: tidak boleh berubah
+    assert pickle.dumps(previous) == before
+    assert scores(previous) == scores(MetadataIndex(old))
+
+def test_update_without_changes_shares_postings():
+    old = metadata_v1()
+    previous = MetadataIndex(old)
+    updated = MetadataIndex.updated(previous, old, [])
+    assert scores(updated) == scores(previous)
+    assert all(a is b for a, b in zip(updated.postings, previous.postings))
+
+def test_update_rebuilds_when_mostly_orphans():
+    old = metadata_v1()
+    previous = MetadataIndex(old)
+    new = {"ref_lain": table("Sesuatu yang lain sama sekali", ["kolom_x"], "Nilai Y")}
+    updated = MetadataIndex.updated(previous, new, ["ref_lain"])
+    assert updated.get_stats()["orphan_strings"] == 0
+    assert scores(updated) == scores(MetadataIndex(new))
+
+def test_manager_reload_uses_previous_index(tmp_path):
+    metadata_dir = tmp_path / "metadata"
+    metadata_dir.mkdir()
+    for name, meta in metadata_v1().items():
+        (metadata_dir / f"{name}.json").write_text(json.dumps(meta))
+
+    manager = MetadataManager(metadata_dir, reload_interval=0, use_snapshot=False)
+    first = manager._current()
+    unchanged = first.index.postings[first.index._ids["kota bekasi"]]
+
+    (metadata_dir / "ref_umr.json").write_text(json.dumps(table("UMR kota", ["area", "umr"], "Kota Depok")))
+    assert manager._reload()
+    second = manager._current()
+    assert second.index is not first.index
+    assert second.index.postings[second.index._ids["kota bekasi"]] is unchanged
+    assert scores(second.index) == scores(MetadataIndex(second.metadata))
+    assert [t["table_name"] for t in manager.find_relevant_tables("umr depok")][0] == "ref_umr"
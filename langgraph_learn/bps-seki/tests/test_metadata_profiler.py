@@ -0,0 +1,35 @@
+# tests/test_metadata_profiler.py
+"""Profiler metadata: nilai yang ditulis manual (description, access_column) tidak ditimpa"""
+
+import json
+
+import pytest
+
+from src.metadata_profiler import MetadataProfiler
+
+TABLE = "ref_mkt_bps_umr"
+
+@pytest.fixture
+def profiler(make_db, tmp_path):
+    db = make_db({TABLE: ("region TEXT, area TEXT, year INTEGER, umr INTEGER, job_insertdate TEXT",
+                          [("RM III JABAR", "Kota Bandung", 2020, 100, "2024-01-01"),
+                           ("RM III JABAR", "Kab Bogor", 2021, 110, "2024-01-01")])})
+    metadata_dir = tmp_path / "metadata"
+    metadata_dir.mkdir()
+    return MetadataProfiler(db, metadata_dir, workers=1)
+
+def profiled(profiler, existing=None):
+    path = profiler.metadata_dir / f"{TABLE}.json"
+    if existing is not None:
+        path.write_text(json.dumps(existing))
+    assert profiler.profile_table(TABLE, force=True)["status"] == "profiled"
+    return json.loads(path.read_text())
+
+def test_access_column_filled_when_missing(profiler):
+    assert profiled(profiler)["access_column"] == "region"
+    assert profiled(profiler, {"description": "UMR"})["access_column"] == "region"
+
+def test_manual_values_kept(profiler):
+    metadata = profiled(profiler, {"description": "UMR manual", "access_column": "area"})
+    assert metadata["description"] == "UMR manual"
+    assert metadata["access_column"] == "area"
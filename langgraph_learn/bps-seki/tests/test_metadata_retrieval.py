@@ -0,0 +1,39 @@
+# tests/test_metadata_retrieval.py
+"""Index BM25 di DATA_DIR: satu file per folder metadata"""
+
+import json
+
+import pytest
+
+pytest.importorskip("scipy")
+
+from src.config import config
+from src.metadata_manager import MetadataManager
+from src.metadata_retrieval import index_path
+
+def write_metadata(folder, tables):
+    folder.mkdir()
+    for name, description in tables.items():
+        (folder / f"{name}.json").write_text(json.dumps({
+            "description": description,
+            "columns": {"area": {"type": "string"}, "year": {"type": "integer"}},
+            "example_rows": []
+        }))
+    return folder
+
+def test_index_path_keyed_by_metadata_dir(tmp_path):
+    assert index_path(tmp_path / "a") != index_path(tmp_path / "b")
+    assert index_path(tmp_path / "a") == index_path(tmp_path / "x" / ".." / "a")
+
+def test_managers_do_not_share_index(tmp_path, data_dir, monkeypatch):
+    monkeypatch.setattr(config, "METADATA_RETRIEVAL", "bm25")
+    umr = write_metadata(tmp_path / "umr", {"ref_umr": "Upah minimum regional"})
+    pdrb = write_metadata(tmp_path / "pdrb", {"ref_pdrb": "Produk domestik regional bruto"})
+
+    for folder, expected in ((umr, "ref_umr"), (pdrb, "ref_pdrb"), (umr, "ref_umr")):
+        manager = MetadataManager(folder, reload_interval=0, use_snapshot=False)
+        assert [t["table_name"] for t in manager.find_relevant_tables("regional")] == [expected]
+
+    assert index_path(umr).exists() and index_path(pdrb).exists()
+    assert sorted(p.name for p in data_dir.glob("metadata_bm25_*.npz")) == sorted(
+        [index_path(umr).name, index_path(pdrb).name])
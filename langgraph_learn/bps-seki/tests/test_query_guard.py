@@ -0,0 +1,131 @@
+# tests/test_query_guard.py
+"""QueryGuard: budget waktu / VM-step dan pembatalan (CancelToken, cancel_all, state workflow)"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.query_guard import CancelToken, QueryGuard, QueryInterrupted
+from src.sql_executor import SQLExecutor
+
+ENDLESS = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT COUNT(*) FROM c"
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def executor(make_db):
+    return SQLExecutor(db_path=make_db({"ref_mkt_t": ("x INTEGER", [(1,), (2,)])}))
+
+def run_guarded(conn, **kwargs):
+    with QueryGuard(conn, interval=100, **kwargs):
+        return conn.execute(ENDLESS).fetchall()
+
+def test_timeout_interrupts_query(conn):
+    with pytest.raises(QueryInterrupted) as error:
+        run_guarded(conn, timeout=0.05, max_steps=0)
+    assert error.value.reason == "timeout"
+    assert error.value.elapsed < 2
+
+def test_step_budget_interrupts_query(conn):
+    with pytest.raises(QueryInterrupted) as error:
+        run_guarded(conn, timeout=0, max_steps=10_000)
+    assert error.value.reason == "step_budget"
+    assert error.value.vm_steps > 10_000
+
+def test_cancel_from_other_thread(conn):
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel, args=("stopped by user",)).start()
+    with pytest.raises(QueryInterrupted) as error:
+        run_guarded(conn, timeout=10, max_steps=0, cancel_token=token)
+    assert error.value.reason == "cancelled"
+    assert "stopped by user" in str(error.value)
+
+def test_guard_removes_progress_handler(conn):
+    with pytest.raises(QueryInterrupted):
+        run_guarded(conn, timeout=0, max_steps=1_000)
+    assert conn.execute("SELECT COUNT(*) FROM (SELECT 1 UNION ALL SELECT 2)").fetchone() == (2,)
+
+def test_query_within_budget_untouched(conn):
+    with QueryGuard(conn, timeout=5, max_steps=0, interval=100):
+        assert conn.execute("SELECT 1 + 1").fetchone() == (2,)
+
+def test_executor_returns_structured_timeout(executor):
+    result = executor.execute(ENDLESS, use_cache=False, timeout=0.05, max_steps=0)
+    assert not result["success"]
+    assert (result["error_type"], result["timeout_reason"]) == ("timeout", "timeout")
+
+def test_executor_cancel_all_stops_running_query(executor):
+    results = []
+    worker = threading.Thread(target=lambda: results.append(
+        executor.execute_summary(ENDLESS, use_cache=False, timeout=10, max_steps=0)))
+    worker.start()
+    deadline = time.monotonic() + 5
+    while not executor._active_tokens and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.cancel_all("shutdown") == 1
+    worker.join(5)
+    assert results[0]["timeout_reason"] == "cancelled"
+
+def test_sql_executor_node_passes_state_token(monkeypatch, executor):
+    from src import nodes
+    monkeypatch.setattr(nodes, "sql_executor", executor)
+    token = CancelToken()
+    token.cancel("stopped by user")
+    state = nodes.sql_executor_node({"user_input": "x", "validated_sql": ENDLESS, "cancel_token": token})
+    assert state["next_node"] == "error_handler"
+    assert state["error_details"]["timeout_reason"] == "cancelled"
+
+@pytest.fixture
+def series_executor(make_db):
+    rows = [(year, float(year)) for year in range(5000)]
+    return SQLExecutor(db_path=make_db({"ref_mkt_series": ("year INTEGER, nilai REAL", rows)}, "series.db"))
+
+FORECAST_STATE = {
+    "user_input": "forecast nilai",
+    "selected_table": "ref_mkt_series",
+    "table_metadata": {"columns": {"year": {"type": "integer"}, "nilai": {"type": "float"}}},
+}
+
+def cancelled_token():
+    token = CancelToken()
+    token.cancel("stopped by user")
+    return token
+
+def test_enhanced_forecast_node_passes_state_token(monkeypatch, series_executor):
+    from src import forecast_agent, workflow
+    monkeypatch.setattr(forecast_agent, "sql_executor", series_executor)
+    state = workflow.enhanced_forecast_agent_node({**FORECAST_STATE, "cancel_token": cancelled_token()})
+    assert state["next_node"] == "error_handler"
+    assert state["error_details"]["timeout_reason"] == "cancelled"
+
+    state = workflow.enhanced_forecast_agent_node(dict(FORECAST_STATE))
+    assert state["next_node"] == "response_formatter"
+
+def test_basic_forecast_node_passes_state_token(monkeypatch, series_executor):
+    from src import nodes
+    monkeypatch.setattr(nodes, "sql_executor", series_executor)
+    state = nodes.forecast_agent_node_basic({**FORECAST_STATE, "cancel_token": cancelled_token()})
+    assert state["error_details"]["timeout_reason"] == "cancelled"
+
+@pytest.mark.parametrize("failure, message", [
+    ({"error_type": "cost_guard", "scanned_tables": ["ref_mkt_series"]}, "TERLALU BERAT"),
+    ({"error_type": "not_authorized"}, "AKSES DITOLAK"),
+])
+def test_basic_forecast_node_reports_guard_errors(monkeypatch, failure, message):
+    from src import nodes
+
+    class RejectingExecutor:
+        def execute(self, sql, params=None, **kwargs):
+            return {"success": False, "error": "rejected", "sql": sql, **failure}
+
+    monkeypatch.setattr(nodes, "sql_executor", RejectingExecutor())
+    state = nodes.forecast_agent_node_basic(dict(FORECAST_STATE))
+    assert state["error_details"]["error_type"] == failure["error_type"]
+    assert state["error_details"]["scanned_tables"] == failure.get("scanned_tables", [])
+    assert message in nodes.error_handler_node(state)["final_answer"]
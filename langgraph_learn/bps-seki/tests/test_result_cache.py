@@ -0,0 +1,92 @@
+# tests/test_result_cache.py
+"""Result cache: cache key, invalidasi via PRAGMA data_version / mtime file database"""
+
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from src.result_cache import QueryResultCache, make_cache_key, normalize_sql
+from src.sql_executor import SQLExecutor
+
+TABLE = "ref_mkt_bps_umr"
+
+@pytest.fixture
+def db(make_db):
+    return make_db({TABLE: ("region TEXT, year INTEGER, umr INTEGER",
+                            [("RM III JABAR", 2020, 100), ("RM III JABAR", 2021, 110)])})
+
+def write(db, *rows):
+    conn = sqlite3.connect(db)
+    conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+def result(rows=2):
+    return {"success": True, "data": pd.DataFrame({"n": [rows]}), "row_count": 1}
+
+def test_normalize_sql_keeps_literal_case():
+    assert normalize_sql("SELECT  *\nFROM t WHERE a = 'Bogor';") == "select * from t where a = 'Bogor'"
+    assert make_cache_key("select * from t", {"y": 1}) == make_cache_key("SELECT *  FROM t;", {"y": 1})
+    assert make_cache_key("SELECT * FROM t WHERE a = 'A'") != make_cache_key("SELECT * FROM t WHERE a = 'a'")
+    assert make_cache_key("SELECT * FROM t", {"y": 1}) != make_cache_key("SELECT * FROM t", {"y": 2})
+
+def test_hit_returns_read_only_copy(db):
+    cache = QueryResultCache(db)
+    key = make_cache_key(f"SELECT COUNT(*) FROM {TABLE}")
+    cache.put(key, result())
+    hit = cache.get(key)
+    assert hit["cached"] and hit["data"]["n"].tolist() == [2]
+    assert not hit["data"].iloc[:, 0].to_numpy().flags.writeable
+
+def test_data_version_changes_on_commit_from_other_connection(db):
+    cache = QueryResultCache(db)
+    before = cache._data_version()
+    write(db, ("RM III JABAR", 2022, 120))
+    assert cache._data_version() != before
+
+def test_commit_invalidates_cache(db):
+    cache = QueryResultCache(db)
+    key = make_cache_key(f"SELECT COUNT(*) FROM {TABLE}")
+    cache.put(key, result())
+    write(db, ("RM III JABAR", 2022, 120))
+    assert cache.get(key) is None
+    assert cache.stats["invalidations"] == 1
+
+def test_mtime_change_invalidates_cache(db):
+    cache = QueryResultCache(db)
+    key = make_cache_key(f"SELECT COUNT(*) FROM {TABLE}")
+    cache.put(key, result())
+    stat = db.stat()
+    os.utime(db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert cache.get(key) is None
+
+def test_result_computed_before_write_is_not_stored(db):
+    cache = QueryResultCache(db)
+    key = make_cache_key(f"SELECT COUNT(*) FROM {TABLE}")
+    version = cache.current_version()
+    write(db, ("RM III JABAR", 2022, 120))
+    cache.put(key, result(), version=version)
+    assert cache.get(key) is None
+
+def test_lru_eviction_by_entries(db):
+    cache = QueryResultCache(db, max_entries=2)
+    keys = [make_cache_key(f"SELECT {i} FROM {TABLE}") for i in range(3)]
+    for key in keys:
+        cache.put(key, result())
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) is not None
+    assert cache.stats["evictions"] == 1
+
+def test_executor_serves_fresh_rows_after_write(db):
+    executor = SQLExecutor(db_path=db)
+    sql = f"SELECT COUNT(*) AS n FROM {TABLE}"
+    assert not executor.execute(sql).get("cached")
+    cached = executor.execute(sql)
+    assert cached["cached"] and cached["data"]["n"].tolist() == [2]
+
+    write(db, ("RM III JABAR", 2022, 120))
+    fresh = executor.execute(sql)
+    assert not fresh.get("cached")
+    assert fresh["data"]["n"].tolist() == [3]
@@ -0,0 +1,105 @@
+# tests/test_result_spill.py
+"""Spill Parquet: schema stabil antar chunk (NULL di kolom int, chunk pertama kosong) dan batas halaman"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.config import config
+from src.result_spill import ResultSpill, cleanup_spills, load_frame, page_count, read_page, spill_frame
+from src.sql_executor import SQLExecutor
+
+TABLE = "ref_mkt_bps_umr"
+
+def write_chunks(chunks, kinds=None):
+    spill = ResultSpill("SELECT ...", None, kinds=kinds)
+    for chunk in chunks:
+        spill.write(chunk)
+    return spill.close()
+
+def test_null_in_int_column_after_first_chunk():
+    chunks = [pd.DataFrame({"year": [2020, 2021], "umr": [100, 110]}),
+              pd.DataFrame({"year": [2022, 2023], "umr": [None, 130]})]  # pandas: float64 + NaN
+    handle = write_chunks(chunks, kinds=["int", "int"])
+    df = load_frame(handle)
+    assert handle["row_count"] == 4
+    assert df["umr"].isna().tolist() == [False, False, True, False]
+    assert df["umr"].dropna().tolist() == [100, 110, 130]
+
+def test_all_null_first_chunk_without_kinds():
+    chunks = [pd.DataFrame({"label": [None, None], "n": [1, 2]}),
+              pd.DataFrame({"label": ["a", "b"], "n": [3.5, None]})]
+    df = load_frame(write_chunks(chunks))
+    assert df["label"].isna().tolist() == [True, True, False, False]
+    assert df["label"].dropna().tolist() == ["a", "b"]
+    assert df["n"].tolist()[:3] == [1.0, 2.0, 3.5]
+
+def test_mixed_object_column_is_written_as_text():
+    chunks = [pd.DataFrame({"v": [1, "dua"]}), pd.DataFrame({"v": [3.5, None]})]
+    df = load_frame(write_chunks(chunks))
+    assert df["v"].dropna().tolist() == ["1", "dua", "3.5"]
+    assert df["v"].isna().tolist() == [False, False, False, True]
+
+def test_spill_frame_uses_whole_frame_for_schema(monkeypatch):
+    monkeypatch.setattr(config, "SQL_FETCH_CHUNK_SIZE", 2)
+    df = pd.DataFrame({"expr": [None, None, 1.5, 2.0, None]})
+    handle = spill_frame(df)
+    assert handle["row_count"] == 5
+    assert load_frame(handle)["expr"].tolist()[2:4] == [1.5, 2.0]
+
+@pytest.fixture
+def paged(monkeypatch):
+    """23 baris dalam row group berukuran 5 (batas halaman tidak sejajar dengan row group)"""
+    monkeypatch.setattr(config, "SQL_FETCH_CHUNK_SIZE", 5)
+    return spill_frame(pd.DataFrame({"i": range(23)}))
+
+@pytest.mark.parametrize("page, expected", [
+    (0, list(range(0, 7))),
+    (1, list(range(7, 14))),
+    (3, list(range(21, 23))),   # halaman terakhir parsial
+    (4, []),                    # di luar jangkauan
+])
+def test_read_page_boundaries(paged, page, expected):
+    df = read_page(paged, page, page_size=7)
+    assert df["i"].tolist() == expected
+    assert list(df.index) == expected
+
+def test_page_count(paged):
+    assert page_count(paged, 7) == 4
+    assert page_count(paged, 23) == 1
+    assert page_count({**paged, "row_count": 0}, 7) == 1
+
+def test_cleanup_removes_only_old_files(paged):
+    fresh = spill_frame(pd.DataFrame({"i": [1]}))
+    old = time.time() - 48 * 3600
+    os.utime(paged["path"], (old, old))
+    assert cleanup_spills(max_age_hours=24) == 1
+    assert not os.path.exists(paged["path"]) and os.path.exists(fresh["path"])
+
+# ---------- execute_summary ----------
+
+@pytest.fixture
+def executor(make_db):
+    rows = [(2000 + i, "RM III JABAR", i if i % 3 else None) for i in range(100)]
+    return SQLExecutor(db_path=make_db({TABLE: ("year INTEGER, region TEXT, umr INTEGER", rows)}))
+
+def test_summary_under_budget_does_not_spill(executor, monkeypatch, data_dir):
+    monkeypatch.setattr(config, "RESULT_MAX_ROWS", 500)
+    result = executor.execute_summary(f"SELECT * FROM {TABLE}", head_rows=10, use_cache=False)
+    assert result["success"] and result["row_count"] == 100
+    assert not result.get("spill")
+    assert not (data_dir / "result_spill").exists()
+
+def test_summary_over_budget_spills_all_rows(executor, monkeypatch):
+    monkeypatch.setattr(config, "RESULT_MAX_ROWS", 30)
+    monkeypatch.setattr(config, "SQL_FETCH_CHUNK_SIZE", 16)
+    result = executor.execute_summary(f"SELECT * FROM {TABLE}", head_rows=10, use_cache=False)
+    handle = result["spill"]
+    assert handle["row_count"] == 100
+    df = load_frame(handle)
+    assert df["year"].tolist() == list(range(2000, 2100))
+    assert df["umr"].isna().sum() == 34
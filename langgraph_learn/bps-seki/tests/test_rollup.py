@@ -0,0 +1,97 @@
+# tests/test_rollup.py
+"""Rollup rewrite: hasil sama dengan query ke tabel dasar, fallback ke tabel dasar jika rollup basi"""
+
+import sqlite3
+
+import pytest
+
+from src.rollup import RollupManager
+
+TABLE = "ref_mkt_bps_umr"
+ROWS = [
+    (2020, "RM III JABAR", "2_KABUPATEN_JAWA_BARAT", "BOGOR", 100, "2024-01-01"),
+    (2020, "RM III JABAR", "2_KABUPATEN_JAWA_BARAT", "BEKASI", 120, "2024-01-01"),
+    (2021, "RM III JABAR", "2_KABUPATEN_JAWA_BARAT", "BOGOR", 110, "2024-01-01"),
+    (2021, "RM III JABAR", "2_KABUPATEN_JAWA_BARAT", "BEKASI", None, "2024-01-01"),
+    (2020, "RM I SUMBAGUT", "2_KABUPATEN_SUMATERA_UTARA", "MEDAN", 90, "2024-01-01"),
+    (2021, "RM I SUMBAGUT", "2_KABUPATEN_SUMATERA_UTARA", "MEDAN", 95, "2024-01-01"),
+]
+
+@pytest.fixture
+def db(make_db):
+    return make_db({TABLE: ("year INTEGER, region TEXT, leveldata TEXT, area TEXT, umr INTEGER, job_insertdate TEXT",
+                            ROWS)})
+
+@pytest.fixture
+def manager(db):
+    manager = RollupManager(db, base_tables=[TABLE])
+    assert [r["status"] for r in manager.refresh()] == ["refreshed"]
+    return manager
+
+def fetch(db, sql, params=None):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(sql, params or {}).fetchall()
+    finally:
+        conn.close()
+
+def insert(db, row):
+    conn = sqlite3.connect(db)
+    conn.execute(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?, ?, ?)", row)
+    conn.commit()
+    conn.close()
+
+@pytest.mark.parametrize("sql, params", [
+    (f"SELECT year, SUM(umr) FROM {TABLE} GROUP BY year ORDER BY year", None),
+    (f"SELECT year, COUNT(*), COUNT(umr), MIN(umr), MAX(umr) FROM {TABLE} GROUP BY year ORDER BY year", None),
+    (f"SELECT region, AVG(umr) AS avg_umr FROM {TABLE} GROUP BY region ORDER BY region", None),
+    (f"SELECT year, SUM(umr) FROM {TABLE} WHERE region LIKE :region_prefix GROUP BY year ORDER BY year",
+     {"region_prefix": "RM III%"}),
+    (f"SELECT year, SUM(umr) AS total FROM {TABLE} GROUP BY year HAVING SUM(umr) > 300 ORDER BY total DESC", None),
+    (f"SELECT COUNT(*) FROM {TABLE} WHERE year = :year_0", {"year_0": 2021}),
+])
+def test_rewrite_matches_base_table(db, manager, sql, params):
+    rewrite = manager.rewrite(sql)
+    assert rewrite is not None and rewrite["rollup_table"] == f"rollup_{TABLE}"
+    assert fetch(db, rewrite["sql"], params) == fetch(db, sql, params)
+
+def test_rewrite_keeps_result_column_names(db, manager):
+    rewrite = manager.rewrite(f"SELECT year, SUM(umr) FROM {TABLE} GROUP BY year")
+    conn = sqlite3.connect(db)
+    cursor = conn.execute(rewrite["sql"])
+    assert [d[0] for d in cursor.description] == ["year", "SUM(umr)"]
+    conn.close()
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT area, SUM(umr) FROM {TABLE} GROUP BY area",            # area bukan dimensi rollup
+    f"SELECT SUM(umr) FROM {TABLE} WHERE area = 'BOGOR'",
+    f"SELECT COUNT(DISTINCT umr) FROM {TABLE}",
+    f"SELECT year, umr FROM {TABLE}",                               # tanpa agregat
+    f"SELECT * FROM {TABLE}",
+    f"SELECT year, SUM(umr) FROM (SELECT * FROM {TABLE}) GROUP BY year",
+    f"SELECT year, SUM(umr) FROM ref_mkt_bps_lain GROUP BY year",   # tidak ada rollup
+])
+def test_unsupported_queries_are_not_rewritten(manager, sql):
+    assert manager.rewrite(sql) is None
+
+def test_stale_rollup_falls_back_to_base_table(db, manager):
+    sql = f"SELECT year, SUM(umr) FROM {TABLE} GROUP BY year ORDER BY year"
+    assert manager.rewrite(sql) is not None
+
+    insert(db, (2022, "RM III JABAR", "2_KABUPATEN_JAWA_BARAT", "BOGOR", 130, "2024-02-01"))
+    assert manager.rewrite(sql) is None
+    assert not manager.get_status()[0]["fresh"]
+
+    assert [r["status"] for r in manager.refresh()] == ["refreshed"]
+    rewrite = manager.rewrite(sql)
+    assert rewrite is not None
+    assert fetch(db, rewrite["sql"]) == fetch(db, sql)
+
+def test_refresh_skips_fresh_rollup(manager):
+    assert [r["status"] for r in manager.refresh()] == ["fresh"]
+    assert [r["status"] for r in manager.refresh(force=True)] == ["refreshed"]
+
+def test_missing_base_table_reported(db):
+    assert RollupManager(db, base_tables=["ref_mkt_tidak_ada"]).refresh() == [
+        {"base_table": "ref_mkt_tidak_ada", "status": "missing"}
+    ]
@@ -0,0 +1,96 @@
+# tests/test_row_security.py
+"""Authorizer SQLite: tulis / DDL / ATTACH / PRAGMA ditolak, tabel ber-region hanya lewat temp view"""
+
+import sqlite3
+
+import pytest
+
+from src.config import config
+from src.connection_pool import ConnectionPool
+from src.sql_executor import SQLExecutor
+
+TABLE = "ref_mkt_bps_umr"
+ROWS = [("RM III JABAR", 2020, 100), ("RM III JABAR", 2021, 110), ("RM I SUMBAGUT", 2020, 90)]
+
+@pytest.fixture
+def db(make_db):
+    return make_db({
+        TABLE: ("region TEXT, year INTEGER, umr INTEGER", ROWS),
+        "ref_mkt_kode_wilayah": ("kode TEXT, nama TEXT", [("32", "JAWA BARAT")]),
+    })
+
+@pytest.fixture
+def row_security(monkeypatch):
+    monkeypatch.setattr(config, "DB_ROW_SECURITY", True)
+    monkeypatch.setattr(config, "USER_CONTEXT", {"region": "RM III JABAR", "leveldata": "2_KABUPATEN_JAWA_BARAT"})
+
+@pytest.fixture
+def conn(db, row_security):
+    pool = ConnectionPool(db, max_size=1)
+    with pool.connection() as conn:
+        yield conn
+    pool.close()
+
+def assert_denied(conn, sql):
+    with pytest.raises(sqlite3.DatabaseError) as error:
+        conn.execute(sql).fetchall()
+    assert error.value.sqlite_errorname == "SQLITE_AUTH"
+
+@pytest.mark.parametrize("sql", [
+    f"INSERT INTO {TABLE} VALUES ('RM III JABAR', 2022, 1)",
+    f"UPDATE main.{TABLE} SET umr = 0",
+    f"DELETE FROM main.{TABLE}",
+    "CREATE TABLE t (x)",
+    f"DROP TABLE {TABLE}",
+    "CREATE TEMP TABLE t (x)",
+    "PRAGMA query_only = OFF",
+    "PRAGMA journal_mode = DELETE",
+])
+def test_writes_ddl_and_pragma_denied(conn, sql):
+    assert_denied(conn, sql)
+
+@pytest.mark.parametrize("sql", [f"UPDATE {TABLE} SET umr = 0", f"DELETE FROM {TABLE}"])
+def test_writes_through_region_view_fail(conn, sql):
+    with pytest.raises(sqlite3.DatabaseError):
+        conn.execute(sql)
+    assert len(conn.execute(f"SELECT * FROM {TABLE}").fetchall()) == 2
+
+def test_attach_denied(conn, tmp_path):
+    assert_denied(conn, f"ATTACH DATABASE '{tmp_path / 'other.db'}' AS other")
+
+def test_read_only_pragma_allowed(conn):
+    assert [row[1] for row in conn.execute(f'PRAGMA table_info("{TABLE}")')] == ["region", "year", "umr"]
+
+def test_region_table_reads_through_view(conn):
+    assert {row[0] for row in conn.execute(f"SELECT region FROM {TABLE}")} == {"RM III JABAR"}
+
+@pytest.mark.parametrize("sql", [
+    f"SELECT * FROM main.{TABLE}",
+    f'SELECT COUNT(*) FROM main."{TABLE}" WHERE region LIKE \'RM I %\'',
+    f"SELECT * FROM ref_mkt_kode_wilayah JOIN main.{TABLE} ON 1 = 1",
+])
+def test_direct_base_table_read_denied(conn, sql):
+    assert_denied(conn, sql)
+
+def test_table_without_region_column_readable(conn):
+    assert conn.execute("SELECT nama FROM main.ref_mkt_kode_wilayah").fetchall() == [("JAWA BARAT",)]
+
+def test_without_row_security_base_table_readable_but_writes_denied(db):
+    pool = ConnectionPool(db, max_size=1)
+    with pool.connection() as conn:
+        assert len(conn.execute(f"SELECT * FROM main.{TABLE}").fetchall()) == 3
+        assert_denied(conn, f"DELETE FROM {TABLE}")
+    pool.close()
+
+def test_denied_statement_keeps_connection_in_pool(db, row_security):
+    pool = ConnectionPool(db, max_size=1)
+    with pytest.raises(sqlite3.DatabaseError):
+        with pool.connection() as conn:
+            conn.execute(f"DELETE FROM {TABLE}")
+    assert pool.get_stats()["idle"] == 1 and pool.stats["closed"] == 0
+    pool.close()
+
+def test_executor_reports_not_authorized(db, row_security):
+    result = SQLExecutor(db_path=db).execute(f"SELECT * FROM main.{TABLE}", use_cache=False)
+    assert not result["success"]
+    assert result["error_type"] == "not_authorized"
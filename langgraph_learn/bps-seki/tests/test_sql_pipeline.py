@@ -0,0 +1,164 @@
+# tests/test_sql_pipeline.py
+"""Regression test rewriter SQL: filter region, entity filter, OR-wrapping, subquery"""
+
+import sqlite3
+
+import pytest
+
+from src.config import config
+from src.sql_pipeline import SQLPipeline
+from src.sql_validator import SQLValidator
+
+TABLE = "ref_mkt_bps_jumlah_penduduk"
+REGION = "RM III JABAR"
+ROWS = [
+    ("RM III JABAR", "BOGOR", 2020, 100),
+    ("RM III JABAR", "KOTA BOGOR", 2021, 200),
+    ("RM I SUMBAGUT", "MEDAN", 2020, 300),
+    ("RM IV JATIM", "SURABAYA", 2021, 400),
+]
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE {TABLE} (region TEXT, area TEXT, year INTEGER, population INTEGER)")
+    conn.execute("CREATE TABLE ref_mkt_bps_umr (region TEXT, area TEXT, year INTEGER, umr INTEGER)")
+    conn.executemany(f"INSERT INTO {TABLE} VALUES (?, ?, ?, ?)", ROWS)
+    conn.executemany("INSERT INTO ref_mkt_bps_umr VALUES (?, ?, ?, 1)", [row[:3] for row in ROWS])
+    yield conn
+    conn.close()
+
+def run(sql, **kwargs):
+    options = {"access_column": "region", "region": REGION, "table": TABLE, "default_limit": 100}
+    options.update(kwargs)
+    result = SQLPipeline.run(sql, **options)
+    assert result["is_valid"], result
+    return result
+
+def regions(conn, result):
+    rows = conn.execute(result["validated_sql"], result["params"]).fetchall()
+    return {row[0] for row in rows}
+
+# ---------- Region ----------
+
+def test_region_injected_as_bound_parameter(conn):
+    result = run(f"SELECT region FROM {TABLE}")
+    assert ":region_prefix" in result["validated_sql"]
+    assert result["params"]["region_prefix"] == f"{REGION}%"
+    assert result["region_filter"] == "INJECTED"
+    assert regions(conn, result) == {REGION}
+
+def test_llm_like_literal_for_other_region_is_rebound_to_user_region(conn):
+    result = run(f"SELECT region FROM {TABLE} WHERE region LIKE 'RM I SUMBAGUT%'")
+    assert "SUMBAGUT" not in result["validated_sql"]
+    assert result["params"]["region_prefix"] == f"{REGION}%"
+    assert regions(conn, result) == {REGION}
+
+def test_llm_equality_on_other_region_cannot_bypass_filter(conn):
+    result = run(f"SELECT region FROM {TABLE} WHERE region = 'RM I SUMBAGUT'")
+    assert result["params"]["region_prefix"] == f"{REGION}%"
+    assert regions(conn, result) == set()
+
+def test_existing_or_is_wrapped(conn):
+    result = run(f"SELECT region FROM {TABLE} WHERE area = 'MEDAN' OR year = 2021")
+    assert "AND (area = 'MEDAN' OR year = :year_0)" in result["validated_sql"]
+    assert regions(conn, result) == {REGION}
+
+def test_or_with_region_literal_is_wrapped(conn):
+    result = run(f"SELECT region FROM {TABLE} WHERE region LIKE 'RM IV%' OR year = 2020")
+    assert regions(conn, result) == {REGION}
+
+def test_subquery_scope_is_filtered(conn):
+    result = run(f"SELECT s.region FROM (SELECT region, year FROM {TABLE} WHERE year >= 2020) s")
+    inner = result["validated_sql"].split("(", 1)[1]
+    assert "region LIKE :region_prefix" in inner
+    assert regions(conn, result) == {REGION}
+
+def test_subquery_in_where_is_filtered(conn):
+    result = run(f"SELECT region FROM ref_mkt_bps_umr WHERE area IN (SELECT area FROM {TABLE})")
+    assert result["validated_sql"].count("LIKE :region_prefix") == 1
+    rows = conn.execute(result["validated_sql"], result["params"]).fetchall()
+    assert {row[0] for row in rows} == {REGION}
+
+def test_join_uses_table_alias(conn):
+    result = run(f"SELECT a.region FROM {TABLE} a JOIN ref_mkt_bps_umr u ON a.area = u.area")
+    assert "a.region LIKE :region_prefix" in result["validated_sql"]
+    assert regions(conn, result) == {REGION}
+
+def test_unknown_table_filters_outer_scope(conn):
+    result = run(f"SELECT region FROM {TABLE}", table="ref_mkt_other")
+    assert regions(conn, result) == {REGION}
+
+def test_no_region_leaves_sql_unfiltered(conn):
+    result = run(f"SELECT region FROM {TABLE}", region=None)
+    assert "region_prefix" not in result["params"]
+    assert result["region_filter"] is None
+
+# ---------- Entity filters ----------
+
+def test_entity_filter_single_value(conn):
+    result = run(f"SELECT population FROM {TABLE}", filters={"area": ["BOGOR"]})
+    assert "area = :entity_area_0" in result["validated_sql"]
+    assert result["entity_filters"] == ["area"]
+    rows = conn.execute(result["validated_sql"], result["params"]).fetchall()
+    assert rows == [(100,)]
+
+def test_entity_filter_ambiguous_match_is_prompt_only(conn):
+    # Beberapa nilai cocok: LLM yang memutuskan (petunjuk di prompt), bukan predikat wajib
+    result = run(f"SELECT population FROM {TABLE} ORDER BY year", filters={"area": ["BOGOR", "KOTA BOGOR"]})
+    assert result["entity_filters"] == []
+    assert "entity_area" not in result["validated_sql"]
+
+def test_entity_filter_only_on_configured_columns(conn, monkeypatch):
+    monkeypatch.setattr(config, "ENTITY_FILTER_COLUMN_NAMES", "leveldata")
+    result = run(f"SELECT population FROM {TABLE}", filters={"area": ["BOGOR"]})
+    assert result["entity_filters"] == []
+    assert len(conn.execute(result["validated_sql"], result["params"]).fetchall()) == 2
+
+def test_entity_filter_skipped_when_column_mentioned(conn):
+    result = run(f"SELECT area, SUM(population) FROM {TABLE} GROUP BY area", filters={"area": ["BOGOR"]})
+    assert result["entity_filters"] == []
+    assert "entity_area_0" not in result["params"]
+
+def test_entity_filter_combined_with_or(conn):
+    result = run(f"SELECT population FROM {TABLE} WHERE year = 2020 OR year = 2021", filters={"area": ["BOGOR"]})
+    rows = conn.execute(result["validated_sql"], result["params"]).fetchall()
+    assert rows == [(100,)]
+
+# ---------- Limit / validation ----------
+
+def test_limit_added_only_at_outer_level():
+    result = run(f"SELECT * FROM (SELECT * FROM {TABLE} LIMIT 3) s", default_limit=7)
+    assert result["limit_added"]
+    assert result["validated_sql"].endswith("LIMIT 7")
+
+@pytest.mark.parametrize("sql", [
+    "SELECT year, SUM(population) FROM {table} -- total per year",
+    "SELECT year /* total */ FROM {table}",
+])
+@pytest.mark.parametrize("row_security", [False, True])
+def test_comments_rejected(monkeypatch, sql, row_security):
+    # Komentar baris akan menelan WHERE region / LIMIT yang ditambahkan setelahnya
+    monkeypatch.setattr(config, "DB_ROW_SECURITY", row_security)
+    result = SQLPipeline.run(sql.format(table=TABLE), access_column="region", region=REGION, table=TABLE)
+    assert not result["is_valid"]
+
+def test_write_statement_rejected():
+    result = SQLPipeline.run(f"DELETE FROM {TABLE}", access_column="region", region=REGION, table=TABLE)
+    assert not result["is_valid"]
+
+# ---------- SQLValidator.bind_region_filter (versi regex) ----------
+
+def test_validator_rebinds_other_region_literal(conn):
+    sql, params = SQLValidator.bind_region_filter(
+        f"SELECT region FROM {TABLE} WHERE region LIKE 'RM I SUMBAGUT%' OR year = 2020", "region", REGION
+    )
+    assert "SUMBAGUT" not in sql
+    assert params == {"region_prefix": f"{REGION}%"}
+    assert {row[0] for row in conn.execute(sql, params).fetchall()} == {REGION}
+
+def test_validator_filters_other_region_equality(conn):
+    sql, params = SQLValidator.bind_region_filter(
+        f"SELECT region FROM {TABLE} WHERE region = 'RM I SUMBAGUT' ORDER BY year LIMIT 5;", "region", REGION
+    )
+    assert conn.execute(sql, params).fetchall() == []